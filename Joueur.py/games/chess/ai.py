@@ -1,6 +1,11 @@
 # This is where you build your AI for the Chess game.
 
 from games.chess.algorithm import algorithm
+from games.chess.engine import Engine
+from games.chess.move_cache import DEFAULT_MOVE_CACHE_SIZE
+from games.chess.transposition import DEFAULT_TT_SIZE, DEFAULT_SHARED_TT_MB, SharedTranspositionTable
+from games.chess.time_manager import TimeManager
+from games.chess import params
 from joueur.base_ai import BaseAI
 from games.chess.movement import *
 
@@ -39,6 +44,32 @@ class AI(BaseAI):
         # <<-- Creer-Merge: start -->> - Code you add between this comment and the end comment will be preserved between Creer re-runs.
         # replace with your start logic
         time = self.player.time_remaining
+
+        # The engine keeps what it learns from one turn to the next, with the
+        # number of positions stored set by the "move_cache_size" and
+        # "tt_size" AI settings. With more than one "workers", each position is
+        # searched by that many processes sharing a transposition table of
+        # "tt_mb" megabytes. The time spent on each move is written to the
+        # "time_log" file if there is one.
+        move_cache_size = self.get_setting("move_cache_size")
+        tt_size = self.get_setting("tt_size")
+        workers = int(self.get_setting("workers") or 1)
+        tt = None
+        if workers > 1:
+            tt_mb = self.get_setting("tt_mb")
+            tt = SharedTranspositionTable(int(tt_mb) if tt_mb else DEFAULT_SHARED_TT_MB)
+        self.engine = Engine(
+            int(move_cache_size) if move_cache_size else DEFAULT_MOVE_CACHE_SIZE,
+            int(tt_size) if tt_size else DEFAULT_TT_SIZE,
+            tt=tt,
+            workers=workers,
+            time_manager=TimeManager(self.get_setting("time_log") or None)
+        )
+
+        # Tuned parameter values (e.g. from games.chess.spsa) are loaded from
+        # the "params" file if there is one. They are shared by every game
+        # this process plays, so each must be given the same file.
+        params.load_ai_values(self.get_setting("params") or None)
         # <<-- /Creer-Merge: start -->>
 
     def game_updated(self) -> None:
@@ -57,6 +88,10 @@ class AI(BaseAI):
         """
         # <<-- Creer-Merge: end -->> - Code you add between this comment and the end comment will be preserved between Creer re-runs.
         # replace with your end logic
+        # Closing the engine stops its helper processes too
+        print(self.engine.stats())
+        self.engine.close()
+        self.engine = None
         # <<-- /Creer-Merge: end -->>
     def make_move(self) -> str:
         """This is called every time it is this AI.player's turn to make a move.
@@ -72,12 +107,12 @@ class AI(BaseAI):
         board = split_fen[0]
         board_list = board.split('/')
 
-        # Creates a board
-        new_board = parse_board(board_list)
+        # Creates a board, with the halfmove clock for the fifty-move rule
+        new_board = parse_board(board_list, int(split_fen[4]))
 
         time = self.player.time_remaining / (10**9)
 
-        move = algorithm(new_board, self.player.color, time*0.1, self.game.history)
+        move = algorithm(new_board, self.player.color, time, self.game.history, self.engine)
         print("")
         print(move[1])
         return move[1]
@@ -1,48 +1,198 @@
 from games.chess.movement import *
-import random
-import time
+from games.chess.zobrist import hash_state
+from games.chess.engine import Engine, MAX_PLY
+from games.chess.transposition import EXACT, LOWER, UPPER, SharedTranspositionTable
+import multiprocessing
+import queue
+import sys
 
 # Characters for all pieces to associate with a score
 PIECES = ["p", "r", "n", "b", "q", "k"]
+PIECE_VALS = {"p": 1, "n":3, "b": 3, "r": 5, "q": 9, "k": 10} # Scores by piece
+
+# Scores by the byte value of a tile on the board (either color, 0 if empty)
+TILE_VALS = [0] * 128
+
+# Sets the score of a piece (for both colors)
+def set_piece_value(piece, value):
+    PIECE_VALS[piece] = value
+    TILE_VALS[ord(piece)] = value
+    TILE_VALS[ord(piece.upper())] = value
+
+for piece in PIECES:
+    set_piece_value(piece, PIECE_VALS[piece])
+
+# Weights of the positional terms added to the material balance at the leaves
+MOBILITY_WEIGHT = 0.02 # Per tile attacked
+KING_DANGER_WEIGHT = 0.05 # Per enemy attack on or next to the King
+
+# Extra plies of captures searched past the depth in non-quiescent positions
+QUIESCENT_LIMIT = 2
+
+# Score for checkmate, reduced by the number of moves needed to deliver it
+MATE = 100000
+
+# Board the game starts from (used to replay the game's first moves)
+START_BOARD = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"
+
+# Nodes a helper searches between checks of whether it has been told to stop
+STOP_CHECK_NODES = 256
+
+# Seconds a helper is given to stop before it is killed (and the engine goes
+# on searching without helpers)
+HELPER_STOP_TIMEOUT = 5
 
 # Function to run the actual algorithm
 # In this case, Iterative-Deepening Depth-Limited Min-Max
-def algorithm(board_list, color, remaining_time, history):
+# The engine (transposition table, move ordering tables and caches) can be kept
+# between calls, otherwise one is made for this search
+def algorithm(board_list, color, remaining_time, history, engine=None):
     # Dictionary to hold moves
     move_dict = {}
-    move = ""
-    score = 0 # Initial score value
+    move = 0
+    score = material(board_list, color) # Initial score value
     start_depth = 0 # Starting depth of 0
     max_depth = 100 # Cap depth
-    taken = 0
 
     alpha = -99999999999
     beta = 99999999999
 
-    max_time = 900
-    quiescent_lim = 2
-    history_table = []
+    quiescent_lim = QUIESCENT_LIMIT
+
+    if engine is None:
+        engine = Engine()
+    engine.new_search()
+
+    # Hashes of every position on the current line, seeded with the game so far
+    repetitions = game_hashes(engine, board_list, color, history)
+    start_helpers(engine, board_list, color, remaining_time, history, repetitions)
 
-    limited_time = (estimated_time(history, remaining_time, max_time))
+    # Budgets the time for this move from the clock, then keeps deepening the
+    # search until the time manager says the next iteration isn't worth it
+    clock = engine.time_manager
+    clock.start_turn(remaining_time, len(history) // 2, len(actions(color, board_list)))
 
-    for depth in range(0, max_depth):
-        start_time = time.time()
+    # A search of depth 0 only scores the board as it is (with no move to
+    # make), so the first iteration searches a move deep
+    for depth in range(1, max_depth):
         if max_depth == 0:
             action_list = actions(color, board_list)
             move_dict = get_score(board_list, action_list)
             score, move = set_min_max(move_dict, start_depth)
 
-        action_list = min_max(board_list, color, move, score, alpha, beta, history_table, False, quiescent_lim, start_depth, depth)
+        action_list = min_max(board_list, color, move, score, alpha, beta, engine, repetitions, False, quiescent_lim, start_depth, depth, 0)
 
-        elapsed = time.time() - start_time
-        taken = taken + elapsed
+        # Searching deeper can't improve on a forced mate found within the depth
+        if (abs(action_list[0]) >= MATE - depth):
+            clock.stop("mate")
+            break
 
-        if ((5 * taken) > limited_time):
+        if clock.iteration_done(depth, action_list[0], action_list[1]):
             break
-    return action_list
+
+    if engine.helpers is not None:
+        engine.helpers.finish()
+    clock.end_turn(depth, action_list[0], decode_move(action_list[1]) if action_list[1] else None)
+
+    # The search works on moves packed by encode_move
+    return (action_list[0], decode_move(action_list[1]) if action_list[1] else None)
+
+# Starts the engine's other workers searching the same position, sharing
+# results through the engine's shared transposition table (their processes
+# are started by the first search, and kept until the engine is closed)
+def start_helpers(engine, board_list, color, remaining_time, history, hashes):
+    if (engine.workers > 1 and isinstance(engine.tt, SharedTranspositionTable)):
+        if engine.helpers is None:
+            engine.helpers = HelperPool(engine.tt.name, engine.workers - 1)
+        engine.helpers.start(board_list, color, remaining_time, history, hashes)
+
+# Raised in a helper's search once it has been told to stop
+class SearchStopped(Exception):
+    pass
+
+# Helper processes kept for the whole game, each with an engine of its own
+# attached to the main search's table. Each search sends every helper the
+# position, and is stopped by setting the stop event, which the helpers check
+# as they search and answer once stopped, so none is ever killed half way
+# through writing to the table.
+class HelperPool:
+    def __init__(self, tt_name, count):
+        self.stop = multiprocessing.Event()
+        self.done = multiprocessing.Queue()
+        self.tasks = []
+        self.processes = []
+        self.searching = False
+        for i in range(count):
+            tasks = multiprocessing.Queue()
+            process = multiprocessing.Process(target=helper_loop, args=(tt_name, tasks, self.stop, self.done), daemon=True)
+            process.start()
+            self.tasks.append(tasks)
+            self.processes.append(process)
+
+    # Starts every helper searching a position
+    def start(self, board_list, color, remaining_time, history, hashes):
+        self.stop.clear()
+        for tasks in self.tasks:
+            tasks.put((board_list.copy(), color, remaining_time, history, hashes))
+        self.searching = len(self.tasks) > 0
+
+    # Stops the helpers' search, returning once every helper has stopped
+    def finish(self):
+        if not self.searching:
+            return
+        self.searching = False
+        self.stop.set()
+        try:
+            for process in self.processes:
+                self.done.get(timeout=HELPER_STOP_TIMEOUT)
+        except queue.Empty:
+            self.kill()
+
+    # Kills helpers that didn't stop in time (a write one leaves half done
+    # fails the table's key check, so it is never read)
+    def kill(self):
+        for process in self.processes:
+            process.terminate()
+            process.join()
+        self.tasks = []
+        self.processes = []
+
+    # Stops the helpers for good
+    def close(self):
+        self.finish()
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(HELPER_STOP_TIMEOUT)
+        self.kill()
+
+# Searches each position sent to a helper process until sent None, with an
+# engine attached to the main search's table and starting from the main
+# search's hashes of the game
+def helper_loop(tt_name, tasks, stop, done):
+    engine = Engine(tt=SharedTranspositionTable(name=tt_name))
+    engine.stop = stop
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            board_list, color, remaining_time, history, hashes = task
+            engine.game_hashes = hashes
+            engine.game_position = (board_list, color, len(history))
+            try:
+                algorithm(board_list, color, remaining_time, history, engine)
+            except SearchStopped:
+                pass
+            finally:
+                done.put(True)
+    finally:
+        engine.close()
 
 # Performs the min max part of the algorithm
-def min_max(board_list, color, parent, score, alpha, beta, history_table, is_quiescent, quiescent_lim, depth, max_depth):
+# The score passed down is the material balance reached by the current line,
+# and ply is the number of moves made since the root (even when it's our move)
+def min_max(board_list, color, parent, score, alpha, beta, engine, repetitions, is_quiescent, quiescent_lim, depth, max_depth, ply):
     selected = () # Tuple for the selected move and score
     move_dict = {} # Dictionary for the moves
     best_choices = {} # Dictionary for the best choices among moves found in time limit
@@ -53,52 +203,127 @@ def min_max(board_list, color, parent, score, alpha, beta, history_table, is_qui
         enemy = "black"
     else:
         enemy = "white"
+
+    # A helper's search stops soon after it is told to
+    if engine.stop is not None:
+        engine.nodes = engine.nodes + 1
+        if engine.nodes % STOP_CHECK_NODES == 0 and engine.stop.is_set():
+            raise SearchStopped()
     
     if (depth == max_depth and is_quiescent):
         quiescent_lim = quiescent_lim - 1
 
-    # If max depth reached, return score and parent
+    # If max depth reached, return score (with the positional score of the board) and parent
     if (depth == max_depth and not (is_quiescent and quiescent_lim >= 0)):
-        return (score, parent)
+        return (score + evaluate_leaf(board_list, color if ply % 2 == 0 else enemy, engine, repetitions[-1]), parent)
+
+    # The engine keeps move buffers for MAX_PLY plies, which check extensions
+    # and quiescence can run past on a long enough line, so a line that deep
+    # is scored as it stands
+    if (ply + 1 >= MAX_PLY):
+        return (score + evaluate_leaf(board_list, color if ply % 2 == 0 else enemy, engine, repetitions[-1]), parent)
+
+    # Mate distance pruning: no line from here can end in a faster mate than
+    # one already found, so the window is limited to the mates still possible
+    alpha = max(alpha, -(MATE - ply))
+    beta = min(beta, MATE - ply)
+    if beta <= alpha:
+        return (alpha if ply % 2 == 0 else beta, parent)
+
+    # Looks up what an earlier search found for this position (the top of the
+    # repetition stack is its hash), and uses it if it was searched deep enough
+    position_key = repetitions[-1]
+    tt_move = None
+    entry = engine.tt.probe(position_key)
+    if entry is not None:
+        tt_move = entry[3]
+        if (ply > 0 and depth < max_depth and entry[0] >= max_depth - depth):
+            tt_value = value_from_tt(entry[1], score, ply)
+            is_lower = (entry[2] == LOWER) == (ply % 2 == 0) # Flags are for the side to move
+            if (entry[2] == EXACT or (is_lower and tt_value >= beta) or (not is_lower and tt_value <= alpha)):
+                return (tt_value, tt_move)
+    alpha_start = alpha
+    beta_start = beta
+
+    # Gets the valid actions into this ply's move buffer
+    moves = engine.move_buffers[ply]
+    count = engine.move_cache.generate_moves(position_key, color, board_list, moves)
+
+    # If no actions are possible it is checkmate if the King is in check,
+    # otherwise it is stalemate
+    if count == 0:
+        if side_in_check(color, board_list):
+            return (-(MATE - ply) if ply % 2 == 0 else MATE - ply, parent)
+        return (0, parent)
+
+    # Only captures that do not lose material are searched in quiescence,
+    # unless in check (then every way out of check is searched). The side to
+    # move doesn't have to capture, so the static score of the position
+    # (standing pat) bounds the node before any capture is tried
+    stand_pat = None
+    if (depth == max_depth and not side_in_check(color, board_list)):
+        stand_pat = score + evaluate_leaf(board_list, color if ply % 2 == 0 else enemy, engine, position_key)
+        if ply % 2 == 0:
+            alpha = max(alpha, stand_pat)
+        else:
+            beta = min(beta, stand_pat)
+        if beta <= alpha:
+            return (stand_pat, parent)
 
-    # Gets a list of valid actions
-    action_list = actions(color, board_list)
+        count = keep_good_captures(board_list, moves, count)
+        if count == 0:
+            return (stand_pat, parent)
 
-    # If no actions are possible, return the score and parent
-    if len(action_list) == 0:
-        return (score, parent)
+    # Searches the best move from an earlier search first, then good captures,
+    # then quiet moves (killers first), then losing captures
+    scores = engine.order_buffers[ply]
+    order_moves(board_list, moves, count, scores, tt_move, engine.get_killers(ply), engine.history)
 
-    # Update the scores for the moves
-    move_dict = get_score(board_list, action_list)
+    # Checks if this state is non-quiescent, so the children get extended
+    is_quiescent = quiescent(board_list, moves, count)
 
     # Checks each action and generates a state based on that move
-    for action in action_list:
-        
-        new_board = next_move(board_list, action, color == "white")
+    for i in range(count):
+        pick_move(moves, scores, i, count)
+        action = moves[i]
 
-        for key, values in move_dict.items(): 
-            if action in values:
-                move_score = key
-                break
+        new_board = make_move(board_list, action, color == "white")
+
+        # Value of the piece captured by the move (0 if none)
+        move_score = TILE_VALS[board_list.board[(action >> 6) & 63]]
 
-        is_quiescent = quiescent(action_list, board_list)
-        
-        # Gets the move(s) that can follow from the current one
-        if (depth == max_depth):
-            child_move = min_max(new_board, enemy, action_list, score, alpha, beta, history_table, is_quiescent, quiescent_lim, depth, max_depth)
+        # Applies a heuristic value to get the material balance after the move
+        new_score = h(ply, move_score, score)
+        new_key = hash_state(new_board, enemy)
+
+        # Gets the move(s) that can follow from the current one, unless the
+        # position is already a draw by repetition or the fifty-move rule
+        if is_draw(new_board, new_key, repetitions):
+            child_move = (0, action)
         else:
-            child_move = min_max(new_board, enemy, action_list, score, alpha, beta, history_table, is_quiescent, quiescent_lim, depth + 1, max_depth)
+            repetitions.append(new_key)
+
+            # Moves that give check are searched a move deeper (with the
+            # extensions limited to the nominal depth, so checks can't go on forever)
+            if (depth == max_depth or (new_board.check and ply + 1 < 2 * max_depth)):
+                child_move = min_max(new_board, enemy, action, new_score, alpha, beta, engine, repetitions, is_quiescent, quiescent_lim, depth, max_depth, ply + 1)
+            else:
+                child_move = min_max(new_board, enemy, action, new_score, alpha, beta, engine, repetitions, is_quiescent, quiescent_lim, depth + 1, max_depth, ply + 1)
+            repetitions.pop()
 
-        # Applies a heuristic value to assess best move options
-        h_val = h(depth, move_score, child_move[0])
+        h_val = child_move[0]
 
         # Used to determine which player is currently moving, the user or the opponent
-        if depth % 2 == 0:
+        if ply % 2 == 0:
             alpha = max(alpha, h_val)
         else:
             beta = min(beta, h_val)
 
         if beta <= alpha:
+            if (depth < max_depth):
+                if not is_capture(board_list, action):
+                    engine.add_cutoff(action, ply, max_depth - depth)
+                engine.tt.store(position_key, max_depth - depth, value_to_tt(h_val, score, ply), LOWER, action)
             return (h_val, action)
 
         # Appends the move dictionary, or empties it if the heuristic is not present
@@ -107,37 +332,244 @@ def min_max(board_list, color, parent, score, alpha, beta, history_table, is_qui
         best_choices[h_val] = best_choices[h_val] + [action]
 
     # Get the selected move from the move dictionary at a specified depth
-    selected = set_min_max(best_choices, depth)
+    selected = set_min_max(best_choices, ply)
+
+    # In quiescence, standing pat is kept over captures that do worse
+    if stand_pat is not None:
+        if (ply % 2 == 0 and stand_pat > selected[0]) or (ply % 2 == 1 and stand_pat < selected[0]):
+            return (stand_pat, parent)
 
     best_choices = {}
 
     best_choices[selected[0]] = [selected[1]]
+
+    # Stores the result: exact unless no move got inside the window (the flag
+    # is for the side to move, so a min node that fails high stores UPPER)
+    if (depth < max_depth):
+        if (ply % 2 == 0 and selected[0] <= alpha_start) or (ply % 2 == 1 and selected[0] >= beta_start):
+            flag = UPPER
+        else:
+            flag = EXACT
+        engine.tt.store(position_key, max_depth - depth, value_to_tt(selected[0], score, ply), flag, selected[1])
     return selected
 
 # Gets the score for all possible moves
 def get_score(board_list, action_list):
-    PIECE_VALS = {"p": 1, "n":3, "b": 3, "r": 5, "q": 9, "k": 10} # Scores by piece
     move_scores = {} # Holds the scores
     for action in action_list:
         # Converts the given move to coordinates
         move = uci_to_coords(action)
-        cap_val = 0 # Value of a capture (0 if none captured)
-        piece = board_list.board[move[2]][move[3]]
+        piece = board_list.board[move[2] * 8 + move[3]]
 
         # Checks through the pieces and their values to assess each piece
         # and assign a score based on if said piece is taken
-        if piece.lower() in PIECES:
-            cap_val = PIECE_VALS[piece.lower()]
-            if cap_val not in move_scores:
-                move_scores[cap_val] = []
-            move_scores[cap_val] = move_scores[cap_val] + [action]
-        elif piece == ".":
-            if cap_val not in move_scores:
-                move_scores[cap_val] = []
-            move_scores[cap_val] = move_scores[cap_val] + [action]
+        cap_val = TILE_VALS[piece] # Value of a capture (0 if none captured)
+        if cap_val not in move_scores:
+            move_scores[cap_val] = []
+        move_scores[cap_val] = move_scores[cap_val] + [action]
 
     return move_scores
 
+# Checks if a move (packed by encode_move) captures an enemy piece
+def is_capture(board_list, action):
+    return board_list.board[(action >> 6) & 63] != EMPTY
+
+# Static exchange evaluation of a move (packed by encode_move): resolves the
+# whole capture sequence on the destination tile, with each side recapturing
+# with its least valuable attacker, and returns the material the moving side
+# wins (or loses)
+def see(board_list, action):
+    origin = action & 63
+    target = (action >> 6) & 63
+    state = board_list.copy()
+    board = state.board
+    row = target >> 3
+    col = target & 7
+
+    piece = board[origin]
+    if piece in WHITE_CHESS_PIECES:
+        sides = [BLACK_CHESS_PIECES, WHITE_CHESS_PIECES]
+    else:
+        sides = [WHITE_CHESS_PIECES, BLACK_CHESS_PIECES]
+
+    # Material swapped off at each step of the exchange
+    gain = [TILE_VALS[board[row * 8 + col]]]
+    board[origin] = EMPTY
+    board[row * 8 + col] = piece
+
+    while True:
+        attackers = get_attackers(state, sides[(len(gain) - 1) % 2], row, col)
+        if len(attackers) == 0:
+            break
+        attacker = min(attackers, key=lambda tile: TILE_VALS[board[tile[0] * 8 + tile[1]]])
+        gain.append(TILE_VALS[board[row * 8 + col]] - gain[-1])
+
+        # Neither side can do better by continuing the exchange
+        if max(-gain[-2], gain[-1]) < 0:
+            break
+
+        board[row * 8 + col] = board[attacker[0] * 8 + attacker[1]]
+        board[attacker[0] * 8 + attacker[1]] = EMPTY
+
+    # Either side may stop capturing whenever continuing would lose material
+    for i in range(len(gain) - 1, 0, -1):
+        gain[i - 1] = -max(-gain[i - 1], gain[i])
+    return gain[0]
+
+# Keeps only the captures that do not lose material, moved to the start of the
+# moves buffer, and returns how many there are
+def keep_good_captures(board_list, moves, count):
+    kept = 0
+    for i in range(count):
+        action = moves[i]
+        if is_capture(board_list, action) and see(board_list, action) >= 0:
+            moves[kept] = action
+            kept = kept + 1
+    return kept
+
+# Ordering scores of each stage, far enough apart that the stages never mix
+ORDER_TT_MOVE = 3 << 40
+ORDER_GOOD_CAPTURE = 2 << 40
+ORDER_KILLER = 1 << 40
+
+# Scores moves for ordering in stages: the best move found by an earlier
+# search, captures that win or trade material (best first), killer moves, the
+# other quiet moves (by history score), then captures that lose material
+def order_moves(board_list, moves, count, scores, tt_move=None, killers=(), history=None):
+    for i in range(count):
+        action = moves[i]
+        if action == tt_move:
+            scores[i] = ORDER_TT_MOVE
+        elif action in killers:
+            scores[i] = ORDER_KILLER
+        elif is_capture(board_list, action):
+            value = see(board_list, action)
+            scores[i] = ORDER_GOOD_CAPTURE + value if value >= 0 else value
+        else:
+            scores[i] = history.get(action, 0) if history else 0
+
+# Moves the best scored of the moves not searched yet to the given index, so
+# a node that cuts off early only looks for the few moves it searches
+def pick_move(moves, scores, index, count):
+    best = index
+    for i in range(index + 1, count):
+        if scores[i] > scores[best]:
+            best = i
+    if best != index:
+        moves[index], moves[best] = moves[best], moves[index]
+        scores[index], scores[best] = scores[best], scores[index]
+
+# Gets the material balance of the board for the given color
+# (both Kings are always on the board, so they cancel out)
+def material(board_list, color):
+    balance = 0
+    for piece in board_list.board:
+        if piece in WHITE_CHESS_PIECES:
+            balance = balance + TILE_VALS[piece]
+        elif piece != EMPTY:
+            balance = balance - TILE_VALS[piece]
+    return balance if color == "white" else -balance
+
+# Gets the positional score of the board for the given color, from the attack
+# map shared with move validation
+def evaluate(board_list, color):
+    enemy = "black" if color == "white" else "white"
+    attack_map = get_attack_map(board_list)
+    mobility = attack_map.mobility(color) - attack_map.mobility(enemy)
+    king_danger = attack_map.king_danger(enemy, board_list) - attack_map.king_danger(color, board_list)
+    return MOBILITY_WEIGHT * mobility + KING_DANGER_WEIGHT * king_danger
+
+# Gets the terms the static evaluation (material plus evaluate) of the board
+# for white adds up: how many more of each piece (in PIECES order) white has,
+# then its mobility and King danger terms, so the evaluation is their sum
+# weighted by evaluation_weights()
+def evaluation_features(board_list):
+    counts = dict.fromkeys(PIECES, 0)
+    for piece in board_list.board:
+        if piece != EMPTY:
+            name = chr(piece)
+            if name.lower() in counts:
+                counts[name.lower()] = counts[name.lower()] + (1 if name.isupper() else -1)
+    attack_map = get_attack_map(board_list)
+    mobility = attack_map.mobility("white") - attack_map.mobility("black")
+    king_danger = attack_map.king_danger("black", board_list) - attack_map.king_danger("white", board_list)
+    return [counts[piece] for piece in PIECES] + [mobility, king_danger]
+
+# Gets the current weight of each term of evaluation_features
+def evaluation_weights():
+    return [PIECE_VALS[piece] for piece in PIECES] + [MOBILITY_WEIGHT, KING_DANGER_WEIGHT]
+
+# Gets the positional score of a leaf for the given color, reusing the
+# engine's cached score (for white) when the position was evaluated before
+def evaluate_leaf(board_list, color, engine, key):
+    value = engine.eval_cache.get(key)
+    if value is None:
+        value = evaluate(board_list, "white")
+        engine.eval_cache[key] = value
+    return value if color == "white" else -value
+
+# Converts a score to how it is kept in the transposition table: for the side
+# to move, and relative to the material balance of the line that reached the
+# position (or, for mates, to the position itself) so it fits any other line
+def value_to_tt(value, score, ply):
+    sign = 1 if ply % 2 == 0 else -1
+    if value >= MATE - MAX_PLY:
+        return sign * (value + ply)
+    if value <= -(MATE - MAX_PLY):
+        return sign * (value - ply)
+    return sign * (value - score)
+
+# Converts a score kept in the transposition table back for the current line
+def value_from_tt(value, score, ply):
+    value = value if ply % 2 == 0 else -value
+    if value >= MATE - MAX_PLY:
+        return value - ply
+    if value <= -(MATE - MAX_PLY):
+        return value + ply
+    return value + score
+
+# Checks if a position is drawn by the fifty-move rule or has already been
+# reached since the last capture or Pawn move
+def is_draw(board_list, key, repetitions):
+    if board_list.halfmove >= 100:
+        return True
+    return board_list.halfmove >= 4 and key in repetitions[-board_list.halfmove:]
+
+# Gets the hash of every position the game has reached, ending with the one
+# being searched. Only the moves played since the engine's last search are
+# replayed, from the position it searched (or from the start, on its first),
+# and the replay always ends on the real position: a move the replay gets
+# wrong (promotions and Black's long castle, see make_move) costs at most the
+# hash of the position in between, and is reported.
+def game_hashes(engine, board_list, color, history):
+    key = hash_state(board_list, color)
+    if engine.game_position is None or engine.game_position[2] > len(history):
+        state = parse_board(START_BOARD.split('/'))
+        state_color = "white"
+        played = 0
+        hashes = [hash_state(state, state_color)]
+    else:
+        state, state_color, played = engine.game_position
+        hashes = engine.game_hashes
+
+    for move in history[played:]:
+        state = next_move(state, move, state_color == "white")
+        state_color = "black" if state_color == "white" else "white"
+        hashes.append(hash_state(state, state_color))
+
+    # (a first search from a position other than the start has nothing to
+    # replay, so it just starts from that position)
+    if hashes[-1] != key:
+        if played < len(history):
+            sys.stderr.write("Warning: replaying {} did not reach the game's position, so a repetition of the position before it may be missed\n".format(" ".join(history[played:])))
+        hashes[-1] = key
+
+    engine.game_hashes = hashes
+    engine.game_position = (board_list, color, len(history))
+
+    # The search pushes and pops its own line onto a copy
+    return list(hashes)
+
 # Heuristic function that determines whether a move will result in a gain to the player or not
 def h(depth, parent, child):
     gain = 0
@@ -160,58 +592,18 @@ def set_min_max(move_scores, depth):
     # Gets a list of all moves with a given score (best score)
     moves_with_score = move_scores[score]
 
-    # If multiple moves have the same score (best score), picks a move among those 
-    # with the same score and runs with it, otherwise takes the best score
-    if len(moves_with_score) > 1:
-        move = random.choice(moves_with_score)
-    else:
-        move = moves_with_score[0]
+    # If multiple moves have the same score (best score), picks the first one
+    # searched, as the later ones may have been cut off at that score (or at a
+    # mate distance bound) and only be proven to be no better
+    move = moves_with_score[0]
 
     return (score, move)
 
-# Gets the time to complete a turn
-def estimated_time(history, remaining_time, max_time):
-    avg_moves = 50 # Basing on an average of a 50 turn game
-    start_time = time.time()
-    moves_made = round(len(history) / 2)
-    if moves_made <= 10: # Early game moves
-        alloted_time = max_time / (2 * avg_moves)
-    elif moves_made <= 30: # Midgame moves
-        alloted_time = remaining_time * (1 / avg_moves)
-    else: # Endgame moves
-        alloted_time = remaining_time * (1 / (2 * avg_moves))
-    
-    elapsed = time.time() - start_time
-    alloted_time = alloted_time - elapsed
-    return alloted_time
-
 # Function for quiescent search, returns true if state is non-quiescence
-# and false if state is quiescence
-def quiescent(move, board_list):
-    move_dict = get_score(board_list, move)
-    for key in move_dict:
-        move_score = key
-    
-    if move_score >= 3:
-        return True
-    return False
-
-# Adds the next move to be made to the history table
-def add_history(history_table, board_list, move):
-    for list in history_table:
-        if list[0] == board_list.board:
-            if list[1] == move:
-                index_val = history_table.index(list)
-                history_table[index_val][2] = history_table[index_val][2] + 1
-                return
-    board_list.board = [x[:] for x in board_list.board]
-    history_table.append([board_list.board, move, 1])
-
-# Used to find a value within the history table
-def find_history(history_table, board_list, move):
-    for list in history_table:
-        if list[0] == board_list.board:
-            if list[1] == move:
-                index_val = history_table.index(list)
-                return history_table[index_val][2]
-    return 0
\ No newline at end of file
+# and false if state is quiescence (no capture wins a minor piece's worth)
+def quiescent(board_list, moves, count):
+    for i in range(count):
+        action = moves[i]
+        if is_capture(board_list, action) and see(board_list, action) >= 3:
+            return True
+    return False
\ No newline at end of file
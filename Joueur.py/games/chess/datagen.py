@@ -0,0 +1,106 @@
+# Self-play dataset generation: plays games between copies of the engine in
+# a pool of processes and writes every searched position, with the search's
+# score and the game's result, to a file of fixed-size records. The records
+# have no header or separators, so the file can be mapped into memory with
+# numpy (load_dataset) and sliced like an array, or read record by record
+# without numpy (read_positions).
+#
+# Run from the Joueur.py folder (positions are added to the end of the file):
+#   python3 -m games.chess.datagen [--games N] [--workers N] [--out selfplay.bin]
+import argparse
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from games.chess.movement import GameState
+from games.chess.selfplay import play_game, random_opening, DEFAULT_MAX_PLIES
+
+# Tile contents by their 4-bit code in a packed board (0 is an empty tile)
+PIECE_CODES = b".PRNBQKprnbqk"
+CODES = {piece: code for code, piece in enumerate(PIECE_CODES)}
+
+# A record: the board packed two tiles to a byte (tile index row * 8 + col,
+# low half first), the side to move (0 for white, 1 for black), the result
+# for white (1 won, 0 drawn, -1 lost) and the search's score for white
+RECORD = struct.Struct("<32sBbf")
+RECORD_SIZE = RECORD.size
+
+# Results for white (as play_game gets them) by their outcome in a record
+OUTCOMES = {1: 1, 0.5: 0, 0: -1}
+
+# Packs a board into 32 bytes
+def pack_board(board):
+    packed = bytearray(32)
+    for i in range(32):
+        packed[i] = CODES[board[2 * i]] | (CODES[board[2 * i + 1]] << 4)
+    return bytes(packed)
+
+# Unpacks a board from its 32 bytes
+def unpack_board(packed):
+    board = bytearray(64)
+    for i in range(32):
+        board[2 * i] = PIECE_CODES[packed[i] & 15]
+        board[2 * i + 1] = PIECE_CODES[packed[i] >> 4]
+    return board
+
+# Packs a position, the search's score for the side to move and the result
+# for white into a record
+def pack_record(chess_board, color, score, result):
+    side = 0 if color == "white" else 1
+    return RECORD.pack(pack_board(chess_board.board), side, OUTCOMES[result], score if side == 0 else -score)
+
+# Reads the records of a dataset one at a time as (state, color, score,
+# result), with the score and result (1, 0.5 or 0) for white. Castling rights
+# and en passant are not kept, so the states have none.
+def read_positions(path):
+    with open(path, "rb") as dataset_file:
+        while True:
+            record = dataset_file.read(RECORD_SIZE)
+            if len(record) < RECORD_SIZE:
+                break
+            packed, side, outcome, score = RECORD.unpack(record)
+            state = GameState(unpack_board(packed), False, False, False, False, None, 0)
+            yield state, "white" if side == 0 else "black", score, (outcome + 1) / 2
+
+# Maps a dataset into memory as a numpy record array with the fields
+# "board", "side", "outcome" and "score" (numpy is only needed here)
+def load_dataset(path):
+    import numpy as np
+    dtype = np.dtype([("board", np.uint8, 32), ("side", np.uint8), ("outcome", np.int8), ("score", "<f4")])
+    return np.memmap(path, dtype=dtype, mode="r", shape=(os.path.getsize(path) // RECORD_SIZE,))
+
+# Plays a game from a random opening and gets its positions as records
+def play_task(task):
+    seed, opening_plies, seconds, increment, max_plies = task
+    positions = []
+    result = play_game({}, {}, random_opening(seed, opening_plies), seconds, increment, max_plies, positions)
+    return b"".join(pack_record(state, color, score, result) for state, color, score in positions)
+
+# Plays the games given on the command line and writes their positions
+def main():
+    parser = argparse.ArgumentParser(description="Writes positions from self-play games to a fixed-record dataset.")
+    parser.add_argument("-n", "--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-o", "--out", default="selfplay.bin", help="file the positions are added to")
+    parser.add_argument("--seconds", type=float, default=5, help="time on each side's clock at the start of a game")
+    parser.add_argument("--increment", type=float, default=0.05, help="time added to a side's clock each move")
+    parser.add_argument("--opening-plies", type=int, default=8, help="random moves played to start each game")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES, help="moves after which a game is a draw")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the openings")
+    args = parser.parse_args()
+
+    start = time.time()
+    games = 0
+    positions = 0
+    with ProcessPoolExecutor(args.workers) as pool, open(args.out, "ab") as dataset_file:
+        tasks = [pool.submit(play_task, (args.seed * 1000003 + i, args.opening_plies, args.seconds, args.increment, args.max_plies)) for i in range(args.games)]
+        for future in as_completed(tasks):
+            records = future.result()
+            dataset_file.write(records)
+            dataset_file.flush()
+            games = games + 1
+            positions = positions + len(records) // RECORD_SIZE
+            print("game {} of {}: {} positions ({:.1f} positions/s)".format(games, args.games, positions, positions / (time.time() - start)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Search state kept for the whole game, so what one search learns (the
+# transposition table, move ordering tables and caches) is reused by the next
+from array import array
+from games.chess.movement import new_move_buffer, MAX_MOVES
+from games.chess.move_cache import MoveCache, DEFAULT_MOVE_CACHE_SIZE
+from games.chess.transposition import TranspositionTable, DEFAULT_TT_SIZE
+from games.chess.time_manager import TimeManager
+
+# Deepest ply the killer moves are kept for
+MAX_PLY = 128
+
+# Number of leaf evaluations kept before the cache is emptied
+DEFAULT_EVAL_CACHE_SIZE = 100000
+
+# A transposition table can be given to use in place of a new one (e.g. one
+# shared with other processes), and workers is the number of processes that
+# search each position (more than one needs a shared table, and the other
+# processes are kept as the engine's helpers). The time manager is kept too,
+# so it can tell how much time the clock gains each move.
+class Engine:
+    def __init__(self, move_cache_size=DEFAULT_MOVE_CACHE_SIZE, tt_size=DEFAULT_TT_SIZE, eval_cache_size=DEFAULT_EVAL_CACHE_SIZE, tt=None, workers=1, time_manager=None):
+        self.tt = tt if tt is not None else TranspositionTable(tt_size)
+        self.workers = workers
+        self.time_manager = time_manager if time_manager is not None else TimeManager()
+        self.move_cache = MoveCache(move_cache_size)
+        self.killers = [[] for i in range(MAX_PLY)] # Quiet moves that caused a cutoff, per ply
+        self.history = {} # Move -> how often (and how deep) it caused a cutoff
+        self.eval_cache = {} # Position hash -> positional score for white
+        self.eval_cache_size = eval_cache_size
+
+        # Hashes of the positions the game has reached (oldest first), kept
+        # from one search to the next along with the position they end at, as
+        # (state, color to move, number of moves played)
+        self.game_hashes = []
+        self.game_position = None
+
+        # The helper processes searching with this engine (see
+        # algorithm.HelperPool), started by the first search that uses them
+        self.helpers = None
+
+        # For an engine searching as a helper, the event telling it to stop,
+        # and the count of nodes searched (to check the event every so often)
+        self.stop = None
+        self.nodes = 0
+
+        # Moves and their ordering scores for each ply, made once and reused
+        # by every node searched at that ply
+        self.move_buffers = [new_move_buffer() for i in range(MAX_PLY)]
+        self.order_buffers = [array("d", bytes(8 * MAX_MOVES)) for i in range(MAX_PLY)]
+
+    # Starts the search for a new turn: older transposition table entries get
+    # replaced first, history scores are halved, and the killer moves are
+    # shifted by the two plies played since the last search
+    def new_search(self):
+        self.tt.new_search()
+        self.killers = self.killers[2:] + [[], []]
+        for move in self.history:
+            self.history[move] = self.history[move] // 2
+        if len(self.eval_cache) > self.eval_cache_size:
+            self.eval_cache = {}
+
+    # Records a quiet move that caused a cutoff at the given ply and depth
+    def add_cutoff(self, move, ply, depth):
+        if ply < MAX_PLY and move not in self.killers[ply]:
+            self.killers[ply] = [move] + self.killers[ply][:1]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    # Gets the killer moves for a ply
+    def get_killers(self, ply):
+        return self.killers[ply] if ply < MAX_PLY else []
+
+    # Stops the helper processes, releases the transposition table if it is
+    # in shared memory, and closes the time manager's telemetry file
+    def close(self):
+        if self.helpers is not None:
+            self.helpers.close()
+            self.helpers = None
+        if hasattr(self.tt, "close"):
+            self.tt.close()
+        self.time_manager.close()
+
+    # Gets the statistics of the tables and caches as a printable string
+    def stats(self):
+        return self.tt.stats() + "\n" + self.move_cache.stats()
@@ -0,0 +1,41 @@
+# Cache of the legal moves generated for each position, keyed by position hash,
+# so positions searched again (e.g. by each iterative-deepening pass) skip movegen
+from collections import OrderedDict
+from games.chess.movement import generate_moves
+
+# Number of positions kept when no size is given through the AI settings
+DEFAULT_MOVE_CACHE_SIZE = 50000
+
+class MoveCache:
+    def __init__(self, size=DEFAULT_MOVE_CACHE_SIZE):
+        self.size = size
+        self.moves = OrderedDict() # Least recently used positions first
+        self.hits = 0
+        self.misses = 0
+
+    # Gets the valid moves for a position (packed by encode_move) into the
+    # moves buffer, generating them if not cached, and returns how many there are
+    def generate_moves(self, key, color, chess_board, moves):
+        cached = self.moves.get(key)
+        if cached is not None:
+            self.moves.move_to_end(key)
+            self.hits = self.hits + 1
+            count = len(cached)
+            moves[:count] = cached
+            return count
+
+        self.misses = self.misses + 1
+        # Stored as a copy of just the moves (an array of 2 bytes per move)
+        count = generate_moves(color, chess_board, moves)
+        self.moves[key] = moves[:count]
+
+        # Evicts the least recently used position once over the size cap
+        if len(self.moves) > self.size:
+            self.moves.popitem(last=False)
+        return count
+
+    # Gets the hit and miss counts as a printable string
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = (100 * self.hits / lookups) if lookups else 0
+        return "move cache: {} hits, {} misses ({:.1f}% hit rate), {} positions stored".format(self.hits, self.misses, rate, len(self.moves))
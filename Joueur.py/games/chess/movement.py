@@ -1,53 +1,85 @@
 # Used for the rank, file, and colors of the pieces for board structure
+from array import array
 from typing import Optional
 
 CHESS_RANK = ["a", "b", "c", "d", "e", "f", "g", "h"]
 CHESS_FILE = ["1", "2", "3", "4", "5", "6", "7", "8"]
-WHITE_CHESS_PIECES = ["P", "R", "N", "B", "Q", "K"]
-BLACK_CHESS_PIECES = ["p", "r", "n", "b", "q", "k"]
+
+# Pieces are stored on the board by their byte value, so indexing the piece
+# lists (or the board) gives an int and membership tests work on ints
+EMPTY = ord(".")
+WHITE_CHESS_PIECES = b"PRNBQK"
+BLACK_CHESS_PIECES = b"prnbqk"
 PROMOTION_POSSIBILITIES = ["r", "n", "b", "q"]
 
 # State with:
-# Board
+# Board (64 bytes, one per tile, indexed by row * 8 + col)
 # Bool for castle (both sides)
 # Tuple for if En Passant is possible (tile the pawn moved to)
+# Halfmove clock (moves since the last capture or Pawn move, for the fifty-move rule)
+# Attack map of the board (built when first needed, never copied to the next state)
+# Bool for if the side to move is in check (None until known, set by make_move)
 class GameState:
-    board: list
+    __slots__ = ("board", "white_castle_king", "white_castle_queen", "black_castle_king", "black_castle_queen", "en_passant", "halfmove", "attacks", "check")
+
+    board: bytearray
     white_castle_king: bool
     white_castle_queen: bool
     black_castle_king: bool
     black_castle_queen: bool
     en_passant: Optional[tuple]
+    halfmove: int
+    attacks: Optional['AttackMap']
+    check: Optional[bool]
 
-    def __init__(self, board, white_castle_king, white_castle_queen, black_castle_king, black_castle_queen, en_passant):
-        self.board = [[j for j in board[i]] for i in range(len(board))] 
+    def __init__(self, board, white_castle_king, white_castle_queen, black_castle_king, black_castle_queen, en_passant, halfmove=0):
+        self.board = bytearray(board)
         self.white_castle_king = white_castle_king
         self.white_castle_queen = white_castle_queen
         self.black_castle_queen = black_castle_queen 
         self.black_castle_king = black_castle_king
         self.en_passant = en_passant 
+        self.halfmove = halfmove
+        self.attacks = None
+        self.check = None
     
     def copy(self) -> 'GameState':
-        return GameState(self.board, self.white_castle_king, self.white_castle_queen, self.black_castle_king, self.black_castle_queen, self.en_passant)
+        return GameState(self.board[:], self.white_castle_king, self.white_castle_queen, self.black_castle_king, self.black_castle_queen, self.en_passant, self.halfmove)
 
 # Builds a board based on the fen string provided
-def parse_board(board_list):
+def parse_board(board_list, halfmove=0):
     # Set board to make white the lower part of the board
     board_list.reverse()
-    temp = []
     new_board = []
     for row in board_list:
         for index in row:
             if (index.isnumeric()):
                 for i in range(int(index)):
-                    temp.append(".")
+                    new_board.append(".")
             else:
-                temp.append(index)
-        new_board.append(temp)
-        temp = []
-    state = GameState(new_board, True, True, True, True, None)
+                new_board.append(index)
+    state = GameState("".join(new_board).encode(), True, True, True, True, None, halfmove)
     return state
 
+# Builds a state and the color to move from a fen (or EPD) string
+def parse_fen(fen):
+    fields = fen.split()
+    halfmove = int(fields[4]) if len(fields) > 4 else 0
+    state = parse_board(fields[0].split("/"), halfmove)
+    color = "white" if fields[1] == "w" else "black"
+
+    castling = fields[2] if len(fields) > 2 else "-"
+    state.white_castle_king = "K" in castling
+    state.white_castle_queen = "Q" in castling
+    state.black_castle_king = "k" in castling
+    state.black_castle_queen = "q" in castling
+
+    # The fen gives the tile passed over, the state keeps the tile moved to
+    if len(fields) > 3 and fields[3] != "-":
+        row = int(fields[3][1]) - 1
+        state.en_passant = (row + (1 if row == 2 else -1), CHESS_RANK.index(fields[3][0]))
+    return state, color
+
 # UCI format to grid coordinates
 def uci_to_coords(uci_str):
 
@@ -77,6 +109,24 @@ def uci_to_coords(uci_str):
 def coords_to_uci(row, col):
     return (CHESS_RANK[col] + CHESS_FILE[row])
 
+# Packs a UCI move into 16 bits: the tile moved from, the tile moved to, and
+# the promotion piece (0 for none, else its index in PROMOTION_POSSIBILITIES + 1)
+def encode_move(uci_str):
+    move = uci_to_coords(uci_str)
+    promotion = 0
+    if (len(uci_str) > 4 and uci_str[-1] in PROMOTION_POSSIBILITIES):
+        promotion = PROMOTION_POSSIBILITIES.index(uci_str[-1]) + 1
+    return (move[0] * 8 + move[1]) | (move[2] * 8 + move[3]) << 6 | promotion << 12
+
+# Unpacks a move packed by encode_move back to UCI
+def decode_move(code):
+    origin = code & 63
+    target = (code >> 6) & 63
+    move = coords_to_uci(origin // 8, origin % 8) + coords_to_uci(target // 8, target % 8)
+    if (code >> 12):
+        move = move + PROMOTION_POSSIBILITIES[(code >> 12) - 1]
+    return move
+
 # Cleans up the UCI string to a simple 4 character form
 def clean(uci_str):
     move = uci_str
@@ -87,216 +137,107 @@ def clean(uci_str):
             move = move[:-1]
     return move
 
-# Gets all moves the Pawns can make
-def get_pawn_moves(chess_board: GameState, my_pieces, enemy_pieces, row, col):
-
-    # Lists to each contain possible moves for a Pawn, whether it be 
-    # first move forward 2, attacking forward left, forward right, or 
-    # simply moving forward once, and stopping if blocked directly
-    valid_tiles = []
-    stay_column = []
-    move_range = 2
-    forward_moves = []
-    diagonal = []
-    right_forward = []
-    left_forward = []
-    if (my_pieces[0].isupper()):
-        # First move Pawn can move forward 2 tiles
-        if (row == 1):
-            move_range = 3
-
-        # Update list for range of movement
-        for i in range(move_range):
-            stay_column.append(col)
-
-        # Move White Pawn forward
-        if (row + 1 < 8):
-            forward_moves = [zip(range(row + 1, row + move_range), stay_column)]
-            # Check forward to the right
-            if (col + 1 < 8):
-                right_forward = [zip(range(row + 1, row + 2), range(col + 1, col + 2))]
-            # Check forward to the left
-            if (col - 1 > -1):
-                left_forward = [zip(range(row + 1, row + 2), range(col - 1, col - 2, -1)),]
-                
-            # Add to diagonal options
-            diagonal = right_forward + left_forward
-    else:
-        # First move Pawn can move forward 2 tiles
-        if (row == 6):
-            move_range = 3
-
-        # Update list for range of movement
-        for i in range(move_range):
-            stay_column.append(col)
-
-        # Move Black Pawn forward
-        if (row - 1 > -1):
-            forward_moves = [zip(range(row - 1, row - move_range, - 1), stay_column)]
-
-            # Check forward to the right
-            if (col + 1 < 8):
-                right_forward = [zip(range(row - 1, row - 2, - 1), range(col + 1, col + 2))]
-            # Check forward to the left
-            if (col - 1 > -1):
-                left_forward = [zip(range(row - 1, row - 2, - 1), range(col - 1, col - 2, -1)),]
-                
-            # Add to diagonal options
-            diagonal = right_forward + left_forward
-
-    # Check for En Passant and add if possible
-    if chess_board.en_passant:
-        row_e, col_e = chess_board.en_passant
-        if (row_e + 1 == row or row_e - 1 == row) and chess_board.board[row][col].isupper() != my_pieces[0].isupper():
-            new_col = col_e - 1 if my_pieces[0].isupper() else col_e + 1 
-            valid_tiles.append(coords_to_uci(row, col) + coords_to_uci(row_e, new_col))
-
-    # Build list of forward moves
-    for direction in forward_moves:
-        for pair in direction:
-            # Stop if Pawn runs into own piece in front of it
-            if (chess_board.board[pair[0]][pair[1]] in my_pieces or chess_board.board[pair[0]][pair[1]] in enemy_pieces):
-                break
-            if (pair[0] == 7 or pair[0] == 0):
-                for piece in PROMOTION_POSSIBILITIES: 
-                    valid_tiles.append(coords_to_uci(row, col) + coords_to_uci(pair[0], pair[1]) + piece)
-            else:
-                valid_tiles.append(coords_to_uci(row, col) + coords_to_uci(pair[0], pair[1]))
-    
-    # Build list of diagonal moves
-    for direction in diagonal:
-        for pair in direction:
-            # Stop if Pawn runs into an enemy piece in front of it
-            if (chess_board.board[pair[0]][pair[1]] in enemy_pieces):
-                if (pair[0] == 7 or pair[0] == 0):
-                    for piece in PROMOTION_POSSIBILITIES: 
-                        valid_tiles.append(coords_to_uci(row, col) + coords_to_uci(pair[0], pair[1]) + piece)
-                else:
-                    valid_tiles.append(coords_to_uci(row, col) + coords_to_uci(pair[0], pair[1]))
+# Gets all moves the Pawns can make, writing them to the moves buffer from
+# the given count, and returns the new count
+def get_pawn_moves(chess_board: GameState, my_pieces, enemy_pieces, row, col, moves, count):
+    board = chess_board.board
+    origin = row * 8 + col
 
-    return valid_tiles
+    # Pawns move up the board for white and down for black, and can move
+    # forward 2 tiles on their first move
+    if (my_pieces == WHITE_CHESS_PIECES):
+        side = 1
+        move_range = 2 if row == 1 else 1
+    else:
+        side = -1
+        move_range = 2 if row == 6 else 1
+    new_row = row + side
+    if not (-1 < new_row < 8):
+        return count
+
+    # En Passant captures are not generated yet (see next_move)
+
+    # Move forward, stopping if blocked directly
+    for i in range(1, move_range + 1):
+        target = (row + side * i) * 8 + col
+        if (board[target] != EMPTY):
+            break
+        count = add_pawn_move(origin, target, moves, count)
+
+    # Attack forward right and forward left
+    for new_col in (col + 1, col - 1):
+        if (-1 < new_col < 8 and board[new_row * 8 + new_col] in enemy_pieces):
+            count = add_pawn_move(origin, new_row * 8 + new_col, moves, count)
+
+    return count
+
+# Writes a Pawn move to the moves buffer, once for each promotion if it
+# reaches the last row, and returns the new count
+def add_pawn_move(origin, target, moves, count):
+    if (target < 8 or target > 55):
+        for promotion in range(1, len(PROMOTION_POSSIBILITIES) + 1):
+            moves[count] = origin | target << 6 | promotion << 12
+            count = count + 1
+    else:
+        moves[count] = origin | target << 6
+        count = count + 1
+    return count
 
 # Gets all moves for the Knights
-def get_knight_moves(chess_board: GameState, enemy_pieces, row, col):
-    directions = [(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2)]
-    valid_tiles = []
-    for (x, y) in directions:
-        x_new = row + x
-        y_new = col + y
-        if (-1 < x_new < 8 and -1 < y_new < 8):
-            if (chess_board.board[x_new][y_new] == "." or chess_board.board[x_new][y_new] in enemy_pieces):
-                valid_tiles.append(coords_to_uci(row, col) + coords_to_uci(x_new, y_new))
-
-    return valid_tiles
-
-# Gets diagonal directions (used for Bishop, King, and Queen)
-def get_bishop_moves(chess_board: GameState, my_pieces, enemy_pieces, king, row, col):
-
-    # Diagonal direction lists
-    n_e = []
-    n_w = []
-    s_e = []
-    s_w = []
-
-    # Keeps track of valid movement tiles and diagonals
-    valid_tiles = []
-    diagonal = []
-
-    # Determines diagonal movement based on if the piece being moved is or isn't a King
-    if (king):
-        row_edge_up = row + 2
-        row_edge_down = row - 2
-        col_edge_right = col + 2
-        col_edge_left = col - 2
-    else:
-        row_edge_up = 8
-        row_edge_down = -1
-        col_edge_right = 8
-        col_edge_left = -1
-    
-    # Generating diagonal movement
-    if (row + 1 < 8):
-
-        if (col + 1 < 8):
-            n_e = [zip(range(row + 1, row_edge_up), range(col + 1, col_edge_right))]
-        if (col - 1 > -1):
-            n_w = [zip(range(row + 1, row_edge_up), range(col - 1, col_edge_left, -1))]    
-    if (row - 1 > -1):
-        if (col + 1 < 8):
-            s_e = [zip(range(row - 1, row_edge_down, - 1), range(col + 1, col_edge_right))]
-        if (col - 1 > -1):
-            s_w = [zip(range(row - 1, row_edge_down, - 1), range(col - 1, col_edge_left, -1))]
-    
-    # Assigns diagonal directions
-    diagonal = n_e + n_w + s_w + s_e
+def get_knight_moves(chess_board: GameState, my_pieces, row, col, moves, count):
+    board = chess_board.board
+    origin = row * 8 + col
+    for target in KNIGHT_ATTACKS[origin]:
+        if (board[target] not in my_pieces):
+            moves[count] = origin | target << 6
+            count = count + 1
+    return count
+
+# Gets the moves along each of the given rays from a tile, stopping at the
+# first piece in each (used for Bishop, Rook, and Queen)
+def get_slider_moves(chess_board: GameState, my_pieces, origin, rays, moves, count):
+    board = chess_board.board
+    for directions in rays:
+        for target in directions[origin]:
+            piece = board[target]
 
-    for direction in diagonal:
-        for pair in direction:
             # Stop if it runs into own piece
-            if (chess_board.board[pair[0]][pair[1]] in my_pieces):
+            if (piece in my_pieces):
                 break
 
-            valid_tiles.append(coords_to_uci(row, col) + coords_to_uci(pair[0], pair[1]))
+            moves[count] = origin | target << 6
+            count = count + 1
 
             # Stop if it runs into enemy piece
-            if (chess_board.board[pair[0]][pair[1]] in enemy_pieces):
+            if (piece != EMPTY):
                 break
-    return valid_tiles
-
-# Gets cardinal directions (Used for Rook, King, Queen, and Pawn)
-def get_rook_moves(chess_board: GameState, my_pieces, enemy_pieces, king, row, col):
-    
-    # Determines cardinal movement based on if the piece being moved is or isn't a King
-    if (king):
-        row_edge_up = row + 2
-        row_edge_down = row - 2
-        col_edge_left = col -2
-        col_edge_right = col + 2
-    else:
-        row_edge_up = 8
-        row_edge_down = -1
-        col_edge_left = -1
-        col_edge_right = 8
-
-    # Cardinal directions lists
-    valid_tiles = []
-    right_move = []
-    left_move = []
-    up_move = []
-    down_move = []
-
-    # Checks all spaces in a straight line each cardinal direction of the King
-    for i in range(col + 1, 8):
-        right_move.append(row)
-
-    for i in range(col - 1, -1, -1):
-        left_move.append(row)
+    return count
 
-    for i in range(row + 1, 8):
-        up_move.append(col)
-
-    for i in range(row - 1, -1, -1):
-        down_move.append(col)
+# Gets diagonal moves (used for Bishop and Queen)
+def get_bishop_moves(chess_board: GameState, my_pieces, row, col, moves, count):
+    return get_slider_moves(chess_board, my_pieces, row * 8 + col, DIAGONAL_RAYS, moves, count)
 
-    directions = [  
-                    zip(right_move, range(col + 1, col_edge_right)),
-                    zip(left_move, range(col -1, col_edge_left, -1)),
-                    zip(range(row + 1, row_edge_up), up_move),
-                    zip(range(row - 1, row_edge_down, -1), down_move)
-                ]
+# Gets cardinal moves (used for Rook and Queen)
+def get_rook_moves(chess_board: GameState, my_pieces, row, col, moves, count):
+    return get_slider_moves(chess_board, my_pieces, row * 8 + col, CARDINAL_RAYS, moves, count)
 
-    for direction in directions:
-        for pair in direction:
-            # Stop if it runs into own piece 
-            if (chess_board.board[pair[0]][pair[1]] in my_pieces):
-                break
+# Gets all moves the Queen(s) can make
+def get_queen_moves(chess_board: GameState, my_pieces, row, col, moves, count):
 
-            valid_tiles.append(coords_to_uci(row, col) + coords_to_uci(pair[0], pair[1]))
+    # Checks every direction the Queen(s) could theoretically move
+    count = get_rook_moves(chess_board, my_pieces, row, col, moves, count)
+    return get_bishop_moves(chess_board, my_pieces, row, col, moves, count)
 
-            # Stop if it runs into enemy piece
-            if (chess_board.board[pair[0]][pair[1]] in enemy_pieces):
-                break
+# Get all moves the King can make
+def get_king_moves(chess_board: GameState, my_pieces, row, col, moves, count):
+    board = chess_board.board
+    origin = row * 8 + col
+    for target in KING_ATTACKS[origin]:
+        if (board[target] not in my_pieces):
+            moves[count] = origin | target << 6
+            count = count + 1
 
+    # Get Castle Moves Here?
     # Castling is broken (horizontal check is an issue, working to fix it before final assignment)
 
     # If player's pieces are white, checks for white castling
@@ -323,30 +264,7 @@ def get_rook_moves(chess_board: GameState, my_pieces, enemy_pieces, king, row, c
     #            if chess_board.board[7][3] == '.' and chess_board.board[7][2] == '.' and chess_board.board[7][1] == '.':
     #                if (check_cardinal(chess_board, my_pieces, enemy_pieces, 7, 3) and check_cardinal(chess_board, my_pieces, enemy_pieces, 7, 2) and check_cardinal(chess_board, my_pieces, enemy_pieces, 7, 1)) == False:
     #                    valid_tiles.append('e8c8')
-
-    return valid_tiles
-
-# Gets all moves the Queen(s) can make
-def get_queen_moves(chess_board: GameState, my_pieces, enemy_pieces, row, col):
-
-    # Checks every direction the Queen(s) could theoretically move
-    cardinal_moves = get_rook_moves(chess_board, my_pieces, enemy_pieces, False, row, col)
-    diagonal_moves = get_bishop_moves(chess_board, my_pieces, enemy_pieces, False, row, col)
-    valid_moves = cardinal_moves + diagonal_moves
-    return valid_moves
-
-# Get all moves the King can make
-def get_king_moves(chess_board: GameState, my_pieces, enemy_pieces, row, col):
-
-    # Checks every direction the King could theoretically move
-    diagonal = get_bishop_moves(chess_board, my_pieces, enemy_pieces, True, row, col)
-    cardinal = get_rook_moves(chess_board, my_pieces, enemy_pieces, True, row, col)
-    prelim_moves = diagonal + cardinal
-
-    # Get Castle Moves Here?
-
-
-    return prelim_moves
+    return count
 
 # Checks if the King is in check from an enemy Knight
 def check_knight(chess_board: GameState, enemy_pieces, king_row, king_col):
@@ -357,7 +275,7 @@ def check_knight(chess_board: GameState, enemy_pieces, king_row, king_col):
         x_new = king_row + x
         y_new = king_col + y
         if (-1 < x_new < 8 and -1 < y_new < 8):
-            if (chess_board.board[x_new][y_new] == enemy_pieces[2]):
+            if (chess_board.board[x_new * 8 + y_new] == enemy_pieces[2]):
                 return True
     return False
 
@@ -391,12 +309,12 @@ def check_cardinal(chess_board: GameState, my_pieces, enemy_pieces, row, col):
     for direction in directions:
         for pair in direction:
             # Stop if King runs into own piece in front of it
-            if (chess_board.board[pair[0]][pair[1]] in my_pieces):
+            if (chess_board.board[pair[0] * 8 + pair[1]] in my_pieces):
                 break
 
             # Stop if King runs into an enemy piece in front of it
-            if (chess_board.board[pair[0]][pair[1]] in enemy_pieces):
-                if (chess_board.board[pair[0]][pair[1]] == enemy_pieces[1] or chess_board.board[pair[0]][pair[1]] == enemy_pieces[4]):
+            if (chess_board.board[pair[0] * 8 + pair[1]] in enemy_pieces):
+                if (chess_board.board[pair[0] * 8 + pair[1]] == enemy_pieces[1] or chess_board.board[pair[0] * 8 + pair[1]] == enemy_pieces[4]):
                     return True
                 break
 
@@ -405,7 +323,7 @@ def check_cardinal(chess_board: GameState, my_pieces, enemy_pieces, row, col):
 # Checks if the King is in check from a diagonal direction
 def check_diagonal(chess_board: GameState, my_pieces, enemy_pieces, row, col):
     king_directions = [(1,0), (1,1), (0,1), (-1,1), (-1,0), (-1,-1), (0,-1), (1,-1)]
-    if my_pieces[0].islower():
+    if my_pieces == BLACK_CHESS_PIECES:
         side = -1
     else:
         side = 1
@@ -424,7 +342,7 @@ def check_diagonal(chess_board: GameState, my_pieces, enemy_pieces, row, col):
         new_row = row + x
         new_col = col + y
         if (-1 < new_row < 8 and -1 < new_col < 8):
-            if (chess_board.board[new_row][new_col] == enemy_pieces[0]):
+            if (chess_board.board[new_row * 8 + new_col] == enemy_pieces[0]):
                 return True
 
     # Accounts for if there is an enemy King
@@ -432,24 +350,70 @@ def check_diagonal(chess_board: GameState, my_pieces, enemy_pieces, row, col):
         new_row = row + x
         new_col = col + y
         if (-1 < new_row < 8 and -1 < new_col < 8):
-            if (chess_board.board[new_row][new_col] == enemy_pieces[5]):
+            if (chess_board.board[new_row * 8 + new_col] == enemy_pieces[5]):
                 return True
     
 
     for direction in directions:
         for pair in direction:
             # Stop if King runs into own piece in front of it
-            if (chess_board.board[pair[0]][pair[1]] in my_pieces):
+            if (chess_board.board[pair[0] * 8 + pair[1]] in my_pieces):
                 break
 
             # Stop if King runs into enemy piece in front of it
-            if (chess_board.board[pair[0]][pair[1]] in enemy_pieces):
-                if (chess_board.board[pair[0]][pair[1]] == enemy_pieces[3] or chess_board.board[pair[0]][pair[1]] == enemy_pieces[4]):
+            if (chess_board.board[pair[0] * 8 + pair[1]] in enemy_pieces):
+                if (chess_board.board[pair[0] * 8 + pair[1]] == enemy_pieces[3] or chess_board.board[pair[0] * 8 + pair[1]] == enemy_pieces[4]):
                     return True
                 break
 
     return False
 
+# Gets the squares of every piece in the given set that attacks a tile
+# (used for static exchange evaluation, so pins are not taken into account)
+def get_attackers(chess_board: GameState, pieces, row, col):
+    attackers = []
+
+    # Pawns attack diagonally forward, so look one row behind the tile
+    side = -1 if pieces == WHITE_CHESS_PIECES else 1
+    for y in (-1, 1):
+        new_row = row + side
+        new_col = col + y
+        if (-1 < new_row < 8 and -1 < new_col < 8):
+            if (chess_board.board[new_row * 8 + new_col] == pieces[0]):
+                attackers.append((new_row, new_col))
+
+    # Knights
+    for (x, y) in [(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2)]:
+        new_row = row + x
+        new_col = col + y
+        if (-1 < new_row < 8 and -1 < new_col < 8):
+            if (chess_board.board[new_row * 8 + new_col] == pieces[2]):
+                attackers.append((new_row, new_col))
+
+    # Sliding pieces, stopping at the first piece found in each direction
+    for (x, y) in [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]:
+        slider = pieces[1] if (x == 0 or y == 0) else pieces[3]
+        new_row = row + x
+        new_col = col + y
+        while (-1 < new_row < 8 and -1 < new_col < 8):
+            piece = chess_board.board[new_row * 8 + new_col]
+            if (piece != EMPTY):
+                if (piece == slider or piece == pieces[4]):
+                    attackers.append((new_row, new_col))
+                break
+            new_row = new_row + x
+            new_col = new_col + y
+
+    # King
+    for (x, y) in [(1,0), (1,1), (0,1), (-1,1), (-1,0), (-1,-1), (0,-1), (1,-1)]:
+        new_row = row + x
+        new_col = col + y
+        if (-1 < new_row < 8 and -1 < new_col < 8):
+            if (chess_board.board[new_row * 8 + new_col] == pieces[5]):
+                attackers.append((new_row, new_col))
+
+    return attackers
+
 # Check to see if the King is currently in check
 def king_check(chess_board: GameState, my_pieces, enemy_pieces, row, col):
 
@@ -463,12 +427,213 @@ def king_check(chess_board: GameState, my_pieces, enemy_pieces, row, col):
     else:
         return False
 
-# Find valid actions
+# Gets the tiles reached from every tile by each of the given steps
+def get_step_targets(steps):
+    targets = []
+    for square in range(64):
+        row = square // 8
+        col = square % 8
+        targets.append([(row + x) * 8 + col + y for (x, y) in steps if -1 < row + x < 8 and -1 < col + y < 8])
+    return targets
+
+# Gets the tiles along a direction from every tile, nearest first
+def get_ray_targets(x, y):
+    targets = []
+    for square in range(64):
+        row = square // 8 + x
+        col = square % 8 + y
+        ray = []
+        while (-1 < row < 8 and -1 < col < 8):
+            ray.append(row * 8 + col)
+            row = row + x
+            col = col + y
+        targets.append(ray)
+    return targets
+
+CARDINAL_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+DIAGONAL_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+# Precomputed attack tables, indexed by tile (row * 8 + col)
+KNIGHT_ATTACKS = get_step_targets([(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2)])
+KING_ATTACKS = get_step_targets(CARDINAL_DIRECTIONS + DIAGONAL_DIRECTIONS)
+WHITE_PAWN_ATTACKS = get_step_targets([(1, -1), (1, 1)])
+BLACK_PAWN_ATTACKS = get_step_targets([(-1, -1), (-1, 1)])
+CARDINAL_RAYS = [get_ray_targets(x, y) for (x, y) in CARDINAL_DIRECTIONS]
+DIAGONAL_RAYS = [get_ray_targets(x, y) for (x, y) in DIAGONAL_DIRECTIONS]
+RAYS = CARDINAL_RAYS + DIAGONAL_RAYS
+
+# Index in RAYS of the direction from one tile to another (indexed by
+# tile * 64 + other tile), or -1 if they are not on a line
+LINE_DIRECTIONS = [-1] * 4096
+for direction, directions in enumerate(RAYS):
+    for square in range(64):
+        for tile in directions[square]:
+            LINE_DIRECTIONS[square * 64 + tile] = direction
+
+# Attacks made by every piece on the board, built once per state and shared by
+# move validation, check detection and evaluation. Each side has the number of
+# its pieces attacking every tile. Sliding attacks go through the enemy King,
+# so a King can't step back along the line of the piece checking it.
+class AttackMap:
+    __slots__ = ("white", "black")
+
+    def __init__(self, chess_board: GameState):
+        self.white = bytearray(64)
+        self.black = bytearray(64)
+        board = chess_board.board
+
+        for square, piece in enumerate(board):
+            if (piece == EMPTY):
+                continue
+            if (piece in WHITE_CHESS_PIECES):
+                pieces = WHITE_CHESS_PIECES
+                counts = self.white
+                enemy_king = BLACK_CHESS_PIECES[5]
+                pawn_attacks = WHITE_PAWN_ATTACKS
+            else:
+                pieces = BLACK_CHESS_PIECES
+                counts = self.black
+                enemy_king = WHITE_CHESS_PIECES[5]
+                pawn_attacks = BLACK_PAWN_ATTACKS
+
+            if (piece == pieces[0]):
+                targets = pawn_attacks[square]
+            elif (piece == pieces[2]):
+                targets = KNIGHT_ATTACKS[square]
+            elif (piece == pieces[5]):
+                targets = KING_ATTACKS[square]
+            else:
+                targets = []
+                rays = []
+                if (piece != pieces[3]):
+                    rays = rays + [directions[square] for directions in CARDINAL_RAYS]
+                if (piece != pieces[1]):
+                    rays = rays + [directions[square] for directions in DIAGONAL_RAYS]
+                for ray in rays:
+                    for tile in ray:
+                        targets.append(tile)
+                        if (board[tile] != EMPTY and board[tile] != enemy_king):
+                            break
+
+            for tile in targets:
+                counts[tile] = counts[tile] + 1
+
+    # Gets the number of pieces of the given color attacking every tile
+    def attacks(self, color):
+        return self.white if color == "white" else self.black
+
+    # Gets the number of tiles the pieces of the given color attack
+    def mobility(self, color):
+        return 64 - self.attacks(color).count(0)
+
+    # Gets the number of enemy attacks on the King of the given color and the tiles around it
+    def king_danger(self, color, chess_board: GameState):
+        king = chess_board.board.find(WHITE_CHESS_PIECES[5] if color == "white" else BLACK_CHESS_PIECES[5])
+        if (king == -1):
+            return 0
+        enemy_attacks = self.black if color == "white" else self.white
+        danger = enemy_attacks[king]
+        for tile in KING_ATTACKS[king]:
+            danger = danger + enemy_attacks[tile]
+        return danger
+
+# Gets the attack map of a state, building it the first time it's needed
+def get_attack_map(chess_board: GameState):
+    if chess_board.attacks is None:
+        chess_board.attacks = AttackMap(chess_board)
+    return chess_board.attacks
+
+# Gets the pieces pinned to the King on the given tile, each with the tiles it
+# can still move to (along the line between the King and the pinning piece)
+def get_pins(chess_board: GameState, my_pieces, enemy_pieces, king):
+    pins = {}
+    board = chess_board.board
+    for rays, slider in [(CARDINAL_RAYS, enemy_pieces[1]), (DIAGONAL_RAYS, enemy_pieces[3])]:
+        for directions in rays:
+            pinned = -1
+            for tile in directions[king]:
+                if (board[tile] == EMPTY):
+                    continue
+                if (pinned == -1 and board[tile] in my_pieces):
+                    pinned = tile
+                    continue
+                if (pinned != -1 and (board[tile] == slider or board[tile] == enemy_pieces[4])):
+                    line = directions[king]
+                    pins[pinned] = set(line[:line.index(tile) + 1])
+                break
+    return pins
+
+# Checks if the King of the given color is currently in check
+def in_check(color, chess_board: GameState):
+    king = chess_board.board.find(WHITE_CHESS_PIECES[5] if color == "white" else BLACK_CHESS_PIECES[5])
+    if (king == -1):
+        return False
+    enemy = "black" if color == "white" else "white"
+    return get_attack_map(chess_board).attacks(enemy)[king] > 0
+
+# Checks if the side to move (of the given color) is in check, which is
+# already known for states made by make_move
+def side_in_check(color, chess_board: GameState):
+    if chess_board.check is None:
+        chess_board.check = in_check(color, chess_board)
+    return chess_board.check
+
+# Checks if the move just made (from origin to target, by the pieces given)
+# checks the enemy King, from the board after the move: either the moved
+# piece attacks the King, or it left a line between the King and one of
+# the mover's sliding pieces
+def gives_check(chess_board: GameState, origin, target, my_pieces, enemy_pieces):
+    board = chess_board.board
+    king = board.find(enemy_pieces[5])
+    if (king == -1):
+        return False
+
+    # Direct check by the piece moved
+    piece = board[target]
+    if (piece == my_pieces[0]):
+        pawn_attacks = WHITE_PAWN_ATTACKS if my_pieces == WHITE_CHESS_PIECES else BLACK_PAWN_ATTACKS
+        if (king in pawn_attacks[target]):
+            return True
+    elif (piece == my_pieces[2]):
+        if (king in KNIGHT_ATTACKS[target]):
+            return True
+    elif (piece == my_pieces[5]):
+        if (king in KING_ATTACKS[target]):
+            return True
+    else:
+        direction = LINE_DIRECTIONS[king * 64 + target]
+        if (direction != -1 and (piece == my_pieces[4] or (piece == my_pieces[1]) == (direction < 4))):
+            for tile in RAYS[direction][king]:
+                if (board[tile] != EMPTY):
+                    if (tile == target):
+                        return True
+                    break
+
+    # Discovered check, along the line from the King through the tile left
+    direction = LINE_DIRECTIONS[king * 64 + origin]
+    if (direction != -1):
+        slider = my_pieces[1] if direction < 4 else my_pieces[3]
+        for tile in RAYS[direction][king]:
+            piece = board[tile]
+            if (piece != EMPTY):
+                return piece == slider or piece == my_pieces[4]
+    return False
+
+# Number of moves a move buffer holds (more than any position has)
+MAX_MOVES = 256
+
+# Makes a buffer for generate_moves to write moves into, meant to be made once
+# and reused (e.g. one per ply of the search) rather than made for every node
+def new_move_buffer():
+    return array("H", bytes(2 * MAX_MOVES))
+
+# Find valid actions, written (packed by encode_move) to the start of the
+# moves buffer, and returns how many there are
 # To do: Make Castling actions
-def actions(color, chess_board: GameState):
-    valid_moves = []
-    king_row = -1
-    king_col = -1
+def generate_moves(color, chess_board: GameState, moves):
+    board = chess_board.board
+    count = 0
+    king = -1
 
     # Assigns a set of pieces with the color of the player
     if (color == "white"):
@@ -478,66 +643,89 @@ def actions(color, chess_board: GameState):
         my_pieces = BLACK_CHESS_PIECES
         enemy_pieces = WHITE_CHESS_PIECES
 
-    for i in range(8):
-        for j in range(8):
-            # Get all moves for Pawns
-            if (chess_board.board[i][j] == my_pieces[0]):
-                valid_pawn = []
-                valid_pawn = get_pawn_moves(chess_board, my_pieces, enemy_pieces, i, j)
-                if (len(valid_pawn) > 0):
-                    valid_moves.append(valid_pawn)
-
-            # Get all moves for Knights
-            if (chess_board.board[i][j] == my_pieces[2]):
-                valid_knight = []
-                valid_knight = get_knight_moves(chess_board, enemy_pieces, i, j)
-                if (len(valid_knight) > 0):
-                    valid_moves.append(valid_knight)
-
-            # Get all moves for Bishops
-            if (chess_board.board[i][j] == my_pieces[3]):
-                valid_bishop = []
-                valid_bishop = get_bishop_moves(chess_board, my_pieces, enemy_pieces, False, i, j)
-                if (len(valid_bishop) > 0):
-                    valid_moves.append(valid_bishop)
-
-            # Get all moves for Rooks
-            if (chess_board.board[i][j] == my_pieces[1]):
-                valid_rook = []
-                valid_rook = get_rook_moves(chess_board, my_pieces, enemy_pieces, False, i, j)
-                if (len(valid_rook) > 0):
-                    valid_moves.append(valid_rook)
-
-            # Get all moves for Queen
-            if (chess_board.board[i][j] == my_pieces[4]):
-                valid_queen = []
-                valid_queen = get_queen_moves(chess_board, my_pieces, enemy_pieces, i, j)
-                if (len(valid_queen) > 0):
-                    valid_moves.append(valid_queen)
-     
-            # Get all moves for King  
-            if (chess_board.board[i][j] == my_pieces[5]):
-                king_row = i
-                king_col = j
-                valid_king = []
-                valid_king = get_king_moves(chess_board, my_pieces, enemy_pieces, i, j)
-                if (len(valid_king) > 0):
-                    valid_moves.append(valid_king)
-
-    # Compiles a list of all "possible" moves, not necessarily all valid
-    moves_list = [j for val in valid_moves for j in val]
-    valid_moves = []
-
-    # Test valid moves to see if King is placed in check
-    for move in moves_list:
-        if check_valid(chess_board, move, my_pieces, enemy_pieces, king_row, king_col):
-            valid_moves.append(move)
-
-    return valid_moves
+    # Writes all "possible" moves, not necessarily all valid
+    for square in range(64):
+        piece = board[square]
+        if (piece not in my_pieces):
+            continue
+        row = square >> 3
+        col = square & 7
+        if (piece == my_pieces[0]):
+            count = get_pawn_moves(chess_board, my_pieces, enemy_pieces, row, col, moves, count)
+        elif (piece == my_pieces[2]):
+            count = get_knight_moves(chess_board, my_pieces, row, col, moves, count)
+        elif (piece == my_pieces[3]):
+            count = get_bishop_moves(chess_board, my_pieces, row, col, moves, count)
+        elif (piece == my_pieces[1]):
+            count = get_rook_moves(chess_board, my_pieces, row, col, moves, count)
+        elif (piece == my_pieces[4]):
+            count = get_queen_moves(chess_board, my_pieces, row, col, moves, count)
+        else:
+            king = square
+            count = get_king_moves(chess_board, my_pieces, row, col, moves, count)
+
+    if (king == -1):
+        return count
+
+    # Uses the attack map to avoid playing out every move: the King can't move
+    # to an attacked tile, pinned pieces can only move along the pin, and in
+    # check the other pieces can only capture the checking piece or block it
+    # (En Passant captures, castling moves, and every move of a side left with
+    # two Kings by a castling move, are still played out)
+    enemy_attacks = get_attack_map(chess_board).attacks("black" if color == "white" else "white")
+    is_in_check = enemy_attacks[king] > 0
+    pins = get_pins(chess_board, my_pieces, enemy_pieces, king)
+    evasions = None
+    if (is_in_check and board.count(my_pieces[5]) == 1):
+        evasions = get_evasions(chess_board, enemy_pieces, king)
+
+    # Test valid moves to see if King is placed in check, moving the valid
+    # ones down over the invalid ones
+    valid = 0
+    for i in range(count):
+        move = moves[i]
+        origin = move & 63
+        target = (move >> 6) & 63
+        if (origin == king):
+            is_valid = enemy_attacks[target] == 0
+        elif ((is_in_check and (evasions is None or move in CASTLE_MOVES)) or (board[origin] == my_pieces[0] and (origin & 7) != (target & 7) and board[target] == EMPTY)):
+            is_valid = check_valid(chess_board, move, my_pieces, enemy_pieces, king >> 3, king & 7)
+        elif (evasions is not None and target not in evasions):
+            is_valid = False
+        else:
+            is_valid = origin not in pins or target in pins[origin]
+        if is_valid:
+            moves[valid] = move
+            valid = valid + 1
+
+    return valid
+
+# Gets the tiles a piece other than the King can move to to get the King on
+# the given tile out of check: the checking piece, or a tile between it and
+# the King if it is a sliding piece (none if there are two checking pieces)
+def get_evasions(chess_board: GameState, enemy_pieces, king):
+    checkers = get_attackers(chess_board, enemy_pieces, king >> 3, king & 7)
+    if (len(checkers) != 1):
+        return set()
+    checker = checkers[0][0] * 8 + checkers[0][1]
+    evasions = {checker}
+    direction = LINE_DIRECTIONS[king * 64 + checker]
+    if (direction != -1):
+        for tile in RAYS[direction][king]:
+            if (tile == checker):
+                break
+            evasions.add(tile)
+    return evasions
+
+# Find valid actions, as UCI strings
+def actions(color, chess_board: GameState):
+    moves = new_move_buffer()
+    count = generate_moves(color, chess_board, moves)
+    return [decode_move(moves[i]) for i in range(count)]
 
 # Checks if En Passant is a currently valid move
 def is_en_passant(state, move, is_white):
-    is_pawn = state.board[move[0]][move[1]].lower() == "p"
+    is_pawn = state.board[move[0] * 8 + move[1]] in b"Pp"
     col = move[3] + (1 if is_white else -1)
     take_pawn = state.en_passant[0] == move[0] and state.en_passant[1] == col
     return is_pawn and take_pawn 
@@ -547,54 +735,88 @@ def is_en_passant(state, move, is_white):
 def is_castling(state, move, is_white):
     pass
 
+# Castling moves, packed by encode_move
+WHITE_KING_CASTLE = encode_move("e1g1")
+WHITE_QUEEN_CASTLE = encode_move("e1c1")
+BLACK_KING_CASTLE = encode_move("e8g8")
+BLACK_QUEEN_CASTLE = encode_move("e8c8")
+CASTLE_MOVES = (WHITE_KING_CASTLE, WHITE_QUEEN_CASTLE, BLACK_KING_CASTLE, BLACK_QUEEN_CASTLE)
+
 # Gets the next move for the game state based on current player color
 def next_move(board_list: GameState, move, is_white):
+    return make_move(board_list, encode_move(move), is_white)
+
+# Gets the next state for a move packed by encode_move
+def make_move(board_list: GameState, move, is_white):
     new_board  = board_list.copy() 
-    move_coords = uci_to_coords(move)
-    piece = new_board.board[move_coords[0]][move_coords[1]]
-    new_board.board[move_coords[0]][move_coords[1]] = "."
-    new_board.board[move_coords[2]][move_coords[3]] = piece
+    origin = move & 63
+    target = (move >> 6) & 63
+    move_coords = (origin >> 3, origin & 7, target >> 3, target & 7)
+    piece = new_board.board[origin]
+    is_capture = new_board.board[target] != EMPTY
+    new_board.board[origin] = EMPTY
+    new_board.board[target] = piece
 
     # Checks if the move was an En Passant move and treats placement as such
+    is_special = False
     if board_list.en_passant and is_en_passant(board_list, move_coords, is_white):
         ep = board_list.en_passant
-        new_board.board[ep[0]][ep[1]] = "."
-
-    if move == 'e1g1':
-        new_board.board[move_coords[0]][move_coords[1]] = '.'
-        new_board.board[move_coords[2]][move_coords[3]] = 'K'
-        new_board.board[0][7] = '.'
-        new_board.board[0][5] = 'R'
+        new_board.board[ep[0] * 8 + ep[1]] = EMPTY
+        is_special = True
+
+    if move in CASTLE_MOVES:
+        is_special = True
+    if move == WHITE_KING_CASTLE:
+        new_board.board[origin] = EMPTY
+        new_board.board[target] = ord('K')
+        new_board.board[7] = EMPTY
+        new_board.board[5] = ord('R')
         new_board.white_castle_king = False
         new_board.white_castle_queen = False
-    if move == 'e1c1':
-        new_board.board[move_coords[0]][move_coords[1]] = '.'
-        new_board.board[move_coords[2]][move_coords[3]] = 'K'
-        new_board.board[0][0] = '.'
-        new_board.board[0][3] = 'R'
+    if move == WHITE_QUEEN_CASTLE:
+        new_board.board[origin] = EMPTY
+        new_board.board[target] = ord('K')
+        new_board.board[0] = EMPTY
+        new_board.board[3] = ord('R')
         new_board.white_castle_king = False
         new_board.white_castle_queen = False
-    if move == 'e8g8':
-        new_board.board[move_coords[0]][move_coords[1]] = '.'
-        new_board.board[move_coords[2]][move_coords[3]] = 'k'
-        new_board.board[7][7] = '.'
-        new_board.board[7][5] = 'r'
+    if move == BLACK_KING_CASTLE:
+        new_board.board[origin] = EMPTY
+        new_board.board[target] = ord('k')
+        new_board.board[63] = EMPTY
+        new_board.board[61] = ord('r')
         new_board.black_castle_king = False
         new_board.black_castle_queen = False
-    if move == 'e8c8':
-        new_board.board[move_coords[0]][move_coords[1]] = '.'
-        new_board.board[move_coords[2]][move_coords[3]] = 'k'
-        new_board.board[0][7] = '.'
-        new_board.board[7][3] = 'r'
+    if move == BLACK_QUEEN_CASTLE:
+        new_board.board[origin] = EMPTY
+        new_board.board[target] = ord('k')
+        new_board.board[7] = EMPTY
+        new_board.board[59] = ord('r')
         new_board.black_castle_king = False
         new_board.black_castle_queen = False
 
     # If pawn moves two then set en passant to coords
-    is_pawn = board_list.board[move_coords[0]][move_coords[1]].lower() == "p"
+    is_pawn = board_list.board[origin] in b"Pp"
     is_two = abs(move_coords[1] - move_coords[3]) == 2; 
     # Else set En Passant to None
     new_board.en_passant = (move_coords[2], move_coords[3]) if is_pawn and is_two else None
 
+    # Captures and Pawn moves reset the halfmove clock
+    new_board.halfmove = 0 if is_pawn or is_capture else board_list.halfmove + 1
+
+    # Works out if the move checks the other side from the tiles it changed,
+    # looking at the whole board only for the moves that change more tiles
+    if (piece in WHITE_CHESS_PIECES):
+        my_pieces = WHITE_CHESS_PIECES
+        enemy_pieces = BLACK_CHESS_PIECES
+    else:
+        my_pieces = BLACK_CHESS_PIECES
+        enemy_pieces = WHITE_CHESS_PIECES
+    if is_special:
+        new_board.check = in_check("black" if my_pieces == WHITE_CHESS_PIECES else "white", new_board)
+    else:
+        new_board.check = gives_check(new_board, origin, target, my_pieces, enemy_pieces)
+
     #if is_white:
     ## If white and move white rook then set false for castle
     #    if board_list.white_castle_king and board_list.board[0][7] != 'R':
@@ -619,14 +841,14 @@ def next_move(board_list: GameState, move, is_white):
 
 # Check move for validity, return true of os valid, false if it puts king in check or is outright invalid
 def check_valid(chess_board: GameState, move, my_pieces, enemy_pieces, king_row, king_col):
-    new_board  = next_move(chess_board, move, my_pieces[0].isupper())
-    move_coords = uci_to_coords(move)
+    new_board  = make_move(chess_board, move, my_pieces == WHITE_CHESS_PIECES)
 
     # Gets the coords for the tile a piece would be moving from
-    piece_moving = chess_board.board[move_coords[0]][move_coords[1]]
+    piece_moving = chess_board.board[move & 63]
 
     # Gets the coords for the tile a piece would be moving to
-    new_tile = (move_coords[2], move_coords[3])
+    target = (move >> 6) & 63
+    new_tile = (target >> 3, target & 7)
 
     # Conditional to prevent King from moving into check
     if (piece_moving == my_pieces[5]):
@@ -0,0 +1,94 @@
+# Registry of the engine's tunable parameters. Each one is a plain module
+# constant read by the search as usual, so tuned values (set here once,
+# before searching) cost nothing while searching.
+import json
+from games.chess import algorithm, time_manager
+
+# A tunable parameter: the module constant it sets, the range it is kept in
+# and the size of the change tried by each SPSA step. Integer parameters are
+# rounded when set.
+class Parameter:
+    __slots__ = ("name", "low", "high", "step", "is_int", "setter", "getter")
+
+    def __init__(self, name, low, high, step, getter, setter, is_int=False):
+        self.name = name
+        self.low = low
+        self.high = high
+        self.step = step
+        self.is_int = is_int
+        self.getter = getter
+        self.setter = setter
+
+    def get(self):
+        return self.getter()
+
+    def set(self, value):
+        value = min(max(value, self.low), self.high)
+        self.setter(round(value) if self.is_int else value)
+
+# Makes a parameter for a constant of a module
+def module_parameter(name, module, attribute, low, high, step, is_int=False):
+    return Parameter(name, low, high, step, lambda: getattr(module, attribute), lambda value: setattr(module, attribute, value), is_int)
+
+# Makes a parameter for the score of a piece (the Pawn is left as the unit)
+def piece_parameter(piece, low, high, step):
+    return Parameter("piece_value_" + piece, low, high, step, lambda: algorithm.PIECE_VALS[piece], lambda value: algorithm.set_piece_value(piece, value))
+
+PARAMETERS = [
+    piece_parameter("n", 2, 5, 0.2),
+    piece_parameter("b", 2, 5, 0.2),
+    piece_parameter("r", 3, 8, 0.3),
+    piece_parameter("q", 6, 12, 0.5),
+    module_parameter("mobility_weight", algorithm, "MOBILITY_WEIGHT", 0, 0.1, 0.005),
+    module_parameter("king_danger_weight", algorithm, "KING_DANGER_WEIGHT", 0, 0.2, 0.01),
+    module_parameter("quiescent_limit", algorithm, "QUIESCENT_LIMIT", 0, 4, 0.5, is_int=True),
+    module_parameter("average_game_moves", time_manager, "AVERAGE_GAME_MOVES", 20, 100, 5, is_int=True),
+    module_parameter("iteration_growth", time_manager, "ITERATION_GROWTH", 2, 10, 0.5),
+]
+
+# Parameters by name
+REGISTRY = {parameter.name: parameter for parameter in PARAMETERS}
+
+# Gets the current value of every parameter
+def get_values():
+    return {parameter.name: parameter.get() for parameter in PARAMETERS}
+
+# Sets the parameters named in the values (others are left as they are)
+def set_values(values):
+    for name, value in values.items():
+        if name in REGISTRY:
+            REGISTRY[name].set(value)
+
+# Reads a JSON file of values (as written by save_values, or the "values" of
+# an SPSA checkpoint)
+def read_values(path):
+    with open(path) as values_file:
+        values = json.load(values_file)
+    return values.get("values", values)
+
+# Sets the parameters from a JSON file of values
+def load_values(path):
+    set_values(read_values(path))
+
+# Values set by the first AI of this process to start ({} if it had no file),
+# or None before then. The parameters are module constants, shared by all
+# the games played at once in one process (see joueur.session), so every AI
+# in it has to be given the same ones.
+_ai_values = None
+
+# Sets the parameters for an AI from its "params" file (None for none), or
+# raises a ValueError if an AI already playing in this process was given
+# other values
+def load_ai_values(path):
+    global _ai_values
+    values = read_values(path) if path else {}
+    if _ai_values is None:
+        set_values(values)
+        _ai_values = values
+    elif values != _ai_values:
+        raise ValueError("the params given ({}) differ from those of the games already being played in this process; play games with other params in a process of their own".format(path))
+
+# Writes the current value of every parameter to a JSON file
+def save_values(path):
+    with open(path, "w") as values_file:
+        json.dump(get_values(), values_file, indent=4)
@@ -0,0 +1,146 @@
+# Perft (counting the positions reachable in a number of moves) to check and
+# time move generation, with the root moves split across a pool of processes
+#
+# Runs an EPD perft suite, one position per line followed by the expected
+# counts (e.g. "<fen> ;D1 20 ;D2 400 ;D3 8902"), and for a position known to
+# fail, why (e.g. ";xfail en passant captures are never generated"), from the
+# Joueur.py folder:
+#   python3 -m games.chess.perft [suite.epd] [--depth N] [--workers N] [--divide]
+import argparse
+import multiprocessing
+import os
+import time
+from games.chess.movement import parse_fen, actions, next_move, generate_moves, make_move, new_move_buffer
+
+# Suite used when none is given
+DEFAULT_SUITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perft.epd")
+
+# Reads an EPD perft suite into (fen, {depth: expected count}, reason it is
+# known to fail or None) tuples
+def read_suite(path):
+    suite = []
+    with open(path) as suite_file:
+        for line in suite_file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split(";")
+            expected = {}
+            xfail = None
+            for part in parts[1:]:
+                opcode, value = part.strip().split(None, 1)
+                if opcode == "xfail":
+                    xfail = value
+                else:
+                    expected[int(opcode[1:])] = int(value)
+            suite.append((parts[0].strip(), expected, xfail))
+    return suite
+
+# Parses the depth argument: perft counts the moves from the root, so at
+# least one
+def depth_argument(value):
+    depth = int(value)
+    if depth < 1:
+        raise argparse.ArgumentTypeError("depth must be at least 1, not {}".format(depth))
+    return depth
+
+# Counts the positions reachable from a state in the given number of moves,
+# generating the moves at each depth into that depth's buffer
+def perft(chess_board, color, depth, buffers):
+    if depth == 0:
+        return 1
+    moves = buffers[depth]
+    count = generate_moves(color, chess_board, moves)
+    if depth == 1:
+        return count
+
+    other = "black" if color == "white" else "white"
+    nodes = 0
+    for i in range(count):
+        nodes = nodes + perft(make_move(chess_board, moves[i], color == "white"), other, depth - 1, buffers)
+    return nodes
+
+# Counts the positions below one root move (run by the pool's workers)
+def perft_task(task):
+    index, fen, move, depth = task
+    start = time.perf_counter()
+    chess_board, color = parse_fen(fen)
+    other = "black" if color == "white" else "white"
+    buffers = [new_move_buffer() for i in range(depth)]
+    nodes = perft(next_move(chess_board, move, color == "white"), other, depth - 1, buffers)
+    return index, move, nodes, os.getpid(), time.perf_counter() - start
+
+# Runs perft on every position of a suite to the deepest expected count no
+# deeper than max_depth (or max_depth if there is none), one root move per
+# task, and gets one result per position:
+# (fen, depth, nodes, expected count, {root move: nodes}, seconds, xfail)
+# along with {worker process: (tasks, nodes, busy seconds)}
+def run_suite(suite, max_depth, workers):
+    depths = []
+    tasks = []
+    for index, (fen, expected, xfail) in enumerate(suite):
+        depth = max([d for d in expected if d <= max_depth], default=max_depth)
+        depths.append(depth)
+        chess_board, color = parse_fen(fen)
+        for move in actions(color, chess_board):
+            tasks.append((index, fen, move, depth))
+
+    divides = [{} for entry in suite]
+    times = [0.0 for entry in suite]
+    worker_stats = {}
+    with multiprocessing.Pool(workers) as pool:
+        for index, move, nodes, worker, seconds in pool.imap_unordered(perft_task, tasks):
+            divides[index][move] = nodes
+            times[index] = times[index] + seconds
+            tasks_done, worker_nodes, busy = worker_stats.get(worker, (0, 0, 0.0))
+            worker_stats[worker] = (tasks_done + 1, worker_nodes + nodes, busy + seconds)
+
+    results = []
+    for index, (fen, expected, xfail) in enumerate(suite):
+        depth = depths[index]
+        results.append((fen, depth, sum(divides[index].values()), expected.get(depth), divides[index], times[index], xfail))
+    return results, worker_stats
+
+# Runs the suite given on the command line and prints the results
+def main():
+    parser = argparse.ArgumentParser(description="Runs a perft suite over a pool of processes.")
+    parser.add_argument("suite", nargs="?", default=DEFAULT_SUITE, help="EPD file of positions and expected counts")
+    parser.add_argument("-d", "--depth", type=depth_argument, default=4, help="deepest depth searched for each position")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--divide", action="store_true", help="print the count below each root move")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results, worker_stats = run_suite(read_suite(args.suite), args.depth, args.workers)
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    known = 0
+    total = 0
+    for fen, depth, nodes, expected, divide, seconds, xfail in results:
+        total = total + nodes
+        if expected is None:
+            status = "----"
+        elif nodes == expected:
+            status = "ok" if xfail is None else "xpass"
+        elif xfail is not None:
+            status = "xfail"
+            known = known + 1
+        else:
+            status = "FAIL"
+            failed = failed + 1
+        print("{:5} depth {} {:>12} nodes (expected {}) {:8.2f}s {}".format(status, depth, nodes, expected, seconds, fen))
+        if xfail is not None:
+            print("        known to fail: {}".format(xfail))
+        if args.divide:
+            for move in sorted(divide):
+                print("        {} {}".format(move, divide[move]))
+
+    print()
+    for worker, (tasks_done, nodes, busy) in sorted(worker_stats.items()):
+        print("worker {}: {} root moves, {} nodes, {:.2f}s busy".format(worker, tasks_done, nodes, busy))
+    print("{} nodes in {:.2f}s ({:.0f} nodes/s), {} of {} positions failed ({} more known to fail)".format(total, elapsed, total / elapsed if elapsed else 0, failed, len(results), known))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
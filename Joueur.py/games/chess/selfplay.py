@@ -0,0 +1,82 @@
+# Self-play: local games between two sets of parameter values, each side with
+# its own engine and clock, used to tune and test the engine without a server
+import random
+import time
+from games.chess.movement import parse_board, actions, next_move, side_in_check
+from games.chess.algorithm import algorithm, is_draw, START_BOARD
+from games.chess.zobrist import hash_state
+from games.chess.engine import Engine
+from games.chess import params
+
+# Moves (by either side) a game can last before it is called a draw
+DEFAULT_MAX_PLIES = 200
+
+# Plays random moves from the start to get an opening, so games differ
+def random_opening(seed, plies):
+    rng = random.Random(seed)
+    state = parse_board(START_BOARD.split("/"))
+    color = "white"
+    history = []
+    for i in range(plies):
+        moves = actions(color, state)
+        if len(moves) == 0:
+            break
+        move = rng.choice(moves)
+        state = next_move(state, move, color == "white")
+        history.append(move)
+        color = "black" if color == "white" else "white"
+    return history
+
+# Plays a game on from an opening (moves from the start), each side searching
+# with its parameter values (any not given are left as they are) and a clock
+# of the given seconds plus the increment each move. Gets the result for
+# white: 1 for a win, 0.5 for a draw and 0 for a loss. If given a list of
+# positions, each searched position is added to it as (state, color, score),
+# with the search's score for the side to move.
+def play_game(white_values, black_values, opening, seconds, increment, max_plies=DEFAULT_MAX_PLIES, positions=None):
+    start_values = params.get_values()
+    values = {"white": dict(start_values, **white_values), "black": dict(start_values, **black_values)}
+    engines = {"white": Engine(), "black": Engine()}
+    clocks = {"white": seconds, "black": seconds}
+
+    state = parse_board(START_BOARD.split("/"))
+    color = "white"
+    history = []
+    for move in opening:
+        state = next_move(state, move, color == "white")
+        history.append(move)
+        color = "black" if color == "white" else "white"
+    repetitions = [hash_state(state, color)]
+
+    result = 0.5
+    while len(history) < max_plies:
+        # Checkmate or stalemate
+        if len(actions(color, state)) == 0:
+            if side_in_check(color, state):
+                result = 0 if color == "white" else 1
+            break
+
+        params.set_values(values[color])
+        start = time.time()
+        score, move = algorithm(state, color, clocks[color], history, engines[color])
+        clocks[color] = clocks[color] + increment - (time.time() - start)
+        if positions is not None:
+            positions.append((state, color, score))
+
+        # Out of time
+        if clocks[color] < 0:
+            result = 0 if color == "white" else 1
+            break
+
+        state = next_move(state, move, color == "white")
+        history.append(move)
+        color = "black" if color == "white" else "white"
+
+        # Repetition or the fifty-move rule
+        key = hash_state(state, color)
+        if is_draw(state, key, repetitions):
+            break
+        repetitions.append(key)
+
+    params.set_values(start_values)
+    return result
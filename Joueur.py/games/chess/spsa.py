@@ -0,0 +1,128 @@
+# SPSA tuning of the registered engine parameters by self-play. Each step
+# moves every parameter up or down (at random) by its step size, plays a
+# pair of games (one with each color) between the values moved up and those
+# moved down, and moves the parameters toward whichever side did better.
+# Games are played in a pool of processes, and the values are written to a
+# checkpoint after every pair, so a stopped run can be resumed. Pairs finish
+# out of order, but their results are applied in order, so the checkpoint's
+# iteration is the last one applied (along with every one before it), and a
+# resumed run plays the ones after it again.
+#
+# Run from the Joueur.py folder:
+#   python3 -m games.chess.spsa [--iterations N] [--workers N] [--checkpoint spsa.json] [--resume]
+# then play with the tuned values through the "params" AI setting.
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from games.chess.params import PARAMETERS, get_values
+from games.chess.selfplay import play_game, random_opening, DEFAULT_MAX_PLIES
+
+# Decay of the step sizes (c / k^GAMMA) and learning rates (a / (A + k)^ALPHA)
+# over the iterations, as recommended for SPSA
+ALPHA = 0.602
+GAMMA = 0.101
+
+# Plays a pair of games from the same opening between two sets of values, and
+# gets how much better the first did: from 1 (won both) to -1 (lost both)
+def play_pair(task):
+    plus, minus, seed, opening_plies, seconds, increment, max_plies = task
+    opening = random_opening(seed, opening_plies)
+    points = play_game(plus, minus, opening, seconds, increment, max_plies)
+    points = points + 1 - play_game(minus, plus, opening, seconds, increment, max_plies)
+    return points - 1
+
+# Gets the values moved up and down for an iteration, with the direction and
+# step size used for each parameter
+def perturb(values, iteration, seed):
+    rng = random.Random("{}:{}".format(seed, iteration))
+    plus = {}
+    minus = {}
+    deltas = {}
+    steps = {}
+    for parameter in PARAMETERS:
+        step = parameter.step / iteration ** GAMMA
+        delta = rng.choice((-1, 1))
+        plus[parameter.name] = min(max(values[parameter.name] + step * delta, parameter.low), parameter.high)
+        minus[parameter.name] = min(max(values[parameter.name] - step * delta, parameter.low), parameter.high)
+        deltas[parameter.name] = delta
+        steps[parameter.name] = step
+    return plus, minus, deltas, steps
+
+# Writes the state of a run, replacing the file only once it is fully written
+def write_checkpoint(path, checkpoint):
+    with open(path + ".tmp", "w") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file, indent=4)
+    os.replace(path + ".tmp", path)
+
+# Runs SPSA, starting from the checkpoint if resuming, and gets the values
+def spsa(args):
+    checkpoint = {"iteration": 0, "games": 0, "points": 0, "values": get_values()}
+    if args.resume and os.path.exists(args.checkpoint):
+        with open(args.checkpoint) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+    values = checkpoint["values"]
+    stability = args.iterations / 10 # A, so the first steps are not too large
+
+    # Pairs are handed out as workers free up, each with the values as they
+    # are when it starts (so a few results are always a little out of date),
+    # and the results of those finished before an earlier one wait for it
+    submitted = checkpoint["iteration"]
+    pending = {}
+    finished = {}
+    start = time.time()
+    start_iteration = checkpoint["iteration"]
+    with ProcessPoolExecutor(args.workers) as pool:
+        while submitted < args.iterations or pending:
+            while submitted < args.iterations and len(pending) < args.workers:
+                submitted = submitted + 1
+                plus, minus, deltas, steps = perturb(values, submitted, args.seed)
+                task = (plus, minus, args.seed * 1000003 + submitted, args.opening_plies, args.seconds, args.increment, args.max_plies)
+                pending[pool.submit(play_pair, task)] = (submitted, deltas, steps)
+
+            done = wait(pending, return_when=FIRST_COMPLETED)[0]
+            for future in done:
+                iteration, deltas, steps = pending.pop(future)
+                finished[iteration] = (future.result(), deltas, steps)
+
+            while checkpoint["iteration"] + 1 in finished:
+                iteration = checkpoint["iteration"] + 1
+                result, deltas, steps = finished.pop(iteration)
+                rate = args.learning_rate * ((1 + stability) / (iteration + stability)) ** ALPHA
+                for parameter in PARAMETERS:
+                    value = values[parameter.name] + rate * steps[parameter.name] * result * deltas[parameter.name]
+                    values[parameter.name] = min(max(value, parameter.low), parameter.high)
+
+                checkpoint["iteration"] = iteration
+                checkpoint["games"] = checkpoint["games"] + 2
+                checkpoint["points"] = checkpoint["points"] + result
+                checkpoint["values"] = values
+                write_checkpoint(args.checkpoint, checkpoint)
+                games_per_minute = 120 * (checkpoint["iteration"] - start_iteration) / (time.time() - start)
+                print("iteration {} of {}: {:+.1f} ({:.1f} games/min)".format(checkpoint["iteration"], args.iterations, result, games_per_minute))
+
+    return values
+
+# Runs SPSA with the options given on the command line and prints the values
+def main():
+    parser = argparse.ArgumentParser(description="Tunes the engine parameters by SPSA over self-play games.")
+    parser.add_argument("-n", "--iterations", type=int, default=1000, help="number of game pairs to play")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-c", "--checkpoint", default="spsa.json", help="file the values are written to after every pair")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--seconds", type=float, default=5, help="time on each side's clock at the start of a game")
+    parser.add_argument("--increment", type=float, default=0.05, help="time added to a side's clock each move")
+    parser.add_argument("--opening-plies", type=int, default=6, help="random moves played to start each pair of games")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES, help="moves after which a game is a draw")
+    parser.add_argument("--learning-rate", type=float, default=1.0, help="size of the update, in step sizes, for a won pair")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the openings and directions")
+    args = parser.parse_args()
+
+    values = spsa(args)
+    for name, value in values.items():
+        print("{}: {}".format(name, value))
+
+if __name__ == "__main__":
+    main()
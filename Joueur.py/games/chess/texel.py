@@ -0,0 +1,234 @@
+# Texel tuning of the evaluation weights: fits the piece values and positional
+# weights so the static evaluation of a corpus of positions predicts the
+# results of the games they came from, through sigmoid(K * evaluation).
+# The evaluation is a weighted sum of the terms from evaluation_features, so
+# the terms of every position are worked out once, written to a file, and
+# every loss and gradient after that is a matrix product over chunks of that
+# file (mapped into memory, so millions of positions fit).
+#
+# Positions are read one per line as "<fen> <result>", or as EPD with the
+# result in the c9 opcode (e.g. '<fen> c9 "1-0";'), with the result for
+# white as 1-0, 1/2-1/2, 0-1 or a number from 1 to 0, or from a self-play
+# dataset written by datagen (a .bin file). Run from the Joueur.py folder,
+# with numpy installed (pip3 install -r requirements-tools.txt):
+#   python3 -m games.chess.texel positions.txt [--out texel.json] [--epochs N]
+# then play with the tuned values through the "params" AI setting.
+import argparse
+import os
+import time
+import numpy as np
+from games.chess.movement import parse_fen, generate_moves, new_move_buffer, side_in_check
+from games.chess.algorithm import evaluation_features, evaluation_weights, is_capture, see, PIECES
+from games.chess.datagen import read_positions
+from games.chess import params
+
+# Positions read, or rows of the feature file used, at a time
+CHUNK_SIZE = 65536
+
+# Parameter set by each weight of evaluation_weights (only those registered
+# in params are tuned, the rest stay fixed so the Pawn stays the unit)
+WEIGHT_NAMES = ["piece_value_" + piece for piece in PIECES] + ["mobility_weight", "king_danger_weight"]
+
+# Results for white by how games write them
+RESULTS = {"1-0": 1.0, "1/2-1/2": 0.5, "0-1": 0.0}
+
+# Range searched for the scaling constant K
+K_RANGE = (0.01, 10.0)
+
+# Gets the result for white from a result token (quotes, brackets and
+# semicolons around it, as some corpora write them, are ignored)
+def parse_result(token):
+    token = token.strip("\"[];")
+    if token in RESULTS:
+        return RESULTS[token]
+    return float(token)
+
+# Gets the operations of an EPD line (what follows the position) by opcode,
+# e.g. {"c9": '"1-0"', "hmvc": "3"} from 'c9 "1-0"; hmvc 3;'
+def epd_operations(text):
+    operations = {}
+    for operation in text.split(";"):
+        parts = operation.split(None, 1)
+        if parts:
+            operations[parts[0]] = parts[1] if len(parts) > 1 else ""
+    return operations
+
+# Reads a corpus of "<fen> <result>" or EPD lines as (state, color, result).
+# The position is read from the first four fields of the fen, and the
+# halfmove clock from the fen (or the EPD's hmvc opcode) if it gives a number.
+def read_corpus(path):
+    with open(path) as corpus_file:
+        for line in corpus_file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split(None, 4)
+            rest = fields[4] if len(fields) > 4 else ""
+            if "c9" in rest.split():
+                operations = epd_operations(rest)
+                result = operations["c9"]
+                halfmove = operations.get("hmvc", "0")
+            else:
+                rest = rest.split()
+                if not rest:
+                    raise ValueError("No result for the position: {}".format(line))
+                result = rest[-1]
+                halfmove = rest[0] if len(rest) > 1 else "0"
+            if not halfmove.isdigit():
+                halfmove = "0"
+            chess_board, color = parse_fen(" ".join(fields[:4] + [halfmove]))
+            yield chess_board, color, parse_result(result)
+
+# Reads the positions of a corpus, or of a self-play dataset, as (state,
+# color, result)
+def read_results(path):
+    if path.endswith(".bin"):
+        return ((chess_board, color, result) for chess_board, color, score, result in read_positions(path))
+    return read_corpus(path)
+
+# Checks if a position is quiet: the side to move is not in check and has no
+# capture that wins material, so the static evaluation is a fair guess
+def is_quiet(chess_board, color, moves):
+    if side_in_check(color, chess_board):
+        return False
+    count = generate_moves(color, chess_board, moves)
+    for i in range(count):
+        if is_capture(chess_board, moves[i]) and see(chess_board, moves[i]) > 0:
+            return False
+    return True
+
+# Reads a corpus and writes the terms of each (quiet, unless all are kept)
+# position followed by its result to a file of float32 rows, a chunk at a
+# time. Gets the number of positions written and skipped.
+def extract_features(corpus_path, features_path, chunk_size=CHUNK_SIZE, quiet_only=True):
+    moves = new_move_buffer()
+    written = 0
+    skipped = 0
+    rows = []
+    with open(features_path, "wb") as features_file:
+        for chess_board, color, result in read_results(corpus_path):
+            if quiet_only and not is_quiet(chess_board, color, moves):
+                skipped = skipped + 1
+                continue
+            rows.append(evaluation_features(chess_board) + [result])
+            if len(rows) == chunk_size:
+                np.asarray(rows, dtype=np.float32).tofile(features_file)
+                written = written + len(rows)
+                rows = []
+        if rows:
+            np.asarray(rows, dtype=np.float32).tofile(features_file)
+            written = written + len(rows)
+    return written, skipped
+
+# Maps a file written by extract_features into memory, one row per position
+def load_features(features_path):
+    data = np.memmap(features_path, dtype=np.float32, mode="r")
+    return data.reshape(-1, len(WEIGHT_NAMES) + 1)
+
+# Gets the terms and results of each chunk of rows
+def chunks(data, chunk_size=CHUNK_SIZE):
+    for start in range(0, len(data), chunk_size):
+        rows = np.asarray(data[start:start + chunk_size], dtype=np.float64)
+        yield rows[:, :-1], rows[:, -1]
+
+# Squashes evaluations into expected results for white
+def sigmoid(values, k):
+    return 1.0 / (1.0 + np.exp(-k * values))
+
+# Gets the mean squared error between the expected and actual results
+def loss(data, weights, k, chunk_size=CHUNK_SIZE):
+    total = 0.0
+    for features, results in chunks(data, chunk_size):
+        total = total + np.sum((results - sigmoid(features @ weights, k)) ** 2)
+    return total / len(data)
+
+# Gets the loss and its gradient with respect to the weights
+def loss_gradient(data, weights, k, chunk_size=CHUNK_SIZE):
+    total = 0.0
+    gradient = np.zeros_like(weights)
+    for features, results in chunks(data, chunk_size):
+        expected = sigmoid(features @ weights, k)
+        error = expected - results
+        total = total + np.sum(error ** 2)
+        gradient = gradient + features.T @ (error * expected * (1 - expected))
+    return total / len(data), gradient * (2 * k / len(data))
+
+# Finds the K that best fits the current weights by golden-section search
+# (the loss has a single minimum over K)
+def fit_k(data, weights, chunk_size=CHUNK_SIZE, iterations=30):
+    ratio = (np.sqrt(5) - 1) / 2
+    low, high = K_RANGE
+    a = high - ratio * (high - low)
+    b = low + ratio * (high - low)
+    loss_a = loss(data, weights, a, chunk_size)
+    loss_b = loss(data, weights, b, chunk_size)
+    for i in range(iterations):
+        if loss_a < loss_b:
+            high, b, loss_b = b, a, loss_a
+            a = high - ratio * (high - low)
+            loss_a = loss(data, weights, a, chunk_size)
+        else:
+            low, a, loss_a = a, b, loss_b
+            b = low + ratio * (high - low)
+            loss_b = loss(data, weights, b, chunk_size)
+    return (low + high) / 2
+
+# Minimizes the loss over the tuned weights (kept in the range of their
+# parameters) with Adam steps over the whole corpus, and gets the weights
+def tune(data, weights, k, epochs, rate, chunk_size=CHUNK_SIZE):
+    tuned = np.array([name in params.REGISTRY for name in WEIGHT_NAMES])
+    low = np.array([params.REGISTRY[name].low if name in params.REGISTRY else -np.inf for name in WEIGHT_NAMES])
+    high = np.array([params.REGISTRY[name].high if name in params.REGISTRY else np.inf for name in WEIGHT_NAMES])
+
+    # Each weight moves by about the rate at first, whatever its scale
+    scale = np.where(tuned, np.maximum(np.abs(weights), 0.01), 0)
+    first = np.zeros_like(weights)
+    second = np.zeros_like(weights)
+    for epoch in range(1, epochs + 1):
+        error, gradient = loss_gradient(data, weights, k, chunk_size)
+        first = 0.9 * first + 0.1 * gradient
+        second = 0.999 * second + 0.001 * gradient ** 2
+        step = (first / (1 - 0.9 ** epoch)) / (np.sqrt(second / (1 - 0.999 ** epoch)) + 1e-12)
+        weights = np.clip(weights - rate * scale * step, low, high)
+        if epoch % 10 == 0 or epoch == epochs:
+            print("epoch {} of {}: loss {:.6f}".format(epoch, epochs, error))
+    return weights
+
+# Tunes the weights on the corpus given on the command line and writes them
+# as parameter values
+def main():
+    parser = argparse.ArgumentParser(description="Tunes the evaluation weights to predict game results (Texel's method).")
+    parser.add_argument("corpus", help="positions, one \"<fen> <result>\" or EPD line (with the result as c9) each, or a self-play dataset (.bin)")
+    parser.add_argument("-o", "--out", default="texel.json", help="file the tuned values are written to")
+    parser.add_argument("-f", "--features", help="feature file to write, or reuse if it exists (default: the corpus path + .features)")
+    parser.add_argument("-e", "--epochs", type=int, default=200, help="number of gradient steps")
+    parser.add_argument("-r", "--rate", type=float, default=0.01, help="size of a step, relative to each weight")
+    parser.add_argument("-k", type=float, help="scaling constant K (fitted to the starting weights if not given)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="positions handled at a time")
+    parser.add_argument("--all", action="store_true", help="keep positions that are not quiet")
+    parser.add_argument("--params", help="JSON file of values to start from")
+    args = parser.parse_args()
+
+    if args.params:
+        params.load_values(args.params)
+
+    features_path = args.features or args.corpus + ".features"
+    if not os.path.exists(features_path):
+        start = time.time()
+        written, skipped = extract_features(args.corpus, features_path, args.chunk_size, not args.all)
+        print("{} positions extracted ({} not quiet skipped) in {:.1f}s".format(written, skipped, time.time() - start))
+    data = load_features(features_path)
+
+    weights = np.array(evaluation_weights(), dtype=np.float64)
+    k = args.k if args.k is not None else fit_k(data, weights, args.chunk_size)
+    print("K = {:.4f}, starting loss {:.6f}".format(k, loss(data, weights, k, args.chunk_size)))
+
+    weights = tune(data, weights, k, args.epochs, args.rate, args.chunk_size)
+    params.set_values({name: float(weight) for name, weight in zip(WEIGHT_NAMES, weights)})
+    params.save_values(args.out)
+    for name, weight in zip(WEIGHT_NAMES, weights):
+        if name in params.REGISTRY:
+            print("{}: {}".format(name, params.REGISTRY[name].get()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Time management: how long to search each move, from the time left on the
+# clock, the moves left to play and the time added each move, then adjusted
+# between iterations by how settled the search is
+import time
+
+# Moves a game is expected to last, and the fewest moves the remaining time
+# is ever split over (so a long game doesn't run the clock down)
+AVERAGE_GAME_MOVES = 50
+MIN_MOVES_TO_GO = 25
+
+# Most of the remaining time one move may use, however unsettled the search
+MAX_TIME_FRACTION = 0.2
+
+# An iteration is expected to take about this many times as long as all the
+# iterations before it, so the next one is only started if that fits
+ITERATION_GROWTH = 5
+
+# The budget grows to the base budget times this factor when the best move
+# changes, or when the score drops by at least SCORE_DROP (a Pawn) from the
+# previous iteration (times both if both happen)
+BEST_MOVE_CHANGE_EXTENSION = 1.5
+SCORE_DROP = 1
+SCORE_DROP_EXTENSION = 1.5
+
+# The budget shrinks to the base budget times this factor once the best move
+# has stayed the same for STABLE_ITERATIONS iterations in a row
+STABLE_ITERATIONS = 3
+STABLE_REDUCTION = 0.5
+
+# Columns of the telemetry file, one row per move
+TELEMETRY_FIELDS = ["move", "remaining", "moves_to_go", "increment", "base", "budget", "maximum", "used", "depth", "score", "best_move", "reason"]
+
+class TimeManager:
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.log_file = None
+        self.increment = 0.0 # Estimated time added to the clock each move
+        self.last_remaining = None
+        self.last_used = None
+
+    # Starts timing a move, with the time left on the clock (in seconds), the
+    # number of moves made so far and the number of moves possible
+    def start_turn(self, remaining_time, moves_made, legal_moves):
+        self.start_time = time.time()
+
+        # The clock gains whatever it has beyond what was left after the last move
+        if self.last_remaining is not None:
+            added = remaining_time - (self.last_remaining - self.last_used)
+            self.increment = max(0.0, (self.increment + added) / 2)
+
+        self.remaining = remaining_time
+        self.moves_made = moves_made
+        self.moves_to_go = max(MIN_MOVES_TO_GO, AVERAGE_GAME_MOVES - moves_made)
+        self.maximum = remaining_time * MAX_TIME_FRACTION
+        self.base = min(remaining_time / self.moves_to_go + self.increment, self.maximum)
+        self.budget = self.base
+        self.forced = legal_moves <= 1
+        self.best_move = None
+        self.best_score = None
+        self.stable = 0
+        self.reason = "budget"
+
+    # Records a finished iteration and checks if the search should stop
+    def iteration_done(self, depth, score, move):
+        elapsed = time.time() - self.start_time
+
+        extension = 1
+        if move != self.best_move:
+            if self.best_move is not None:
+                extension = extension * BEST_MOVE_CHANGE_EXTENSION
+            self.stable = 0
+        else:
+            self.stable = self.stable + 1
+            if self.stable == STABLE_ITERATIONS:
+                self.budget = min(self.budget, self.base * STABLE_REDUCTION)
+
+        if self.best_score is not None and score <= self.best_score - SCORE_DROP:
+            extension = extension * SCORE_DROP_EXTENSION
+        if extension > 1:
+            self.budget = min(max(self.budget, self.base * extension), self.maximum)
+        self.best_move = move
+        self.best_score = score
+
+        # Only one move can be made, so there is nothing to search for
+        if self.forced:
+            return self.stop("forced")
+        if ITERATION_GROWTH * elapsed > self.budget:
+            return self.stop("stable" if self.stable >= STABLE_ITERATIONS else "budget")
+        return False
+
+    # Records why the search stopped
+    def stop(self, reason):
+        self.reason = reason
+        return True
+
+    # Finishes timing a move, writing its telemetry if there is a log
+    def end_turn(self, depth, score, move):
+        self.last_remaining = self.remaining
+        self.last_used = time.time() - self.start_time
+        if self.log_path is None:
+            return
+
+        if self.log_file is None:
+            self.log_file = open(self.log_path, "a")
+            if self.log_file.tell() == 0:
+                self.log_file.write(",".join(TELEMETRY_FIELDS) + "\n")
+        row = [self.moves_made, self.remaining, self.moves_to_go, self.increment, self.base, self.budget, self.maximum, self.last_used, depth, score, move, self.reason]
+        self.log_file.write(",".join(str(round(value, 4)) if isinstance(value, float) else str(value) for value in row) + "\n")
+        self.log_file.flush()
+
+    # Closes the telemetry file
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
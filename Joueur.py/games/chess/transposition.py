@@ -0,0 +1,130 @@
+# Transposition table: results of searched positions, keyed by position hash,
+# so positions reached again (by another line or on a later turn) reuse them
+from multiprocessing import shared_memory
+import struct
+
+# Kinds of stored values, from the point of view of the side to move
+EXACT = 0
+LOWER = 1 # The value is at least this (a move was too good and cut off the search)
+UPPER = 2 # The value is at most this (no move beat the window)
+
+# Number of positions kept when no size is given through the AI settings
+DEFAULT_TT_SIZE = 200000
+
+# Megabytes of shared memory used when no size is given through the AI settings
+DEFAULT_SHARED_TT_MB = 64
+
+class TranspositionTable:
+    def __init__(self, size=DEFAULT_TT_SIZE):
+        self.size = size
+        self.entries = {} # Hash -> (depth, value, flag, move, generation)
+        self.generation = 0
+        self.hits = 0
+        self.probes = 0
+
+    # Starts a new search, so entries from earlier ones can be replaced first
+    def new_search(self):
+        self.generation = (self.generation + 1) % 64
+
+    # Gets the entry for a position, or None if it was never stored
+    def probe(self, key):
+        self.probes = self.probes + 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits = self.hits + 1
+        return entry
+
+    # Stores the result of a search, replacing an entry from an older search
+    # or one searched to a lower depth
+    def store(self, key, depth, value, flag, move):
+        entry = self.entries.get(key)
+        if entry is None or entry[4] != self.generation or depth >= entry[0]:
+            self.entries[key] = (depth, value, flag, move, self.generation)
+            if len(self.entries) > self.size:
+                self.age()
+
+    # Makes room by dropping the entries left by older searches, then (if the
+    # current search alone filled the table) the shallowest half of the rest
+    def age(self):
+        self.entries = {key: entry for key, entry in self.entries.items() if entry[4] == self.generation}
+        if len(self.entries) > self.size // 2:
+            kept = sorted(self.entries.items(), key=lambda item: item[1][0], reverse=True)[:self.size // 2]
+            self.entries = dict(kept)
+
+    # Gets the hit rate and size as a printable string
+    def stats(self):
+        rate = (100 * self.hits / self.probes) if self.probes else 0
+        return "transposition table: {} probes ({:.1f}% hits), {} positions stored".format(self.probes, rate, len(self.entries))
+
+# Each shared entry is two 64-bit words: the key XOR the data, then the data
+# (value as a float32, depth, flag and generation, packed move). Entries are
+# written without locks; a write torn by another process fails the key check
+# on probe and is treated as a miss.
+ENTRY_SIZE = 16
+_DATA = struct.Struct("<fBBH")
+_WORD = struct.Struct("<Q")
+
+# Transposition table in shared memory, so search processes share their
+# results. The first entry slot holds the generation, which only the process
+# that created the table advances; the others attach to it by name.
+class SharedTranspositionTable:
+    def __init__(self, size_mb=DEFAULT_SHARED_TT_MB, name=None):
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size_mb * 2**20)
+            self.owner = True
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.words = self.memory.buf.cast("Q")
+        self.size = self.memory.size // ENTRY_SIZE - 1
+        self.hits = 0
+        self.probes = 0
+
+    # Name other processes attach to the table with
+    @property
+    def name(self):
+        return self.memory.name
+
+    @property
+    def generation(self):
+        return self.words[0]
+
+    # Starts a new search, so entries from earlier ones can be replaced first
+    def new_search(self):
+        if self.owner:
+            self.words[0] = (self.words[0] + 1) % 64
+
+    # Gets the entry for a position, or None if it isn't stored (or was torn)
+    def probe(self, key):
+        self.probes = self.probes + 1
+        index = 2 + 2 * (key % self.size)
+        data = self.words[index + 1]
+        if data == 0 or self.words[index] ^ data != key:
+            return None
+        self.hits = self.hits + 1
+        value, depth, flag_generation, move = _DATA.unpack(_WORD.pack(data))
+        return (depth, value, flag_generation & 3, move if move else None, flag_generation >> 2)
+
+    # Stores the result of a search, replacing an entry from an older search
+    # or one searched to a lower depth (whichever position it was for)
+    def store(self, key, depth, value, flag, move):
+        index = 2 + 2 * (key % self.size)
+        generation = self.words[0]
+        old = self.words[index + 1]
+        if old != 0 and ((old >> 42) & 63) == generation and depth < ((old >> 32) & 255):
+            return
+        data = _WORD.unpack(_DATA.pack(value, min(depth, 255), flag | generation << 2, move if move else 0))[0]
+        self.words[index] = key ^ data
+        self.words[index + 1] = data
+
+    # Releases the shared memory (and frees it, from the creating process)
+    def close(self):
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    # Gets the hit rate and size as a printable string
+    def stats(self):
+        rate = (100 * self.hits / self.probes) if self.probes else 0
+        return "shared transposition table: {} probes ({:.1f}% hits), {} entries".format(self.probes, rate, self.size)
@@ -0,0 +1,26 @@
+# Zobrist hashing of game states, used to recognize repeated positions
+from games.chess.movement import EMPTY
+import random
+
+# Fixed seed so every process (and every run) agrees on the keys
+_random = random.Random(5400)
+
+# One key per piece per tile, plus a key for the side to move
+PIECE_KEYS = {piece: [_random.getrandbits(64) for i in range(64)] for piece in b"PRNBQKprnbqk"}
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+
+# Gets the hash of a state with the given color to move
+# Castling rights and the En Passant tile are left out as castling moves and
+# En Passant captures are never generated, so they do not change which moves
+# are possible from a state (the AI also reads its position from the game's
+# fen without the En Passant tile, so the hashes of the game replayed by the
+# search match it)
+def hash_state(chess_board, color):
+    key = 0
+    for i, piece in enumerate(chess_board.board):
+        if (piece != EMPTY):
+            key ^= PIECE_KEYS[piece][i]
+
+    if (color == "black"):
+        key ^= BLACK_TO_MOVE_KEY
+    return key
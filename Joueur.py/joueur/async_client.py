@@ -0,0 +1,315 @@
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from joueur.serializer import serialize, deserialize
+from joueur.codec import default_codec
+from joueur.dispatcher import EventDispatcher
+from joueur.instrumentation import NO_INSTRUMENTATION, AI_THINK, AI_UPDATE, \
+    DELTA_MERGE, SERIALIZE, DESERIALIZE, ENCODE, DECODE
+import joueur.error_code as error_code
+import joueur.ansi_color_coder as color
+
+EOT = b'\x04'
+
+# Largest message the server may send, the whole game state on the first delta
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+# The client playing the game being handled, in its tasks and AI calls, so
+# what does not know its client (game objects running functions on the
+# server, errors) can find it when there are many (see joueur.session)
+_current_client = contextvars.ContextVar('current_client', default=None)
+
+
+# gets the client whose game is being handled here, or None
+def current_client():
+    return _current_client.get()
+
+
+# AsyncClient: talks to the server over asyncio streams. Messages are read as
+# they arrive by a task of their own, so the connection is served while the
+# AI computes (the AI runs on a thread of its own), without polling. Has the
+# same send/run_on_server/wait_for_event semantics as joueur.client.
+class AsyncClient:
+    # raise_errors: raise an error_code.ClientError for errors, rather than
+    # exiting the process, so one of many clients can fail on its own.
+    # instrumentation (from joueur.instrumentation): times the game, exported
+    # on disconnecting.
+    def __init__(self, print_io=False, codec=None, raise_errors=False,
+                 instrumentation=None):
+        self.print_io = print_io
+        self.codec = codec or default_codec()
+        self.raise_errors = raise_errors
+        self.instrumentation = instrumentation or NO_INSTRUMENTATION
+        self.hostname = None
+        self.port = None
+        self.game = None
+        self.ai = None
+        self.manager = None
+        self.over = False
+        self.loop = None
+        self._reader = None
+        self._writer = None
+        self._events = None
+        self._read_task = None
+        self._read_error = None
+        self._send_buffer = bytearray()  # messages sent but not written yet
+
+        # every call into the AI is made on this one thread, in order
+        self._ai_executor = ThreadPoolExecutor(1)
+
+        # handles the events not being waited for, with coroutine handlers
+        self.dispatcher = EventDispatcher({
+            'delta': self._auto_handle_delta,
+            'order': self._auto_handle_order,
+            'invalid': self._auto_handle_invalid,
+            'fatal': self._auto_handle_fatal,
+            'over': self._auto_handle_over
+        })
+        if instrumentation:
+            self.dispatcher.add_hook(instrumentation.handled)
+
+    async def connect(self, hostname='localhost', port=3000):
+        self.hostname = hostname
+        self.port = int(port)
+        self.loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        _current_client.set(self)  # for the rest of the task connecting
+
+        try:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.hostname, self.port, limit=MAX_MESSAGE_SIZE)
+        except OSError as e:
+            error_code.handle_error(
+                error_code.COULD_NOT_CONNECT,
+                e,
+                'Could not connect to {}:{}'.format(self.hostname, self.port)
+            )
+
+        self._read_task = asyncio.ensure_future(self._read_events())
+
+    def setup(self, game, ai, manager):
+        self.game = game
+        self.ai = ai
+        self.manager = manager
+
+    # sends the server an event, written out when next flushed (before waiting
+    # for events, and once an order is finished)
+    def send(self, event, data):
+        instrumentation = self.instrumentation
+        message = instrumentation.time(ENCODE, self.codec.encode, {
+            'sentTime': int(time.time()),
+            'event': event,
+            'data': instrumentation.time(SERIALIZE, serialize, data)
+        })
+        instrumentation.sent(event, len(message))
+        if self.print_io:
+            print(color.text('magenta') + 'TO SERVER --> ' +
+                  message.decode('utf-8') + color.reset())
+        self._send_buffer.extend(message + EOT)
+
+    # hands every message sent since the last flush to the transport at once
+    def flush(self):
+        if self._send_buffer:
+            self._writer.write(bytes(self._send_buffer))
+            self._send_buffer.clear()
+
+    def disconnect(self):
+        if self._read_task:
+            self._read_task.cancel()
+        if self._writer:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+        self._ai_executor.shutdown(wait=False)
+        self.instrumentation.export()
+
+    async def run_on_server(self, caller, function_name, args=None):
+        self.send('run', {
+            'caller': caller,
+            'functionName': function_name,
+            'args': args
+        })
+
+        ran_data = await self.wait_for_event('ran')
+        return self.instrumentation.time(DESERIALIZE, deserialize, ran_data, self.game)
+
+    # runs a function on the server from another thread (the AI's), waiting
+    # for what it returned
+    def run_on_server_threadsafe(self, caller, function_name, args=None):
+        return asyncio.run_coroutine_threadsafe(
+            self.run_on_server(caller, function_name, args), self.loop).result()
+
+    # handles events until the game is over
+    async def play(self):
+        await self.wait_for_event(None)
+
+    async def wait_for_event(self, event):
+        while not self.over:
+            self.flush()  # the server may be waiting on what was sent
+            await self._writer.drain()
+            message = await self._events.get()
+            if message is None:
+                self._handle_closed()
+            sent = self._decode(message)
+            data = sent['data'] if 'data' in sent else None
+            if event is not None and sent['event'] == event:
+                return data
+            else:
+                await self.dispatcher.dispatch_async(sent['event'], data)
+
+    # reads the messages from the server into the event queue as they arrive,
+    # then None once the connection is closed (or cannot be read), leaving
+    # what to do about it to whatever waits for events
+    async def _read_events(self):
+        while True:
+            try:
+                message = await self._reader.readuntil(EOT)
+            except asyncio.IncompleteReadError:
+                break
+            except (OSError, asyncio.LimitOverrunError) as e:
+                self._read_error = e
+                break
+            self._events.put_nowait(message[:-1])
+        self._events.put_nowait(None)
+
+    def _handle_closed(self):
+        if self._read_error:
+            error_code.handle_error(
+                error_code.CANNOT_READ_SOCKET, self._read_error,
+                'Error reading socket while waiting for events')
+        error_code.handle_error(
+            error_code.DISCONNECTED_UNEXPECTEDLY,
+            message='Server closed the connection')
+
+    def _decode(self, message):
+        if self.print_io:
+            print(color.text('magenta') + 'FROM SERVER <-- ' +
+                  message.decode('utf-8') + color.reset())
+
+        try:
+            parsed = self.instrumentation.time(DECODE, self.codec.decode, message)
+        except ValueError as e:
+            error_code.handle_error(error_code.MALFORMED_JSON, e,
+                                    'Could not parse json "{}"'.format(message))
+        self.instrumentation.received(parsed, len(message))
+        return parsed
+
+    # calls into the AI on its thread, leaving the loop free meanwhile. The
+    # call is made in (a copy of) the calling task's context, so the AI's
+    # game objects run functions on the server through this client.
+    def call_ai(self, function, *args):
+        context = contextvars.copy_context()
+        return self.loop.run_in_executor(
+            self._ai_executor, functools.partial(context.run, function, *args))
+
+    async def _auto_handle_delta(self, data):
+        instrumentation = self.instrumentation
+        try:
+            instrumentation.time(DELTA_MERGE, self.manager.apply_delta_state, data)
+        except:
+            error_code.handle_error(error_code.DELTA_MERGE_FAILURE,
+                                    sys.exc_info(), 'Error merging delta')
+
+        if self.ai.player:  # then the AI is ready for updates
+            await self.call_ai(instrumentation.time, AI_UPDATE, self.ai.game_updated)
+
+    async def _auto_handle_order(self, data):
+        instrumentation = self.instrumentation
+        args = instrumentation.time(DESERIALIZE, deserialize, data['args'], self.game)
+        try:
+            returned = await self.call_ai(instrumentation.time, AI_THINK,
+                                          self.ai._do_order, data['name'], args)
+        except:
+            error_code.handle_error(error_code.AI_ERRORED, sys.exc_info(),
+                                    'AI errored executing order "{}"'.format(
+                                        data['name']))
+
+        self.send('finished', {
+            'orderIndex': data['index'],
+            'returned': returned
+        })
+        self.flush()
+        instrumentation.order_finished(data['index'])
+
+    async def _auto_handle_invalid(self, data):
+        try:
+            await self.call_ai(self.ai.invalid, data['message'])
+        except:
+            error_code.handle_error(error_code.AI_ERRORED, sys.exc_info(),
+                                    'AI errored while handling invalid data.')
+
+    async def _auto_handle_fatal(self, data):
+        error_code.handle_error(
+            error_code.FATAL_EVENT,
+            message='Got a fatal event from the server: ' + data['message']
+        )
+
+    async def _auto_handle_over(self, data):
+        self.over = True
+        won = self.ai.player.won
+        reason = self.ai.player.reason_won \
+            if self.ai.player.won \
+            else self.ai.player.reason_lost
+
+        print('{}Game is Over. {} because {}{}'.format(
+            color.text('green'),
+            'I Won!' if won else 'I Lost :(',
+            reason,
+            color.reset()
+        ))
+
+        try:
+            await self.call_ai(self.ai.end, won, reason)
+        except:
+            error_code.handle_error(error_code.AI_ERRORED, sys.exc_info(),
+                                    'AI errored during end.')
+
+        if 'message' in data:
+            message = data['message'].replace('__HOSTNAME__', self.hostname)
+            print(color.text('cyan') + message + color.reset())
+
+        await self._writer.drain()
+        self.disconnect()
+
+
+# SyncClient: blocking façade over an AsyncClient whose event loop runs on a
+# thread of its own, with the functions of joueur.client, so run() and the
+# AIs (through joueur.client) can use the asyncio transport unchanged
+class SyncClient:
+    def __init__(self, print_io=False, codec=None, instrumentation=None):
+        self.client = AsyncClient(print_io, codec, instrumentation=instrumentation)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    # runs a coroutine on the loop and waits for its result
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def connect(self, hostname='localhost', port=3000):
+        self._run(self.client.connect(hostname, port))
+
+    def setup(self, game, ai, manager):
+        self.client.setup(game, ai, manager)
+
+    def send(self, event, data):
+        self.loop.call_soon_threadsafe(self.client.send, event, data)
+
+    def disconnect(self):
+        self.loop.call_soon_threadsafe(self.client.disconnect)
+
+    def run_on_server(self, caller, function_name, args=None):
+        return self._run(self.client.run_on_server(caller, function_name, args))
+
+    def wait_for_event(self, event):
+        return self._run(self.client.wait_for_event(event))
+
+    # plays until the game is over, then exits as joueur.client does
+    def play(self):
+        self._run(self.client.play())
+        os._exit(0)
@@ -0,0 +1,106 @@
+# Microbenchmarks of the client's per-message work, on the messages of a
+# Chess game (one JSON message per line, both directions):
+#   python3 -m joueur.benchmark codec|serializer [--messages FILE] [--repeat N]
+#
+# The default messages (chess_messages.jsonl) are synthetic: a short game
+# against a minimal local stand-in for the game server, which speaks the same
+# delta protocol but sends smaller deltas, shaped differently, than a real
+# Cadre server does. Its numbers compare the implementations, they don't
+# measure a real game. For that, save a real game's messages (the JSON of
+# each one --printIO shows, one per line) and pass the file with --messages.
+import argparse
+import copy
+import json
+import os
+import time
+from joueur.codec import CODECS
+from joueur.game_manager import GameManager
+from joueur.serializer import serialize, deserialize
+
+DEFAULT_MESSAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'chess_messages.jsonl')
+
+
+def read_messages(path):
+    with open(path) as messages_file:
+        return [json.loads(line) for line in messages_file if line.strip()]
+
+
+# gets the average seconds a call takes over every item, repeat times
+def time_per_call(function, items, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        for item in items:
+            function(item)
+    return (time.perf_counter() - start) / (repeat * len(items))
+
+
+# times encoding and decoding each message with every codec, against the
+# str round trip (json.dumps then encode, decode then json.loads) used before
+def benchmark_codec(messages, repeat):
+    codecs = [('json (str)',
+               lambda message: json.dumps(message).encode('utf-8'),
+               lambda data: json.loads(data.decode('utf-8')))]
+    for name, codec_class in CODECS.items():
+        codec = codec_class()
+        codecs.append((name, codec.encode, codec.decode))
+
+    for label, chosen in (('deltas', [message for message in messages if message['event'] == 'delta']),
+                          ('all messages', messages)):
+        print('{} ({}):'.format(label, len(chosen)))
+        for name, encode, decode in codecs:
+            encoded = [encode(message) for message in chosen]
+            print('  {:<12} encode {:8.2f} us  decode {:8.2f} us'.format(
+                name,
+                time_per_call(encode, chosen, repeat) * 1e6,
+                time_per_call(decode, encoded, repeat) * 1e6
+            ))
+
+
+# builds the game the messages are about by applying their deltas
+def replay_game(messages):
+    from games.chess.game import Game
+    game = Game()
+    manager = GameManager(game)
+    for message in messages:
+        if message['event'] == 'lobbied':
+            manager.set_constants(message['data']['constants'])
+        elif message['event'] == 'delta':
+            manager.apply_delta_state(copy.deepcopy(message['data']))
+    return game
+
+
+# times deserializing each message's data (as the client does with order
+# arguments and ran returns) and serializing it back (as with finished
+# returns and run arguments), against the game it is about
+def benchmark_serializer(messages, repeat):
+    game = replay_game(messages)
+    for label, chosen in (('orders and finished', [message for message in messages if message['event'] in ('order', 'finished')]),
+                          ('all messages', messages)):
+        data = [message['data'] for message in chosen]
+        deserialized = [deserialize(item, game) for item in data]
+        print('{} ({}):'.format(label, len(chosen)))
+        print('  deserialize {:8.2f} us  serialize {:8.2f} us'.format(
+            time_per_call(lambda item: deserialize(item, game), data, repeat) * 1e6,
+            time_per_call(serialize, deserialized, repeat) * 1e6
+        ))
+
+
+BENCHMARKS = {
+    'codec': benchmark_codec,
+    'serializer': benchmark_serializer
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Times the client\'s per-message work on the messages of a Chess game.')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS), help='what to time')
+    parser.add_argument('-m', '--messages', default=DEFAULT_MESSAGES, help='the messages, one JSON message per line (synthetic ones by default)')
+    parser.add_argument('-r', '--repeat', type=int, default=200, help='times to go over the messages')
+    args = parser.parse_args()
+
+    BENCHMARKS[args.benchmark](read_messages(args.messages), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
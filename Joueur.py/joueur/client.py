@@ -2,43 +2,78 @@ import socket
 import errno
 import sys
 import os
-import json
 import time
+from collections import deque
 from joueur.serializer import serialize, deserialize
+from joueur.codec import default_codec
+from joueur.dispatcher import EventDispatcher
+from joueur.instrumentation import NO_INSTRUMENTATION, AI_THINK, AI_UPDATE, \
+    DELTA_MERGE, SERIALIZE, DESERIALIZE, ENCODE, DECODE
+import joueur.async_client as async_client
 import joueur.error_code as error_code
 from joueur.game_manager import GameManager
 import joueur.ansi_color_coder as color
 
 EOT_CHAR = chr(4)
+EOT_BYTES = EOT_CHAR.encode('utf-8')
+
+# Bytes read from the socket at a time, the buffer growing as needed to hold
+# a whole message
+DEFAULT_BUFFER_SIZE = 64 * 1024
 
 
 # Client: A singleton module that talks to the server receiving game
 # information and sending commands to execute. Clients perform no game logic
 class _Client:
     socket = None
+    facade = None  # the asyncio transport's SyncClient, when used instead
+    instrumentation = NO_INSTRUMENTATION
 
 _client = _Client()
 
 
-def connect(hostname='localhost', port=3000, print_io=False):
+# the codec (from joueur.codec) turns messages into bytes and back, the
+# fastest one installed if not given. The instrumentation (from
+# joueur.instrumentation), if given, times the game, exported on disconnecting.
+def connect(hostname='localhost', port=3000, print_io=False, use_asyncio=False,
+            buffer_size=DEFAULT_BUFFER_SIZE, codec=None, instrumentation=None):
     _client.hostname = hostname
     _client.port = int(port)
+    _client.codec = codec or default_codec()
+    _client.instrumentation = instrumentation or NO_INSTRUMENTATION
 
     _client._print_io = print_io
-    _client._received_buffer = ""
-    _client._events_stack = []
-    _client._buffer_size = 1024
+    # bytes received, of which the first _received_length are filled: the
+    # start of a message that has not all arrived yet
+    _client._buffer_size = buffer_size
+    _client._received_buffer = bytearray(buffer_size)
+    _client._received_length = 0
+    _client._events = deque()  # parsed events, oldest first
+    _client._send_buffer = bytearray()  # messages sent but not written yet
     _client._timeout_time = 1.0
 
     print(color.text('cyan') + 'Connecting to:', _client.hostname + ':' + str(
         _client.port) + color.reset())
 
+    if use_asyncio:
+        _client.facade = async_client.SyncClient(print_io, _client.codec,
+                                                 instrumentation)
+        _client.facade.connect(_client.hostname, _client.port)
+        return
+
+    if instrumentation:
+        dispatcher.add_hook(instrumentation.handled)
+
     try:
         _client.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
         # Silly Windows
         _client.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
+        # messages are written out together when flushed, so there is
+        # nothing to gain from the OS holding back small writes
+        _client.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
         # so the blocking on recv doesn't hang forever and other system
         # interrupts (e.g. keyboard) can be handled
         _client.socket.settimeout(_client._timeout_time)
@@ -55,6 +90,8 @@ def connect(hostname='localhost', port=3000, print_io=False):
 
 
 def setup(game, ai, manager):
+    if _client.facade:
+        _client.facade.setup(game, ai, manager)
     _client.game = game
     _client.ai = ai
     _client.manager = manager
@@ -64,26 +101,62 @@ def _send_raw(string):
     if _client._print_io:
         print(color.text('magenta') + 'TO SERVER --> ' + str(
             string) + color.reset())
-    _client.socket.send(string)
+    _client._send_buffer.extend(string)
+
+
+# writes every message sent since the last flush to the socket at once,
+# carrying on from wherever a write stops part of the way
+def flush():
+    if _client.facade or not _client._send_buffer:
+        return
+
+    with memoryview(_client._send_buffer) as view:
+        written = 0
+        while written < len(view):
+            try:
+                written = written + _client.socket.send(view[written:])
+            except socket.timeout:
+                pass  # the OS buffer is full, so try again once it drains
+            except socket.error as e:
+                error_code.handle_error(
+                    error_code.DISCONNECTED_UNEXPECTEDLY, e,
+                    'Error writing to socket')
+    _client._send_buffer.clear()
 
 
-# sends the server an event via socket
+# sends the server an event via socket, written out when next flushed (before
+# waiting for events, and once an order is finished)
 def send(event, data):
-    _send_raw(
-        (json.dumps({
-            'sentTime': int(time.time()),
-            'event': event,
-            'data': serialize(data)
-        }) + EOT_CHAR).encode('utf-8')
-    )
+    if _client.facade:
+        return _client.facade.send(event, data)
+    instrumentation = _client.instrumentation
+    message = instrumentation.time(ENCODE, _client.codec.encode, {
+        'sentTime': int(time.time()),
+        'event': event,
+        'data': instrumentation.time(SERIALIZE, serialize, data)
+    })
+    instrumentation.sent(event, len(message))
+    _send_raw(message + EOT_BYTES)
 
 
 def disconnect(exit_code=None):
+    if _client.facade:
+        _client.facade.disconnect()
     if _client.socket:
+        try:
+            _client.socket.sendall(_client._send_buffer)
+        except socket.error:
+            pass  # closing anyway
         _client.socket.close()
+    _client.instrumentation.export()
 
 
 def run_on_server(caller, function_name, args=None):
+    session_client = async_client.current_client()
+    if session_client:  # the AI of one of many sessions
+        return session_client.run_on_server_threadsafe(caller, function_name, args)
+    if _client.facade:
+        return _client.facade.run_on_server(caller, function_name, args)
     send('run', {
         'caller': caller,
         'functionName': function_name,
@@ -91,38 +164,43 @@ def run_on_server(caller, function_name, args=None):
     })
 
     ran_data = wait_for_event('ran')
-    return deserialize(ran_data, _client.game)
+    return _client.instrumentation.time(DESERIALIZE, deserialize, ran_data, _client.game)
 
 
 def play():
+    if _client.facade:
+        return _client.facade.play()
     wait_for_event(None)
 
 
 def wait_for_event(event):
+    if _client.facade:
+        return _client.facade.wait_for_event(event)
     while True:
         wait_for_events()
 
-        while len(_client._events_stack) > 0:
-            sent = _client._events_stack.pop()
+        while _client._events:
+            sent = _client._events.popleft()
             data = sent['data'] if 'data' in sent else None
             if event is not None and sent['event'] == event:
                 return data
             else:
-                _auto_handle(sent['event'], data)
+                dispatcher.dispatch(sent['event'], data)
 
 
 # loops to check the socket for incoming data and ends once some events
 # get found
 def wait_for_events():
-    if len(_client._events_stack) > 0:
+    if _client._events:
         return  # as we already have events to handle, no need to wait for more
 
+    flush()  # the server may be waiting on what was sent
+
     try:
         while True:
-            sent = None
+            received = 0
             try:
-                sent = _client.socket.recv(_client._buffer_size) \
-                    .decode('utf-8')
+                received = _receive()
             except socket.timeout:
                 pass  # timed out so keyboard/system interrupts can be handled,
                 #       hence the while true loop above
@@ -131,62 +209,85 @@ def wait_for_events():
                     error_code.CANNOT_READ_SOCKET, e,
                     'Error reading socket while waiting for events')
 
-            if not sent:
+            if not received:
                 continue
-            elif _client._print_io:
-                print(color.text('magenta') + 'FROM SERVER <-- ' + str(
-                    sent) + color.reset())
-
-            split = (_client._received_buffer + sent).split(EOT_CHAR)
-            # the last item will either be "" if the last char was an EOT_CHAR,
-            #   or a partial data we need to buffer anyways
-            _client._received_buffer = split.pop()
-
-            for json_str in reversed(split):
-                try:
-                    parsed = json.loads(json_str)
-                except ValueError as e:
-                    error_code.handle_error(error_code.MALFORMED_JSON, e,
-                                            'Could not parse json ""'.format(
-                                                json_str)
-                                            )
-
-                _client._events_stack.append(parsed)
-
-            if len(_client._events_stack) > 0:
+
+            _parse_messages(received)
+
+            if _client._events:
                 return
     except (KeyboardInterrupt, SystemExit):
         disconnect()
 
 
-# called via the client run loop when data is sent
-def _auto_handle(event, data=None):
-    # the current module, e.g. the Client module that acts as a singleton
-    g = globals()
-    auto_handle_function = g['_auto_handle_' + event]
+# reads from the socket straight into the end of the received buffer, growing
+# it first if it is full, and returns the number of bytes read
+def _receive():
+    buffer = _client._received_buffer
+    length = _client._received_length
+    if len(buffer) - length < _client._buffer_size:
+        buffer.extend(bytes(max(len(buffer), _client._buffer_size)))
 
-    if auto_handle_function:
-        return auto_handle_function(data)
-    else:
-        error_code.handle_error(error_code.UNKNOWN_EVENT_FROM_SERVER, message=(
-            'Could not auto handle event "{}".'.format(event)))
+    with memoryview(buffer) as view:
+        received = _client.socket.recv_into(view[length:])
+
+    if received == 0:
+        error_code.handle_error(error_code.DISCONNECTED_UNEXPECTEDLY,
+                                message='Server closed the connection')
+
+    if _client._print_io:
+        print(color.text('magenta') + 'FROM SERVER <-- ' + buffer[
+            length:length + received].decode('utf-8', 'replace') + color.reset())
+
+    _client._received_length = length + received
+    return received
+
+
+# parses the messages completed by the bytes just received (only those are
+# searched for EOT_CHAR) onto the events queue, then moves what is left of an
+# unfinished message to the start of the buffer
+def _parse_messages(received):
+    buffer = _client._received_buffer
+    end = _client._received_length
+    start = 0
+
+    instrumentation = _client.instrumentation
+    eot = buffer.find(EOT_BYTES, end - received, end)
+    while eot != -1:
+        try:
+            parsed = instrumentation.time(DECODE, _client.codec.decode, buffer[start:eot])
+        except ValueError as e:
+            error_code.handle_error(error_code.MALFORMED_JSON, e,
+                                    'Could not parse json "{}"'.format(
+                                        buffer[start:eot].decode('utf-8', 'replace'))
+                                    )
+        instrumentation.received(parsed, eot - start)
+        _client._events.append(parsed)
+        start = eot + 1
+        eot = buffer.find(EOT_BYTES, start, end)
+
+    if start > 0:
+        buffer[:end - start] = buffer[start:end]
+        _client._received_length = end - start
 
 
 def _auto_handle_delta(data):
+    instrumentation = _client.instrumentation
     try:
-        _client.manager.apply_delta_state(data)
+        instrumentation.time(DELTA_MERGE, _client.manager.apply_delta_state, data)
     except:
         error_code.handle_error(error_code.DELTA_MERGE_FAILURE, sys.exc_info(),
                                 'Error merging delta')
 
     if _client.ai.player:  # then the AI is ready for updates
-        _client.ai.game_updated()
+        instrumentation.time(AI_UPDATE, _client.ai.game_updated)
 
 
 def _auto_handle_order(data):
-    args = deserialize(data['args'], _client.game)
+    instrumentation = _client.instrumentation
+    args = instrumentation.time(DESERIALIZE, deserialize, data['args'], _client.game)
     try:
-        returned = _client.ai._do_order(data['name'], args)
+        returned = instrumentation.time(AI_THINK, _client.ai._do_order, data['name'], args)
     except:
         print('esc info', type(sys.exc_info()))
         error_code.handle_error(error_code.AI_ERRORED, sys.exc_info(),
@@ -197,6 +298,8 @@ def _auto_handle_order(data):
         'orderIndex': data['index'],
         'returned': returned
     })
+    flush()
+    instrumentation.order_finished(data['index'])
 
 
 def _auto_handle_invalid(data):
@@ -239,3 +342,15 @@ def _auto_handle_over(data):
 
     disconnect()
     os._exit(0)
+
+
+# handles the events from the server not being waited for, called via the
+# client run loop when they are sent. Other handlers can be registered on it,
+# and hooks added to it (e.g. to time each type of event)
+dispatcher = EventDispatcher({
+    'delta': _auto_handle_delta,
+    'order': _auto_handle_order,
+    'invalid': _auto_handle_invalid,
+    'fatal': _auto_handle_fatal,
+    'over': _auto_handle_over
+})
@@ -0,0 +1,46 @@
+# Codecs: turn the messages sent to and from the server into JSON bytes and
+# back, straight from and to bytes (so nothing is decoded to str first)
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # optional, the standard library json is used without it
+
+
+# JsonCodec: the standard library json, written without spaces
+class JsonCodec:
+    name = 'json'
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def encode(self, message):
+        return self._encoder.encode(message).encode('utf-8')
+
+    # data can be bytes or a bytearray
+    def decode(self, data):
+        return json.loads(data)
+
+
+# OrjsonCodec: orjson, which works on bytes natively and is several times
+# faster than json
+class OrjsonCodec:
+    name = 'orjson'
+
+    def encode(self, message):
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
+
+    def decode(self, data):
+        return orjson.loads(data)
+
+
+# Codecs by name, of those that can be used here
+CODECS = {JsonCodec.name: JsonCodec}
+if orjson is not None:
+    CODECS[OrjsonCodec.name] = OrjsonCodec
+
+
+# gets the fastest codec that can be used here
+def default_codec():
+    return OrjsonCodec() if orjson is not None else JsonCodec()
@@ -0,0 +1,115 @@
+import typing
+
+# Types of values set as they are, without merging
+PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+
+# gets the type a property is annotated to return, or None
+def property_type(prop):
+    return getattr(prop.fget, '__annotations__', {}).get('return')
+
+
+# checks if a type is one of the primitive types
+def is_primitive(annotation):
+    return annotation in PRIMITIVE_TYPES
+
+
+# checks if a type is a list of one of the primitive types, e.g. List[str]
+def is_primitive_list(annotation):
+    return typing.get_origin(annotation) is list and \
+        all(is_primitive(arg) for arg in typing.get_args(annotation))
+
+
+# checks if a type is a dict of game objects by id, whose values the
+# generated classes annotate by name, e.g. Dict[str, 'games.chess.player.Player']
+def is_game_object_dict(annotation):
+    args = typing.get_args(annotation)
+    return typing.get_origin(annotation) is dict and len(args) == 2 and \
+        args[0] is str and isinstance(args[1], typing.ForwardRef)
+
+
+# DeltaApplier: applies deltas to the instances of one game (object) class,
+# generated from the types its properties are annotated with. Primitive
+# attributes are set, lists of primitives (e.g. a history) resized and
+# appended to, and the game objects in a dict of them merged, directly.
+# Anything else (game object references, other dicts, removals, ...) is left
+# to the generic merge, which merge_object is.
+class DeltaApplier:
+    def __init__(self, cls, attribute_names, removed, list_length, merge_object):
+        self.removed = removed
+        self.list_length = list_length
+        self.merge_object = merge_object
+
+        # delta key to (attribute name, function applying a value to it)
+        self.fields = {}
+        for key, name in attribute_names.items():
+            annotation = property_type(getattr(cls, name[1:]))
+            if is_primitive(annotation):
+                self.fields[key] = (name, self._set_primitive)
+            elif is_primitive_list(annotation):
+                self.fields[key] = (name, self._merge_primitive_list)
+            elif is_game_object_dict(annotation):
+                self.fields[key] = (name, self._merge_game_objects)
+
+    # applies what it can of a delta to an instance, and returns the rest
+    # (None if nothing is left)
+    def apply(self, state, delta):
+        attributes = state.__dict__
+        rest = None
+        for key, value in delta.items():
+            field = self.fields.get(key)
+            if field is None or not field[1](attributes, field[0], value):
+                if rest is None:
+                    rest = {}
+                rest[key] = value
+        return rest
+
+    # sets a primitive attribute, unless the value is not one (or a removal)
+    def _set_primitive(self, attributes, name, value):
+        if type(value) not in PRIMITIVE_TYPES or value == self.removed:
+            return False
+        attributes[name] = value
+        return True
+
+    # merges a list delta ({list_length: n, "index": value, ...}) into a list
+    # of primitives: cut or grown to its length, with the new entries added in
+    # one go, then the changed ones set. Returns False, having changed
+    # nothing, if the delta has anything but primitives.
+    def _merge_primitive_list(self, attributes, name, value):
+        current = attributes.get(name)
+        if type(value) is not dict or type(current) is not list or self.list_length not in value:
+            return False
+
+        for key, item in value.items():
+            if key != self.list_length and (type(item) not in PRIMITIVE_TYPES or item == self.removed):
+                return False
+
+        length = value[self.list_length]
+        old_length = len(current)
+        if length < old_length:
+            del current[length:]
+        elif length > old_length:
+            current.extend([value.get(str(index)) for index in range(old_length, length)])
+
+        for key, item in value.items():
+            if key != self.list_length:
+                index = int(key)
+                if index < old_length:
+                    current[index] = item
+        return True
+
+    # merges the deltas of game objects already in a dict of them by id
+    # straight into each one. Returns False, having changed nothing, if any
+    # is new, removed or replaced.
+    def _merge_game_objects(self, attributes, name, value):
+        current = attributes.get(name)
+        if type(value) is not dict or type(current) is not dict:
+            return False
+
+        for key, item in value.items():
+            if type(item) is not dict or key not in current or (len(item) == 1 and 'id' in item):
+                return False
+
+        for key, item in value.items():
+            self.merge_object(current[key], item)
+        return True
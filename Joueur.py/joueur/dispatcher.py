@@ -0,0 +1,58 @@
+import time
+import joueur.error_code as error_code
+
+
+# EventDispatcher: the handler of each event from the server, looked up by
+# name, with hooks called after each event is handled with how long it took
+# (e.g. to time each type of event). Handlers can be registered over the
+# default ones, and hooks added and removed, at any time.
+class EventDispatcher:
+    def __init__(self, handlers=None):
+        self.handlers = dict(handlers or {})
+        self.hooks = []
+
+    # makes handler (called with the event's data) handle the event
+    def register(self, event, handler):
+        self.handlers[event] = handler
+
+    # adds a hook, called with the event and the seconds its handler took
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    # gets the handler of an event, reporting it if there is none
+    def handler(self, event):
+        handler = self.handlers.get(event)
+        if handler is None:
+            error_code.handle_error(error_code.UNKNOWN_EVENT_FROM_SERVER, message=(
+                'Could not auto handle event "{}".'.format(event)))
+        return handler
+
+    def dispatch(self, event, data=None):
+        handler = self.handler(event)
+        if not self.hooks:
+            return handler(data)
+
+        start = time.perf_counter()
+        try:
+            return handler(data)
+        finally:
+            self._call_hooks(event, time.perf_counter() - start)
+
+    # dispatches to a coroutine handler, timing it until it is done
+    async def dispatch_async(self, event, data=None):
+        handler = self.handler(event)
+        if not self.hooks:
+            return await handler(data)
+
+        start = time.perf_counter()
+        try:
+            return await handler(data)
+        finally:
+            self._call_hooks(event, time.perf_counter() - start)
+
+    def _call_hooks(self, event, seconds):
+        for hook in self.hooks:
+            hook(event, seconds)
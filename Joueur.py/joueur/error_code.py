@@ -26,14 +26,30 @@ import sys
 import joueur.ansi_color_coder as color
 import os
 
+# ClientError: an error of one client of many (see joueur.session), raised
+# rather than exiting so it only ends the game that client is playing
+class ClientError(Exception):
+    def __init__(self, error_code, message=None, e=None):
+        super().__init__(message or name(error_code))
+        self.error_code = error_code
+        self.e = e
+
+def name(error_code):
+    return _by_code[error_code] if error_code in _by_code else "UNKNOWN ERROR {}".format(error_code)
+
 def handle_error(error_code, e=None, message=None):
     if isinstance(e, SystemExit) or isinstance(e, KeyboardInterrupt): # we accidentally caught an exit exception, just re-throw it till it gets to the end of the runtime stack
         sys.exit(e.code)
 
+    import joueur.async_client
+    client = joueur.async_client.current_client()
+    if client is not None and client.raise_errors:
+        raise ClientError(error_code, message, e)
+
     import joueur.client # avoid circular imports (sphinx won't build docs otherwise)
     joueur.client.disconnect()
 
-    sys.stderr.write(color.text("red") + "---\nError: {}\n---".format(_by_code[error_code] if error_code in _by_code else "UNKNOWN ERROR {}".format(error_code)))
+    sys.stderr.write(color.text("red") + "---\nError: {}\n---".format(name(error_code)))
 
     if message:
         sys.stderr.write("\n{}\n---".format(message))
@@ -1,19 +1,45 @@
 from joueur.delta_mergeable import DeltaMergeable
+from joueur.delta_applier import DeltaApplier
 from joueur.base_game_object import BaseGameObject
 from joueur.utilities import camel_case_converter
 from joueur.serializer import is_game_object_reference, is_object
 
+# gets the attribute names of a class's properties by the camelCase keys the
+# server sends them as, e.g. {'gameObjects': '_game_objects'}
+def attribute_names(cls):
+    names = {}
+    for name in dir(cls):
+        if isinstance(getattr(cls, name, None), property):
+            parts = name.split('_')
+            key = parts[0] + ''.join(part.capitalize() for part in parts[1:])
+            if camel_case_converter(key) == name: # the server's key converts back to it
+                names[key] = '_' + name
+    return names
+
 # @class GameManager: managed the game and it's game objects including unserializing deltas
 class GameManager():
     def __init__(self, game):
         self.game = game
         self._game_object_classes = game._game_object_classes
 
+        # delta keys to attribute names by class, worked out once here for the
+        # game and its game object classes (and for any other key when first
+        # seen) instead of converting the keys of every delta
+        self._attribute_names = {}
+        for cls in [type(game)] + list(self._game_object_classes.values()):
+            self._attribute_names[cls] = attribute_names(cls)
+
+        # typed delta appliers by class, made once the constants are known
+        self._appliers = {}
+
     def set_constants(self, constants):
         self._server_constants = constants
         self._DELTA_REMOVED = constants['DELTA_REMOVED']
         self._DELTA_LIST_LENGTH = constants['DELTA_LIST_LENGTH']
 
+        for cls, names in self._attribute_names.items():
+            self._appliers[cls] = DeltaApplier(cls, names, self._DELTA_REMOVED, self._DELTA_LIST_LENGTH, self._merge_delta)
+
     ## applies a delta state (change in state information) to this game
     def apply_delta_state(self, delta):
         if 'gameObjects' in delta:
@@ -27,15 +53,24 @@ class GameManager():
             if not id in self.game._game_objects: # then we need to create it
                 self.game._game_objects[id] = self._game_object_classes[obj['gameObjectName']]()
 
-    ## Correctly apply a single change to a member of a list, dict, or object
-    def _set_member(self, state, state_key, value):
-        if isinstance(state_key, int) or isinstance(state, dict):
-            state[state_key] = value
-        else:
-            setattr(state, state_key, value)
+    ## gets the attribute a delta key of an instance of the class sets
+    def _attribute_name(self, cls, key):
+        names = self._attribute_names.get(cls)
+        if names is None:
+            names = self._attribute_names[cls] = attribute_names(cls)
+        name = names.get(key)
+        if name is None:
+            name = names[key] = '_' + camel_case_converter(key)
+        return name
 
     ## recursively merges delta changes to the game.
     def _merge_delta(self, state, delta):
+        applier = self._appliers.get(type(state))
+        if applier is not None: # then the fields it knows are applied directly, and only the rest merged here
+            delta = applier.apply(state, delta)
+            if delta is None:
+                return
+
         delta_length = -1
         if self._DELTA_LIST_LENGTH in delta:
             delta_length = delta[self._DELTA_LIST_LENGTH]
@@ -47,30 +82,33 @@ class GameManager():
             while len(state) < delta_length: # append elements on the array to make it's size correct.
                 state.append(None)
 
-        for key in delta: # deltas will always be objects when iterating through, arrays just have keys of numbers
-            d = delta[key]
-            state_key = key # array's keys are real numbers, not strings e.g. "1"
-            key_in_state = False
+        # members are set in the container the same way whatever it is: a list
+        # by index, a dict by key, or a game (object) through its attributes
+        is_list = isinstance(state, list)
+        container = state
+        cls = None
+        if isinstance(state, DeltaMergeable):
+            container = state.__dict__
+            cls = type(state)
 
-            if isinstance(state, list):
-                state_key = int(key)
+        for key, d in delta.items(): # deltas will always be objects when iterating through, arrays just have keys of numbers
+            if is_list:
+                state_key = int(key) # array's keys are real numbers, not strings e.g. "1"
                 key_in_state = state_key < len(state)
             else:
-                if isinstance(state, DeltaMergeable):
-                    state_key = "_" + camel_case_converter(state_key)
-                key_in_state = state_key in state
+                state_key = key if cls is None else self._attribute_name(cls, key)
+                key_in_state = state_key in container
 
             if d == self._DELTA_REMOVED:
                 if key_in_state:
-                    del state[state_key]
+                    del container[state_key]
             elif is_game_object_reference(d): # then this is a shallow reference to a game object
-                referenced_object = self.game.get_game_object(d['id'])
-                self._set_member(state, state_key, referenced_object)
-            elif is_object(d) and key_in_state and is_object(state[state_key]):
-                self._merge_delta(state[state_key], d)
+                container[state_key] = self.game.get_game_object(d['id'])
+            elif is_object(d) and key_in_state and is_object(container[state_key]):
+                self._merge_delta(container[state_key], d)
             elif not key_in_state and is_object(d):
                 if isinstance(d, dict):
-                    self._set_member(state, state_key, [] if self._DELTA_LIST_LENGTH in d else {})
-                    self._merge_delta(state[state_key], d)
+                    container[state_key] = [] if self._DELTA_LIST_LENGTH in d else {}
+                    self._merge_delta(container[state_key], d)
             else:
-                self._set_member(state, state_key, d)
+                container[state_key] = d
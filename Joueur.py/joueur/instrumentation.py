@@ -0,0 +1,200 @@
+# Instrumentation: times what the client does as a game is played (sending and
+# receiving, (de)serializing, merging deltas, the AI thinking, ...) into
+# histograms, and timestamps every message sent and received, then exports it
+# all to a JSON file (or as CSV, to a file of the histograms and one of the
+# messages) once the game is over. Recording only appends to lists, so it
+# barely slows the client down (unlike printing IO).
+import csv
+import json
+import threading
+import time
+from array import array
+
+# Names of the timings recorded, each in seconds
+SERIALIZE = 'serialize'  # game objects into references, for sending
+DESERIALIZE = 'deserialize'  # references into game objects, once received
+ENCODE = 'encode'  # messages into bytes, by the codec
+DECODE = 'decode'  # bytes into messages, by the codec
+DELTA_MERGE = 'delta merge'
+AI_THINK = 'ai think'  # the AI executing an order
+AI_UPDATE = 'ai game updated'
+ORDER_LATENCY = 'order latency'  # an order arriving to its finished being written
+HANDLE = 'handle {}'  # an event from the server being handled, by its name
+
+# Upper bounds of the histograms' buckets, in seconds: 1us doubling to ~16s,
+# then everything longer
+BUCKET_BOUNDS = [0.000001 * 2 ** i for i in range(25)] + [float('inf')]
+
+
+# Histogram: the samples of one timing, summarized when exported
+class Histogram:
+    def __init__(self):
+        self.samples = array('d')
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    # the count of samples in each bucket (see BUCKET_BOUNDS)
+    def buckets(self):
+        counts = [0] * len(BUCKET_BOUNDS)
+        for seconds in self.samples:
+            bucket = 0
+            while seconds > BUCKET_BOUNDS[bucket]:
+                bucket = bucket + 1
+            counts[bucket] = counts[bucket] + 1
+        return counts
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        count = len(ordered)
+        return {
+            'count': count,
+            'total': sum(ordered),
+            'mean': sum(ordered) / count if count else 0.0,
+            'min': ordered[0] if count else 0.0,
+            'p50': _percentile(ordered, 50),
+            'p90': _percentile(ordered, 90),
+            'p99': _percentile(ordered, 99),
+            'max': ordered[-1] if count else 0.0
+        }
+
+
+# the nearest rank percentile of sorted samples
+def _percentile(ordered, percent):
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+# gets the path the messages are exported to as CSV, next to the histograms'
+# e.g. 'timing.messages.csv' for 'timing.csv'
+def messages_path(path):
+    return path[:-len('.csv')] + '.messages.csv'
+
+
+# Instrumentation: the timings of one game, exported to path (as CSV if it
+# ends with .csv, the messages then going to messages_path(path), else JSON)
+class Instrumentation:
+    def __init__(self, path):
+        self.path = path
+        self.histograms = {}
+        # (seconds since started, 'sent' or 'received', event, bytes) of each
+        # message
+        self.messages = []
+        self.started = time.time()
+        self._origin = time.perf_counter()
+        self._orders = {}  # when each order being executed arrived, by index
+        self._exported = False
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+
+    # calls function with args, recording how long it took as name
+    def time(self, name, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    # records an event being handled, as a hook of an EventDispatcher
+    def handled(self, event, seconds):
+        self.record(HANDLE.format(event), seconds)
+
+    def sent(self, event, size):
+        self.messages.append((time.perf_counter() - self._origin, 'sent', event, size))
+
+    # a message was received, remembering when for orders (for their latency)
+    def received(self, message, size):
+        now = time.perf_counter()
+        event = message.get('event')
+        self.messages.append((now - self._origin, 'received', event, size))
+        if event == 'order':
+            self._orders[message['data']['index']] = now
+
+    # the finished event of an order has been written to the server
+    def order_finished(self, index):
+        received = self._orders.pop(index, None)
+        if received is not None:
+            self.record(ORDER_LATENCY, time.perf_counter() - received)
+
+    # writes the timings to the file, once (however many times called, from
+    # whichever threads: each returns once the file is written)
+    def export(self):
+        with self._lock:
+            if self._exported:
+                return
+            self._exported = True
+
+            if self.path.lower().endswith('.csv'):
+                self._export_csv()
+            else:
+                self._export_json()
+
+    def _export_json(self):
+        with open(self.path, 'w') as f:
+            json.dump({
+                'started': self.started,
+                'bucketBounds': BUCKET_BOUNDS[:-1],
+                'histograms': {
+                    name: dict(histogram.summary(), buckets=histogram.buckets())
+                    for name, histogram in self.histograms.items()
+                },
+                'messages': [
+                    {'time': t, 'direction': direction, 'event': event, 'bytes': size}
+                    for t, direction, event, size in self.messages
+                ]
+            }, f, indent=2)
+
+    # one row per histogram: its summary, then the count in each bucket, and
+    # in a file of their own, one row per message
+    def _export_csv(self):
+        summary_fields = ['count', 'total', 'mean', 'min', 'p50', 'p90', 'p99', 'max']
+        bucket_fields = ['le_{:g}'.format(bound) for bound in BUCKET_BOUNDS]
+        with open(self.path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name'] + summary_fields + bucket_fields)
+            for name, histogram in self.histograms.items():
+                summary = histogram.summary()
+                writer.writerow([name] + [summary[field] for field in summary_fields] +
+                                histogram.buckets())
+
+        with open(messages_path(self.path), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['time', 'direction', 'event', 'bytes'])
+            writer.writerows(self.messages)
+
+
+# NullInstrumentation: records nothing, what clients use when not timing
+class NullInstrumentation:
+    def __bool__(self):
+        return False
+
+    def record(self, name, seconds):
+        pass
+
+    def time(self, name, function, *args):
+        return function(*args)
+
+    def handled(self, event, seconds):
+        pass
+
+    def sent(self, event, size):
+        pass
+
+    def received(self, message, size):
+        pass
+
+    def order_finished(self, index):
+        pass
+
+    def export(self):
+        pass
+
+
+NO_INSTRUMENTATION = NullInstrumentation()
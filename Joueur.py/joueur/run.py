@@ -3,20 +3,79 @@ import joueur.client
 import sys
 import joueur.error_code as error_code
 from joueur.game_manager import GameManager
+from joueur.instrumentation import Instrumentation
 from joueur.utilities import camel_case_converter
 import joueur.ansi_color_coder as color
 
 
+# adds the options of the client itself (beyond the connection and game
+# options main.py has) to main.py's argument parser
+def add_arguments(parser):
+    parser.add_argument(
+        '--asyncio',
+        action='store_true',
+        dest='use_asyncio',
+        help='talk to the server from an asyncio event loop, served while the AI thinks')
+    parser.add_argument(
+        '--sessions',
+        action='store',
+        dest='sessions',
+        type=int,
+        default=1,
+        help='the number of games to play at once in this one process, each in a session of its own (all with the same --aiSettings)')
+    parser.add_argument(
+        '--timing',
+        action='store',
+        dest='timing',
+        default=None,
+        help='(debugging) time sending, receiving, merging deltas and the AI, and write the timings to this file (.json, or .csv with the messages in .messages.csv) once the game is over')
+
+
 def run(args):
     split_server = args.server.split(":")
     args.server = split_server[0]
     args.port = int((len(split_server) == 2 and split_server[1])) or args.port
 
-    joueur.client.connect(args.server, args.port, args.print_io)
+    if args.sessions > 1:
+        from joueur.session import run_sessions
+        return run_sessions(args)
+
+    instrumentation = Instrumentation(args.timing) if args.timing else None
+    joueur.client.connect(args.server, args.port, args.print_io, args.use_asyncio,
+                          instrumentation=instrumentation)
 
     joueur.client.send("alias", args.game)
     game_name = joueur.client.wait_for_event("named")
 
+    module = import_game(game_name)
+    game = module.Game()
+    ai = create_ai(module, game)
+    manager = GameManager(game)
+
+    joueur.client.setup(game, ai, manager)
+
+    ai.set_settings(args.ai_settings)
+
+    joueur.client.send("play", play_data(args, game_name, ai))
+
+    lobby_data = joueur.client.wait_for_event("lobbied")
+
+    print_lobby(module, lobby_data)
+
+    manager.set_constants(lobby_data['constants'])
+
+    start_data = joueur.client.wait_for_event("start")
+
+    print(color.text("green") + "Game is starting." + color.reset())
+
+    ai.set_player(game.get_game_object(start_data['playerID']))
+    start_ai(ai)
+
+    joueur.client.play()
+
+
+# imports the module of the game named by the server, with its Game and AI
+def import_game(game_name):
     module_str = "games." + camel_case_converter(game_name)
 
     spec = importlib.util.find_spec(module_str)
@@ -29,7 +88,7 @@ def run(args):
 
     try:
         # should load Game and AI to load based on the game selected in args
-        module = importlib.import_module(module_str)
+        return importlib.import_module(module_str)
     except ImportError as e:
         error_code.handle_error(
             error_code.REFLECTION_FAILED,
@@ -37,9 +96,10 @@ def run(args):
             'Could not import game module: "{}".'.format(module_str)
         )
 
-    game = module.Game()
+
+def create_ai(module, game):
     try:
-        ai = module.AI(game)
+        return module.AI(game)
     except:
         error_code.handle_error(
             error_code.AI_ERRORED,
@@ -48,13 +108,10 @@ def run(args):
             'Probably a syntax error in your AI.'
         )
 
-    manager = GameManager(game)
-
-    joueur.client.setup(game, ai, manager)
-
-    ai.set_settings(args.ai_settings)
 
-    joueur.client.send("play", {
+# the data of the play event, asking to play the game as args say
+def play_data(args, game_name, ai):
+    return {
         'gameName': game_name,
         'password': args.password,
         'requestedSession': args.session,
@@ -62,10 +119,10 @@ def run(args):
         'playerName': args.name or ai.get_name() or "Python Player",
         'playerIndex': args.index,
         'gameSettings': args.game_settings
-    })
+    }
 
-    lobby_data = joueur.client.wait_for_event("lobbied")
 
+def print_lobby(module, lobby_data):
     if lobby_data['gameVersion'] != module.game_version:
         print("""{}WARNING: Game versions do not match.
 -> Your local game version is:     {}
@@ -87,13 +144,9 @@ Version mismatch means that unexpected crashes may happen due to differing game
         )
     )
 
-    manager.set_constants(lobby_data['constants'])
-
-    start_data = joueur.client.wait_for_event("start")
-
-    print(color.text("green") + "Game is starting." + color.reset())
 
-    ai.set_player(game.get_game_object(start_data['playerID']))
+# starts the AI once it has its player, with the game as it starts
+def start_ai(ai):
     try:
         ai.start()
         ai.game_updated()
@@ -103,5 +156,3 @@ Version mismatch means that unexpected crashes may happen due to differing game
             sys.exc_info()[0],
             'AI errored during game initialization'
         )
-
-    joueur.client.play()
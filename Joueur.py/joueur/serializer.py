@@ -1,6 +1,12 @@
 # Serializer: functions to serialize and unserialize json communication strings
 from joueur.base_game_object import BaseGameObject
 
+# Types of values that are sent as they are
+PRIMITIVES = frozenset((str, int, float, bool, type(None)))
+
+# Returned by a replace function for a value it leaves as it is
+_KEEP = object()
+
 def is_game_object_reference(d):
     return (isinstance(d, dict) and len(d) == 1 and 'id' in d)
 
@@ -8,35 +14,75 @@ def is_object(obj):
     return (isinstance(obj, dict) or isinstance(obj, list)) or isinstance(obj, BaseGameObject)
 
 def serialize(data):
-    if not isinstance(data, (list, dict, BaseGameObject)):
-        return data
+    return _transform(data, _serialize_value, None)
+
+def deserialize(data, game):
+    return _transform(data, _deserialize_value, game)
 
-    if isinstance(data, BaseGameObject):
-        return {'id': data.id}
+# game objects are sent as references to them
+def _serialize_value(value, game):
+    if isinstance(value, BaseGameObject):
+        return {'id': value.id}
+    return _KEEP
 
-    serialized = {}
-    for key in data:
-        value = data[key]
-        if is_object(value):
-            serialized[key] = serialize(value)
-        else:
-            serialized[key] = value
-    return serialized
+# references to game objects are replaced by the game objects
+def _deserialize_value(value, game):
+    if type(value) is dict and len(value) == 1 and 'id' in value:
+        return game.get_game_object(value['id'])
+    return _KEEP
 
-def deserialize(data, game):
-    if not isinstance(data, (list, dict, BaseGameObject)):
+# Replaces the values in data (and in the lists and dicts in it, however deep)
+# that replace (given the value and the game) gets something other than _KEEP
+# for, walking it with a stack rather than recursion. Containers are only
+# copied when something in them is replaced, so anything with nothing to
+# replace is returned as it is.
+def _transform(data, replace, game):
+    if type(data) in PRIMITIVES:
         return data
+    replaced = replace(data, game)
+    if replaced is not _KEEP:
+        return replaced
+    if not isinstance(data, (list, dict)) or _is_flat(data):
+        return data
+
+    # each frame: a container, an iterator over its (key, value) pairs, its
+    # copy once something in it is replaced, and its key in its parent
+    stack = [[data, _pairs(data), None, None]]
+    while True:
+        frame = stack[-1]
+        pair = next(frame[1], None)
+        if pair is not None:
+            key, value = pair
+            if type(value) in PRIMITIVES:
+                continue
+            replaced = replace(value, game)
+            if replaced is not _KEEP:
+                if frame[2] is None:
+                    frame[2] = frame[0].copy()
+                frame[2][key] = replaced
+            elif isinstance(value, (list, dict)):
+                stack.append([value, _pairs(value), None, key])
+            continue
 
-    if is_game_object_reference(data):
-        return game.get_game_object(data['id'])
+        # all of this container's values are done
+        stack.pop()
+        container, pairs, copy, key = frame
+        if not stack:
+            return container if copy is None else copy
+        if copy is not None:
+            parent = stack[-1]
+            if parent[2] is None:
+                parent[2] = parent[0].copy()
+            parent[2][key] = copy
 
-    # else if we got here it's a list or dict
-    deserialized = [None] * len(data) if isinstance(data, list) else {}
-    seq_iter = data.items if isinstance(data, dict) else enumerate(data)
-    for key, value in seq_iter:
-        if is_object(value):
-            deserialized[key] = deserialize(value, game)
-        else:
-            deserialized[key] = value
+# checks if a list or dict holds only primitives (as most do), so there is
+# nothing in it to replace
+def _is_flat(container):
+    for value in (container.values() if type(container) is dict else container):
+        if type(value) not in PRIMITIVES:
+            return False
+    return True
 
-    return deserialized
+# gets an iterator over the (key, value) pairs of a list or dict
+def _pairs(container):
+    return iter(container.items()) if isinstance(container, dict) else enumerate(container)
@@ -0,0 +1,119 @@
+# Session: plays one game, with its own connection (and buffers), game, AI and
+# game manager, so that many can be played at once in one process (e.g. for
+# tournaments), rather than paying for a python process per game.
+#
+# Sessions share one asyncio event loop, each talking to the server through an
+# AsyncClient of its own, and calling its AI on a thread of its own, so one AI
+# thinking holds up none of the others' connections. AIs searching for long in
+# python still take turns for the interpreter; an AI that can search in
+# processes (as the chess AI does with its "workers" setting) gets around that.
+#
+# An error in a session (the AI's included) ends only that session. Timings
+# (--timing) are exported per session, numbered, e.g. timing-0.json.
+import asyncio
+import os
+import sys
+import time
+import joueur.error_code as error_code
+import joueur.ansi_color_coder as color
+from joueur.async_client import AsyncClient
+from joueur.game_manager import GameManager
+from joueur.instrumentation import Instrumentation
+from joueur.run import import_game, create_ai, play_data, print_lobby, start_ai
+
+
+class Session:
+    def __init__(self, args, index=0, codec=None):
+        self.args = args
+        self.index = index
+        instrumentation = None
+        if args.timing:
+            root, extension = os.path.splitext(args.timing)
+            instrumentation = Instrumentation('{}-{}{}'.format(root, index, extension))
+        self.client = AsyncClient(args.print_io, codec, raise_errors=True,
+                                  instrumentation=instrumentation)
+        self.game = None
+        self.ai = None
+        self.manager = None
+
+    # plays the game through, from connecting until it is over
+    async def play(self):
+        args = self.args
+        client = self.client
+        print(color.text('cyan') + 'Session {} connecting to: {}:{}'.format(
+            self.index, args.server, args.port) + color.reset())
+
+        try:
+            await client.connect(args.server, args.port)
+
+            client.send('alias', args.game)
+            game_name = await client.wait_for_event('named')
+
+            module = import_game(game_name)
+            self.game = module.Game()
+            self.ai = create_ai(module, self.game)
+            self.manager = GameManager(self.game)
+
+            client.setup(self.game, self.ai, self.manager)
+
+            self.ai.set_settings(args.ai_settings)
+
+            client.send('play', play_data(args, game_name, self.ai))
+
+            lobby_data = await client.wait_for_event('lobbied')
+
+            print_lobby(module, lobby_data)
+
+            self.manager.set_constants(lobby_data['constants'])
+
+            start_data = await client.wait_for_event('start')
+
+            print(color.text('green') + 'Session {} is starting.'.format(
+                self.index) + color.reset())
+
+            self.ai.set_player(self.game.get_game_object(start_data['playerID']))
+            await client.call_ai(start_ai, self.ai)
+
+            await client.play()
+        finally:
+            client.disconnect()
+
+        return self.ai.player.won
+
+
+# plays args.sessions sessions at once as args say, printing how each went
+def run_sessions(args):
+    start = time.perf_counter()
+    sessions = [Session(args, index) for index in range(args.sessions)]
+    results = asyncio.run(_play_all(sessions))
+
+    failed = 0
+    for session, result in zip(sessions, results):
+        if isinstance(result, BaseException):
+            failed = failed + 1
+            _print_failure(session, result)
+
+    won = sum(1 for result in results if result is True)
+    print('{}Played {} sessions in {:.2f}s: {} won, {} lost, {} failed{}'.format(
+        color.text('green'),
+        len(sessions),
+        time.perf_counter() - start,
+        won,
+        len(sessions) - won - failed,
+        failed,
+        color.reset()
+    ))
+
+
+async def _play_all(sessions):
+    return await asyncio.gather(*(session.play() for session in sessions),
+                                return_exceptions=True)
+
+
+def _print_failure(session, e):
+    if isinstance(e, error_code.ClientError):
+        description = '{}: {}'.format(error_code.name(e.error_code), e)
+    else:
+        description = '{}: {}'.format(type(e).__name__, e)
+    sys.stderr.write('{}Session {} failed with {}{}\n'.format(
+        color.text('red'), session.index, description, color.reset()))
@@ -1,8 +1,10 @@
 # Please do not modify this file.
 # Instead have a look at `README.md` for how to start writing you AI.
+# (Options of the client itself, beyond those below, are added by
+# add_arguments in joueur/run.py, so they don't need this file changed.)
 
 import argparse
-from joueur.run import run
+from joueur.run import run, add_arguments
 
 parser = argparse.ArgumentParser(
     description=
@@ -77,5 +79,6 @@ parser.add_argument(
     action='store_true',
     dest='print_io',
     help='(debugging) print IO through the TCP socket to the terminal')
+add_arguments(parser)
 
 run(parser.parse_args())
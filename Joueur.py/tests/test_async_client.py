@@ -0,0 +1,56 @@
+# Tests of the asyncio client, run from the client's root with: python3 -m pytest
+import argparse
+import asyncio
+import json
+from joueur.async_client import AsyncClient, EOT
+from joueur.run import add_arguments
+
+
+# Serves one connection: writes the chunks given, with a pause between them,
+# then sets the future given to the first message the client sent
+async def serve(chunks, received):
+    async def handle(reader, writer):
+        for chunk in chunks:
+            writer.write(chunk)
+            await writer.drain()
+            await asyncio.sleep(0.01)
+        received.set_result(await reader.readuntil(EOT))
+        writer.close()
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def play(chunks, events):
+    async def main():
+        received = asyncio.get_running_loop().create_future()
+        server = await serve(chunks, received)
+        client = AsyncClient()
+        await client.connect("127.0.0.1", server.sockets[0].getsockname()[1])
+        client.send("alias", "MyAI")
+        data = [await client.wait_for_event(event) for event in events]
+        sent = await received
+        client.disconnect()
+        server.close()
+        return data, sent
+    return asyncio.run(main())
+
+
+# A message split across writes is read whole, and a write holding many
+# messages gives each of them in turn
+def test_messages_are_framed_by_eot():
+    chunks = [
+        b'{"event": "nam',
+        b'ed", "data": "Chess"}' + EOT,
+        b'{"event": "lobbied", "data": {"gameName": "Chess"}}' + EOT + b'{"event": "start", "data": {"playerID": "0"}}' + EOT,
+    ]
+    data, received = play(chunks, ["named", "lobbied", "start"])
+    assert data == ["Chess", {"gameName": "Chess"}, {"playerID": "0"}]
+
+    sent = json.loads(received[:-1])
+    assert (sent["event"], sent["data"]) == ("alias", "MyAI")
+
+
+def test_asyncio_is_a_client_option():
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    assert parser.parse_args([]).use_asyncio is False
+    assert parser.parse_args(["--asyncio"]).use_asyncio is True
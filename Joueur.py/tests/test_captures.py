@@ -0,0 +1,44 @@
+# Tests of static exchange evaluation and capture ordering, run from the client's root with: python3 -m pytest
+from array import array
+from games.chess.algorithm import see, keep_good_captures, order_moves, pick_move
+from games.chess.movement import parse_fen, encode_move, decode_move, new_move_buffer, generate_moves, MAX_MOVES
+
+
+def see_of(fen, move):
+    state, color = parse_fen(fen)
+    return see(state, encode_move(move))
+
+
+# Gets the moves of a position, in the order the search tries them
+def ordered_moves(fen):
+    state, color = parse_fen(fen)
+    moves = new_move_buffer()
+    count = generate_moves(color, state, moves)
+    scores = array("d", bytes(8 * MAX_MOVES))
+    order_moves(state, moves, count, scores)
+    for i in range(count):
+        pick_move(moves, scores, i, count)
+    return [decode_move(moves[i]) for i in range(count)]
+
+
+# Each side recaptures with its least valuable attacker, and stops when
+# going on would lose material
+def test_see_resolves_the_whole_exchange():
+    assert see_of("4k3/8/8/3p4/8/8/8/3RK3 w - - 0 1", "d1d5") == 1
+    assert see_of("4k3/8/3p4/4n3/3P4/8/8/4K3 w - - 0 1", "d4e5") == 2
+    assert see_of("4k3/8/2p5/3p4/8/8/8/3RK3 w - - 0 1", "d1d5") == -4
+    assert see_of("4k3/8/2p5/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5") == -3
+
+
+# The Pawn taking the undefended Knight is searched first and the Rook taking
+# the defended Pawn last, and only the former is kept for quiescence
+def test_captures_are_ordered_and_pruned_by_see():
+    fen = "4k3/8/2p5/R2p4/8/4n3/3P4/4K3 w - - 0 1"
+    moves = ordered_moves(fen)
+    assert moves[0] == "d2e3"
+    assert moves[-1] == "a5d5"
+
+    state, color = parse_fen(fen)
+    buffer = new_move_buffer()
+    count = keep_good_captures(state, buffer, generate_moves(color, state, buffer))
+    assert [decode_move(buffer[i]) for i in range(count)] == ["d2e3"]
@@ -0,0 +1,122 @@
+# Tests of the client's socket IO, run from the client's root with: python3 -m pytest
+import json
+import socket
+import pytest
+from joueur import client
+from joueur.codec import default_codec
+
+EOT = client.EOT_BYTES
+
+
+# Connects a fresh client (with the buffer size given) to a local socket,
+# giving the server's end of the connection
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(client, "_client", client._Client())
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+
+    def connect(buffer_size=client.DEFAULT_BUFFER_SIZE):
+        client.connect("127.0.0.1", listener.getsockname()[1], buffer_size=buffer_size)
+        connection, address = listener.accept()
+        connections.append(connection)
+        return connection
+    connections = []
+    yield connect
+    for connection in connections + [listener, client._client.socket]:
+        connection.close()
+
+
+# Reads from the socket once, parsing what it completes
+def receive():
+    client._parse_messages(client._receive())
+    return [event["event"] for event in client._client._events]
+
+
+# A message split across reads is parsed once its EOT arrives, and what
+# arrived after it is kept for the next message
+def test_split_message_is_parsed_once_whole(server):
+    connection = server()
+    connection.sendall(b'{"event": "nam')
+    assert receive() == []
+    connection.sendall(b'ed", "data": "Chess"}' + EOT + b'{"event": "lob')
+    assert receive() == ["named"]
+    assert bytes(client._client._received_buffer[:client._client._received_length]) == b'{"event": "lob'
+
+    connection.sendall(b'bied"}' + EOT)
+    assert receive() == ["named", "lobbied"]
+    assert client._client._received_length == 0
+
+
+# Every message completed by what is read is parsed, in order
+def test_many_messages_are_parsed_together(server):
+    connection = server()
+    connection.sendall(b''.join(b'{"event": "e%d", "data": %d}' % (i, i) + EOT for i in range(5)))
+    while len(client._client._events) < 5:
+        receive()
+    assert [event["data"] for event in client._client._events] == list(range(5))
+
+
+# A message larger than the buffer grows it until the message fits
+def test_buffer_grows_to_hold_a_message(server):
+    connection = server(buffer_size=16)
+    message = b'{"event": "start", "data": "' + b'x' * 100 + b'"}'
+    connection.sendall(message[:50])
+    while client._client._received_length < 50:
+        receive()
+    connection.sendall(message[50:] + EOT)
+    assert client.wait_for_event("start") == "x" * 100
+    assert len(client._client._received_buffer) >= len(message)
+
+
+# Stands in for the socket, taking at most limit bytes a write, after timing
+# out the first time as a full OS buffer does
+class FakeSocket:
+    def __init__(self, limit):
+        self.limit = limit
+        self.writes = []
+
+    def send(self, data):
+        if not self.writes:
+            self.writes.append(b"")
+            raise socket.timeout()
+        self.writes.append(bytes(data[:self.limit]))
+        return len(self.writes[-1])
+
+
+def fake_client(monkeypatch, limit):
+    monkeypatch.setattr(client, "_client", client._Client())
+    client._client.codec = default_codec()
+    client._client._print_io = False
+    client._client._send_buffer = bytearray()
+    client._client.socket = FakeSocket(limit)
+    return client._client.socket
+
+
+# Messages sent are only written when flushed, all in one write
+def test_sent_messages_are_written_together(monkeypatch):
+    fake = fake_client(monkeypatch, 1 << 20)
+    for i in range(3):
+        client.send("run", {"index": i})
+    assert fake.writes == []
+
+    client.flush()
+    assert len(fake.writes) == 2  # the first timed out
+    messages = fake.writes[1].split(EOT)
+    assert messages[-1] == b""
+    assert [json.loads(message)["data"]["index"] for message in messages[:-1]] == [0, 1, 2]
+    assert client._client._send_buffer == bytearray()
+
+    client.flush()
+    assert len(fake.writes) == 2
+
+
+# A write that takes part of the messages is carried on from where it stopped
+def test_partial_writes_are_carried_on(monkeypatch):
+    fake = fake_client(monkeypatch, 10)
+    client.send("alias", "a name long enough to need several writes")
+    expected = bytes(client._client._send_buffer)
+    client.flush()
+    assert all(len(write) <= 10 for write in fake.writes)
+    assert b"".join(fake.writes) == expected
@@ -0,0 +1,34 @@
+# Tests of the message codecs, run from the client's root with: python3 -m pytest
+import pytest
+from joueur import codec
+
+MESSAGE = {"event": "run", "data": {"caller": {"id": "12"}, "functionName": "move", "args": {"file": "é", "rank": 7, "promotionType": None}}, "sentTime": 1}
+
+
+@pytest.mark.parametrize("name", sorted(codec.CODECS))
+def test_messages_round_trip_through_bytes(name):
+    coder = codec.CODECS[name]()
+    data = coder.encode(MESSAGE)
+    assert isinstance(data, bytes)
+    assert b" " not in data
+    assert coder.decode(data) == MESSAGE
+    assert coder.decode(bytearray(data)) == MESSAGE
+
+
+# Every codec writes the same bytes, so the server sees no difference
+def test_codecs_agree():
+    encoded = {codec.CODECS[name]().encode(MESSAGE) for name in codec.CODECS}
+    assert len(encoded) == 1
+
+
+def test_default_codec_is_the_fastest_installed(monkeypatch):
+    expected = codec.OrjsonCodec if codec.orjson is not None else codec.JsonCodec
+    assert isinstance(codec.default_codec(), expected)
+    monkeypatch.setattr(codec, "orjson", None)
+    assert isinstance(codec.default_codec(), codec.JsonCodec)
+
+
+def test_malformed_data_is_a_value_error():
+    for name in codec.CODECS:
+        with pytest.raises(ValueError):
+            codec.CODECS[name]().decode(b'{"event": ')
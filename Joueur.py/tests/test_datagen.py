@@ -0,0 +1,44 @@
+# Tests of the self-play dataset, run from the client's root with: python3 -m pytest
+import pytest
+from games.chess.datagen import pack_board, unpack_board, pack_record, read_positions, load_dataset, play_task, RECORD_SIZE
+from games.chess.movement import parse_fen
+
+FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "4k3/8/8/8/8/8/8/r3K3 b - - 0 1",
+]
+
+
+def test_boards_pack_into_32_bytes():
+    for fen in FENS:
+        state, color = parse_fen(fen)
+        packed = pack_board(state.board)
+        assert len(packed) == 32
+        assert unpack_board(packed) == state.board
+
+
+# Records are read back with the score and result for white
+def test_records_are_read_back(tmp_path):
+    path = tmp_path / "positions.bin"
+    records = []
+    for (fen, score, result) in zip(FENS, [0.5, 2.0], [1, 0]):
+        state, color = parse_fen(fen)
+        records.append(pack_record(state, color, score, result))
+    path.write_bytes(b"".join(records))
+
+    positions = list(read_positions(str(path)))
+    assert [(color, score, result) for state, color, score, result in positions] == [("white", 0.5, 1.0), ("black", -2.0, 0.0)]
+    assert positions[1][0].board == parse_fen(FENS[1])[0].board
+
+
+# A game's positions are written as whole records, which numpy can map
+def test_self_play_writes_records(tmp_path):
+    records = play_task((1, 2, 1.0, 0.0, 6))
+    assert len(records) > 0 and len(records) % RECORD_SIZE == 0
+
+    pytest.importorskip("numpy")
+    path = tmp_path / "selfplay.bin"
+    path.write_bytes(records)
+    dataset = load_dataset(str(path))
+    assert len(dataset) == len(records) // RECORD_SIZE
+    assert list(dataset["side"][:2]) == [0, 1]
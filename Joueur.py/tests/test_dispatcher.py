@@ -0,0 +1,63 @@
+# Tests of the event dispatcher, run from the client's root with: python3 -m pytest
+import asyncio
+import contextvars
+import types
+import pytest
+from joueur.dispatcher import EventDispatcher
+from joueur.async_client import _current_client
+from joueur.error_code import ClientError, UNKNOWN_EVENT_FROM_SERVER
+
+
+# Events go to their handlers, which registering replaces
+def test_events_are_dispatched_to_their_handlers():
+    handled = []
+    dispatcher = EventDispatcher({"delta": lambda data: handled.append(("delta", data)) or "merged"})
+    assert dispatcher.dispatch("delta", {"fen": ""}) == "merged"
+    dispatcher.register("delta", lambda data: handled.append(("new", data)))
+    dispatcher.register("order", lambda data: handled.append(("order", data)))
+    dispatcher.dispatch("delta")
+    dispatcher.dispatch("order", 1)
+    assert handled == [("delta", {"fen": ""}), ("new", None), ("order", 1)]
+
+
+# Hooks are called with each event and how long it took to handle, even when
+# its handler fails, until they are removed
+def test_hooks_time_each_event():
+    def fail(data):
+        raise RuntimeError(data)
+    timings = []
+    hook = lambda event, seconds: timings.append((event, seconds))
+    dispatcher = EventDispatcher({"delta": lambda data: None, "invalid": fail})
+    dispatcher.add_hook(hook)
+    dispatcher.dispatch("delta")
+    with pytest.raises(RuntimeError):
+        dispatcher.dispatch("invalid", "no")
+    assert [event for event, seconds in timings] == ["delta", "invalid"]
+    assert all(seconds >= 0 for event, seconds in timings)
+
+    dispatcher.remove_hook(hook)
+    dispatcher.dispatch("delta")
+    assert len(timings) == 2
+
+
+# Coroutine handlers are awaited, and timed until they are done
+def test_coroutine_handlers_are_awaited_and_timed():
+    async def order(data):
+        await asyncio.sleep(0.02)
+        return data + 1
+    timings = []
+    dispatcher = EventDispatcher({"order": order})
+    dispatcher.add_hook(lambda event, seconds: timings.append((event, seconds)))
+    assert asyncio.run(dispatcher.dispatch_async("order", 1)) == 2
+    assert timings[0][0] == "order" and timings[0][1] >= 0.02
+
+
+# An event with no handler is an error (raised, for a client that raises its
+# errors rather than exiting)
+def test_unknown_events_are_errors():
+    def dispatch():
+        _current_client.set(types.SimpleNamespace(raise_errors=True))
+        EventDispatcher().dispatch("unheard of")
+    with pytest.raises(ClientError) as error:
+        contextvars.copy_context().run(dispatch)
+    assert error.value.error_code == UNKNOWN_EVENT_FROM_SERVER
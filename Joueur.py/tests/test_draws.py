@@ -0,0 +1,55 @@
+# Tests of repetition and fifty-move draws, run from the client's root with: python3 -m pytest
+from games.chess.algorithm import game_hashes, is_draw
+from games.chess.engine import Engine
+from games.chess.movement import parse_fen
+from games.chess.zobrist import hash_state
+
+# A game where both sides castle long, then both Knights go back and forth so
+# the position after the castles comes back
+GAME = "d2d4 d7d5 b1c3 b8c6 c1f4 c8f5 d1d2 d8d7 e1c1 e8c8 c3b1 c6b8 b1c3 b8c6".split()
+
+# The position White is to move in at each of its turns in GAME
+TURNS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/ppp1pppp/8/3p4/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 0 2",
+    "r1bqkbnr/ppp1pppp/2n5/3p4/3P4/2N5/PPP1PPPP/R1BQKBNR w KQkq - 2 3",
+    "r2qkbnr/ppp1pppp/2n5/3p1b2/3P1B2/2N5/PPP1PPPP/R2QKBNR w KQkq - 4 4",
+    "r3kbnr/pppqpppp/2n5/3p1b2/3P1B2/2N5/PPPQPPPP/R3KBNR w KQkq - 6 5",
+    "2kr1bnr/pppqpppp/2n5/3p1b2/3P1B2/2N5/PPPQPPPP/2KR1BNR w - - 8 6",
+    "1nkr1bnr/pppqpppp/8/3p1b2/3P1B2/8/PPPQPPPP/1NKR1BNR w - - 10 7",
+    "2kr1bnr/pppqpppp/2n5/3p1b2/3P1B2/2N5/PPPQPPPP/2KR1BNR w - - 12 8",
+]
+
+
+# The engine's hashes of the game end at the real position every turn, even
+# after Black's long castle (which the replay gets wrong, and reports), so
+# the position coming back after the castles is found as a repetition
+def test_game_hashes_end_at_the_real_position(capsys):
+    engine = Engine()
+    for turn, fen in enumerate(TURNS):
+        state, color = parse_fen(fen)
+        hashes = game_hashes(engine, state, color, GAME[:2 * turn])
+        assert len(hashes) == 2 * turn + 1
+        assert hashes[-1] == hash_state(state, color)
+
+        # Black castled long just before the sixth turn
+        warning = capsys.readouterr().err
+        assert ("e8c8" in warning) == (turn == 5)
+
+    assert hashes[-1] == hashes[-5]
+    assert is_draw(state, hashes[-1], hashes[:-1])
+
+
+# Only the positions since the last capture or Pawn move (the halfmove clock)
+# can repeat, and a hundred halfmoves is a draw whatever the position
+def test_draws_look_back_as_far_as_the_halfmove_clock():
+    state, color = parse_fen("4k3/8/8/8/8/8/8/R3K3 w - - 4 1")
+    key = hash_state(state, color)
+    assert is_draw(state, key, [key, 1, 2, 3])
+    assert not is_draw(state, key, [key, 1, 2, 3, 4])
+
+    state.halfmove = 3
+    assert not is_draw(state, key, [key, 1, 2])
+
+    state.halfmove = 100
+    assert is_draw(state, key, [])
@@ -0,0 +1,42 @@
+# Tests of the search state kept across turns, run from the client's root with: python3 -m pytest
+from games.chess.algorithm import algorithm
+from games.chess.engine import Engine
+from games.chess.movement import parse_fen, next_move, encode_move, decode_move
+from games.chess.zobrist import hash_state
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+# Each new search ages what the last one learned: the table's generation
+# moves on, history scores halve and killers shift by the two plies played
+def test_new_search_ages_the_tables():
+    engine = Engine()
+    e2e4 = encode_move("e2e4")
+    d2d4 = encode_move("d2d4")
+    engine.add_cutoff(e2e4, 2, 3)
+    engine.add_cutoff(d2d4, 3, 2)
+    assert engine.history == {e2e4: 9, d2d4: 4}
+
+    generation = engine.tt.generation
+    engine.new_search()
+    assert engine.tt.generation == generation + 1
+    assert engine.history == {e2e4: 4, d2d4: 2}
+    assert engine.get_killers(0) == [e2e4]
+    assert engine.get_killers(1) == [d2d4]
+
+
+# The next turn's search starts from the positions the last one stored
+def test_transposition_table_is_kept_across_turns():
+    engine = Engine()
+    state, color = parse_fen(START)
+    score, move = algorithm(state, color, 5, [], engine)
+    assert len(engine.tt.entries) > 0
+
+    # The reply is one the last search looked at, so it is already stored
+    after = next_move(state, move, True)
+    reply = engine.tt.probe(hash_state(after, "black"))[3]
+    history = [move, decode_move(reply)]
+    state = next_move(after, history[1], False)
+    hits = engine.tt.hits
+    algorithm(state, "white", 5, history, engine)
+    assert engine.tt.hits > hits
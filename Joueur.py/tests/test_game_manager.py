@@ -0,0 +1,99 @@
+# Tests of merging the server's deltas into the game, run from the client's
+# root with: python3 -m pytest
+from joueur.game_manager import GameManager, attribute_names
+from games.chess.game import Game
+from games.chess.player import Player
+
+CONSTANTS = {"DELTA_REMOVED": "&RM", "DELTA_LIST_LENGTH": "&LEN"}
+
+
+def new_manager():
+    manager = GameManager(Game())
+    manager.set_constants(CONSTANTS)
+    return manager
+
+
+# The server's camelCase keys map to the properties' attributes, worked out
+# from the class rather than per delta
+def test_keys_map_to_the_class_attributes():
+    names = attribute_names(Player)
+    assert names["timeRemaining"] == "_time_remaining"
+    assert names["reasonLost"] == "_reason_lost"
+    assert names["gameObjectName"] == "_game_object_name"
+    assert "time_remaining" not in names
+
+
+# A key no property has is converted once, then found in the cache
+def test_unknown_keys_are_converted_once():
+    manager = new_manager()
+    assert manager._attribute_name(Player, "someNewKey") == "_some_new_key"
+    assert manager._attribute_names[Player]["someNewKey"] == "_some_new_key"
+
+    class Unknown:
+        pass
+    assert manager._attribute_name(Unknown, "fooBar") == "_foo_bar"
+    assert Unknown in manager._attribute_names
+
+
+# The first delta, with the players referring to each other by id
+def first_delta():
+    return {
+        "gameObjects": {
+            "0": {"id": "0", "gameObjectName": "Player", "color": "white", "timeRemaining": 900, "opponent": {"id": "1"}},
+            "1": {"id": "1", "gameObjectName": "Player", "color": "black", "timeRemaining": 900, "opponent": {"id": "0"}},
+        },
+        "players": {"&LEN": 2, "0": {"id": "0"}, "1": {"id": "1"}},
+        "history": {"&LEN": 0},
+        "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    }
+
+
+# References become the game objects, so the players are the same objects
+# wherever they are referred to from
+def test_references_resolve_to_the_game_objects():
+    manager = new_manager()
+    manager.apply_delta_state(first_delta())
+    game = manager.game
+    white, black = game.players
+    assert isinstance(white, Player) and white is game.get_game_object("0")
+    assert white.opponent is black and black.opponent is white
+    assert (white.color, black.time_remaining) == ("white", 900)
+    assert game.fen.startswith("rnbqkbnr")
+
+
+# A list of primitives is grown, cut and changed in place by its deltas
+def test_lists_are_grown_cut_and_changed():
+    manager = new_manager()
+    manager.apply_delta_state(first_delta())
+    history = manager.game.history
+    manager.apply_delta_state({"history": {"&LEN": 3, "0": "e2e4", "1": "e7e5", "2": "g1f3"}})
+    assert manager.game.history == ["e2e4", "e7e5", "g1f3"]
+    manager.apply_delta_state({"history": {"&LEN": 2, "1": "c7c5"}})
+    assert manager.game.history == ["e2e4", "c7c5"]
+    assert manager.game.history is history
+
+
+# The game objects' deltas are merged into them, and a removed one is
+# removed, left to the generic merge
+def test_game_object_deltas_are_merged_and_removed():
+    manager = new_manager()
+    manager.apply_delta_state(first_delta())
+    white = manager.game.get_game_object("0")
+    manager.apply_delta_state({"gameObjects": {"0": {"timeRemaining": 850.5, "won": True}}})
+    assert (white.time_remaining, white.won) == (850.5, True)
+
+    manager.apply_delta_state({"gameObjects": {"1": "&RM"}, "players": {"&LEN": 1}})
+    assert list(manager.game.game_objects) == ["0"]
+    assert manager.game.players == [white]
+
+
+# What the typed applier can't apply is handed back, untouched, for the
+# generic merge
+def test_applier_leaves_what_it_cannot_apply():
+    manager = new_manager()
+    manager.apply_delta_state(first_delta())
+    applier = manager._appliers[Player]
+    white = manager.game.get_game_object("0")
+    rest = applier.apply(white, {"name": "Me", "opponent": {"id": "0"}, "won": "&RM"})
+    assert rest == {"opponent": {"id": "0"}, "won": "&RM"}
+    assert white.name == "Me"
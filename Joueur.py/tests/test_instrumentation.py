@@ -0,0 +1,48 @@
+# Tests of the client's instrumentation, run from the client's root with: python3 -m pytest
+import argparse
+import csv
+import json
+from joueur.instrumentation import Instrumentation, DELTA_MERGE, ORDER_LATENCY, messages_path
+from joueur.run import add_arguments
+
+
+def play(path):
+    instrumentation = Instrumentation(str(path))
+    instrumentation.sent("alias", 20)
+    instrumentation.received({"event": "order", "data": {"index": 0}}, 64)
+    instrumentation.time(DELTA_MERGE, sum, [1, 2])
+    instrumentation.order_finished(0)
+    instrumentation.export()
+    instrumentation.export()  # only the first exports
+    return instrumentation
+
+
+def test_json_holds_histograms_and_messages(tmp_path):
+    play(tmp_path / "timing.json")
+    exported = json.loads((tmp_path / "timing.json").read_text())
+    assert exported["histograms"][DELTA_MERGE]["count"] == 1
+    assert exported["histograms"][ORDER_LATENCY]["count"] == 1
+    assert [(message["direction"], message["event"], message["bytes"]) for message in exported["messages"]] == [("sent", "alias", 20), ("received", "order", 64)]
+
+
+# As CSV the histograms and the messages are written to files of their own
+def test_csv_holds_histograms_then_messages_beside_them(tmp_path):
+    path = tmp_path / "timing.csv"
+    play(path)
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert {row["name"]: row["count"] for row in rows} == {DELTA_MERGE: "1", ORDER_LATENCY: "1"}
+
+    assert messages_path(str(path)) == str(tmp_path / "timing.messages.csv")
+    with open(messages_path(str(path))) as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["direction"], row["event"], row["bytes"]) for row in rows] == [("sent", "alias", "20"), ("received", "order", "64")]
+    assert float(rows[0]["time"]) <= float(rows[1]["time"])
+
+
+def test_client_options_are_added_to_the_parser():
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    args = parser.parse_args(["--sessions", "4", "--timing", "timing.csv"])
+    assert (args.sessions, args.timing, args.use_asyncio) == (4, "timing.csv", False)
+    assert parser.parse_args([]).timing is None
@@ -0,0 +1,47 @@
+# Tests of the move-list cache, run from the client's root with: python3 -m pytest
+from games.chess.move_cache import MoveCache
+from games.chess.movement import parse_fen, new_move_buffer, generate_moves
+from games.chess.zobrist import hash_state
+
+FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1",
+    "4k3/8/8/8/8/8/8/R3K3 b - - 0 1",
+]
+
+
+def cached_moves(cache, fen):
+    state, color = parse_fen(fen)
+    moves = new_move_buffer()
+    count = cache.generate_moves(hash_state(state, color), color, state, moves)
+    return list(moves[:count])
+
+
+def generated_moves(fen):
+    state, color = parse_fen(fen)
+    moves = new_move_buffer()
+    return list(moves[:generate_moves(color, state, moves)])
+
+
+# A cached position gets the same moves as generating them
+def test_cached_moves_match_generated_moves():
+    cache = MoveCache(10)
+    for fen in FENS + FENS:
+        assert cached_moves(cache, fen) == generated_moves(fen)
+    assert cache.misses == len(FENS)
+    assert cache.hits == len(FENS)
+
+
+# Over its size, the cache drops the position used least recently
+def test_least_recently_used_position_is_evicted():
+    cache = MoveCache(2)
+    cached_moves(cache, FENS[0])
+    cached_moves(cache, FENS[1])
+    cached_moves(cache, FENS[0])
+    cached_moves(cache, FENS[2])
+    assert len(cache.moves) == 2
+
+    cached_moves(cache, FENS[0])
+    assert cache.hits == 2
+    cached_moves(cache, FENS[1])
+    assert cache.misses == 4
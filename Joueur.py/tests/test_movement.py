@@ -0,0 +1,93 @@
+# Tests of game states and move generation, run from the client's root with: python3 -m pytest
+import pytest
+from games.chess.movement import parse_fen, next_move, make_move, actions, get_attack_map, in_check, new_move_buffer, generate_moves, decode_move
+
+
+# A state is its 64 byte board and a few slotted fields, with no __dict__
+def test_game_state_is_a_slotted_byte_board():
+    state, color = parse_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    assert isinstance(state.board, bytearray)
+    assert len(state.board) == 64
+    assert state.board[4] == ord("K") and state.board[60] == ord("k")
+    assert not hasattr(state, "__dict__")
+    with pytest.raises(AttributeError):
+        state.extra = True
+
+
+# A copy (as made for every move) has a board of its own, and leaves out
+# what was worked out for the state it copied
+def test_game_state_copies_are_independent():
+    state, color = parse_fen("4k3/8/8/8/8/8/4P3/4K3 w - - 3 1")
+    state.check = False
+    copy = state.copy()
+    copy.board[12] = ord(".")
+    assert state.board[12] == ord("P")
+    assert copy.halfmove == 3
+    assert copy.check is None and copy.attacks is None
+
+    moved = next_move(state, "e2e4", True)
+    assert moved.board[28] == ord("P") and moved.board[12] == ord(".")
+    assert state.board[28] == ord(".")
+    assert moved.halfmove == 0
+
+
+# The attack map counts each side's pieces attacking every tile, stopping
+# sliding pieces at the first piece in the way
+def test_attack_map_counts_attackers_per_tile():
+    state, color = parse_fen("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+    attacks = get_attack_map(state)
+    assert get_attack_map(state) is attacks
+    assert list(attacks.white[:8]) == [0, 1, 1, 2, 1, 1, 0, 0]
+    assert attacks.white[56] == 1
+    assert attacks.mobility("white") == 15
+    assert attacks.king_danger("black", state) == 0
+
+
+# Legality comes from the attack map: a pinned piece keeps to its pin, and
+# a King in check can't step back along the checking piece's line
+def test_moves_respect_pins_and_checks():
+    state, color = parse_fen("4k3/4r3/8/8/8/8/4B3/4K3 w - - 0 1")
+    assert sorted(actions(color, state)) == ["e1d1", "e1d2", "e1f1", "e1f2"]
+
+    state, color = parse_fen("4k3/8/8/8/8/8/8/r3K3 w - - 0 1")
+    assert in_check(color, state)
+    assert sorted(actions(color, state)) == ["e1d2", "e1e2", "e1f2"]
+
+
+# A move buffer is reused from one position to the next: each generation
+# writes its moves from the start and returns how many are its own
+def test_move_buffers_are_reused():
+    moves = new_move_buffer()
+    state, color = parse_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    assert generate_moves(color, state, moves) == 20
+
+    state, color = parse_fen("4k3/8/8/8/8/8/8/r3K3 w - - 0 1")
+    count = generate_moves(color, state, moves)
+    assert sorted(decode_move(moves[i]) for i in range(count)) == sorted(actions(color, state))
+
+
+# Positions with direct, discovered and Pawn checks a few moves away
+CHECK_FENS = [
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P3/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "4k3/8/8/4N3/8/8/4R3/4K3 w - - 0 1",
+    "4k3/8/8/8/1b6/8/3PP3/4K2R b - - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+]
+
+
+# The check flag make_move works out from the tiles a move changed agrees
+# with looking at the whole board, for every move two plies deep
+def test_make_move_check_flag_matches_the_board():
+    for fen in CHECK_FENS:
+        state, color = parse_fen(fen)
+        positions = [(state, color)]
+        for ply in range(2):
+            children = []
+            for state, color in positions:
+                other = "black" if color == "white" else "white"
+                moves = new_move_buffer()
+                for i in range(generate_moves(color, state, moves)):
+                    child = make_move(state, moves[i], color == "white")
+                    assert child.check == in_check(other, child.copy()), (fen, decode_move(moves[i]))
+                    children.append((child, other))
+            positions = children
@@ -0,0 +1,36 @@
+# Tests of the tunable parameters, run from the client's root with: python3 -m pytest
+import json
+import pytest
+from games.chess import algorithm, params
+
+
+@pytest.fixture
+def saved_values(monkeypatch):
+    values = params.get_values()
+    monkeypatch.setattr(params, "_ai_values", None)
+    yield
+    params.set_values(values)
+
+
+def test_values_are_kept_in_range(saved_values):
+    params.set_values({"quiescent_limit": 2.6, "mobility_weight": 5, "unknown": 1})
+    assert algorithm.QUIESCENT_LIMIT == 3
+    assert algorithm.MOBILITY_WEIGHT == params.REGISTRY["mobility_weight"].high
+
+
+# The parameters are shared by every game played in a process, so each AI
+# in it has to be given the same ones
+def test_ais_in_one_process_share_their_params(saved_values, tmp_path):
+    tuned = tmp_path / "tuned.json"
+    tuned.write_text(json.dumps({"iteration": 3, "values": {"quiescent_limit": 1}}))
+    other = tmp_path / "other.json"
+    other.write_text(json.dumps({"quiescent_limit": 4}))
+
+    params.load_ai_values(str(tuned))
+    assert algorithm.QUIESCENT_LIMIT == 1
+    params.load_ai_values(str(tuned))
+    with pytest.raises(ValueError):
+        params.load_ai_values(str(other))
+    with pytest.raises(ValueError):
+        params.load_ai_values(None)
+    assert algorithm.QUIESCENT_LIMIT == 1
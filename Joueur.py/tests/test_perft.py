@@ -0,0 +1,38 @@
+# Tests of the perft runner, run from the client's root with: python3 -m pytest
+import argparse
+import pytest
+from games.chess.movement import parse_fen, new_move_buffer
+from games.chess.perft import perft, read_suite, run_suite, depth_argument
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def test_perft_counts_the_start_position():
+    state, color = parse_fen(START)
+    buffers = [new_move_buffer() for i in range(4)]
+    assert [perft(state, color, depth, buffers) for depth in range(4)] == [1, 20, 400, 8902]
+
+
+# A suite line gives its expected counts, and why it is known to fail if it is
+def test_suite_lines_are_read_with_their_counts_and_xfail(tmp_path):
+    suite = tmp_path / "suite.epd"
+    suite.write_text("# comment\n\n{} ;D1 20 ;D2 400\n8/8/8/8/8/8/8/K6k w - - 0 1 ;D1 3 ;xfail made up\n".format(START))
+    assert read_suite(str(suite)) == [
+        (START, {1: 20, 2: 400}, None),
+        ("8/8/8/8/8/8/8/K6k w - - 0 1", {1: 3}, "made up"),
+    ]
+
+
+# The root moves are split across the workers, and added back up per position
+def test_suite_runs_over_a_pool():
+    suite = [(START, {1: 20, 2: 400, 3: 8902}, None), ("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1", {2: 152}, "made up")]
+    results, worker_stats = run_suite(suite, 2, 2)
+    assert [(result[1], result[2], result[3], result[6]) for result in results] == [(2, 400, 400, None), (2, 152, 152, "made up")]
+    assert len(results[0][4]) == 20
+    assert sum(tasks for tasks, nodes, busy in worker_stats.values()) == 40
+
+
+def test_depth_below_one_is_rejected():
+    assert depth_argument("3") == 3
+    with pytest.raises(argparse.ArgumentTypeError):
+        depth_argument("0")
@@ -0,0 +1,74 @@
+# Tests of the chess search, run from the client's root with: python3 -m pytest
+from games.chess.algorithm import algorithm, min_max, material, evaluate_leaf, QUIESCENT_LIMIT, MATE
+from games.chess.engine import Engine, MAX_PLY
+from games.chess.movement import parse_fen
+from games.chess.zobrist import hash_state
+
+# Wider than any score the search returns
+WINDOW = MATE * 10
+
+
+# Searches a position with min_max, from the given ply and depth (of
+# max_depth) and whether the node is in quiescence, returning the result and
+# the position's static score (for the side to move at even plies, as the
+# search scores it)
+def search(fen, ply, depth, max_depth, is_quiescent):
+    state, color = parse_fen(fen)
+    engine = Engine()
+    key = hash_state(state, color)
+    score = material(state, color)
+    root_color = color if ply % 2 == 0 else ("black" if color == "white" else "white")
+    static = score + evaluate_leaf(state, root_color, engine, key)
+    result = min_max(state, color, 0, score, -WINDOW, WINDOW, engine, [key], is_quiescent, QUIESCENT_LIMIT, depth, max_depth, ply)
+    return result, static
+
+
+# Searches a position from its quiescence search (the nominal depth already
+# reached)
+def quiescence(fen):
+    return search(fen, 0, 1, 1, True)
+
+
+# White's only capture that doesn't lose material (Nxf5, winning a Bishop)
+# takes the Knight off the d-file, so Black's Rook takes the Queen: declining
+# it is better, so the node keeps its static score
+def test_quiescence_stands_pat_over_a_worse_capture():
+    result, static = quiescence("3r3k/8/8/5b2/3N4/8/8/K2Q4 w - - 0 1")
+    assert result[0] == static
+
+
+# A capture that does better than the static score is still taken
+def test_quiescence_takes_a_winning_capture():
+    result, static = quiescence("3r3k/8/8/5b2/3N4/8/8/K6Q w - - 0 1")
+    assert result[0] > static
+
+
+# A line of checks (each searched a move deeper, here Ra8+ and on) reaching
+# the last plies the engine has move buffers for is scored as it stands there
+# (no move searched, the parent's returned), rather than running out of buffers
+def test_check_extensions_stop_at_the_deepest_ply():
+    for ply in range(MAX_PLY - 4, MAX_PLY):
+        result, static = search("4k3/8/8/8/8/8/8/R3K3 w - - 0 1", ply, 98, 100, False)
+        if ply + 1 >= MAX_PLY:
+            assert result == (static, 0)
+        else:
+            assert result[1] != 0
+
+
+# Searches a position from the root as the AI does
+def best_move(fen):
+    state, color = parse_fen(fen)
+    return algorithm(state, color, 10, [], Engine())
+
+
+# A checkmate is scored by how many moves it takes, so mate in one scores
+# highest and is played at once
+def test_mate_in_one_is_found_and_scored_by_distance():
+    assert best_move("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1") == (MATE - 1, "a1a8")
+    assert best_move("7k/8/5QK1/8/8/8/8/8 w - - 0 1") == (MATE - 1, "f6f8")
+
+
+# Having no move is a loss when in check, and a draw (stalemate) otherwise
+def test_no_moves_is_checkmate_only_in_check():
+    assert best_move("R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1") == (-MATE, None)
+    assert best_move("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1") == (0, None)
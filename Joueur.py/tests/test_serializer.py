@@ -0,0 +1,58 @@
+# Tests of the serializer, run from the client's root with: python3 -m pytest
+import copy
+import sys
+from joueur.serializer import serialize, deserialize
+from games.chess.game import Game
+from games.chess.player import Player
+
+
+def new_game():
+    game = Game()
+    for id in ["0", "1"]:
+        player = Player()
+        player._id = id
+        game._game_objects[id] = player
+    return game
+
+
+# Game objects are sent as references, however deep they are
+def test_game_objects_are_serialized_as_references():
+    game = new_game()
+    white, black = game.get_game_object("0"), game.get_game_object("1")
+    data = {"caller": white, "args": {"pieces": [[black, 1], {"to": "e4"}], "n": None}}
+    assert serialize(data) == {"caller": {"id": "0"}, "args": {"pieces": [[{"id": "1"}, 1], {"to": "e4"}], "n": None}}
+    assert data["caller"] is white  # what was given is left as it was
+
+
+# References are replaced by the game objects, and only the containers they
+# were in are copied
+def test_references_are_deserialized_to_game_objects():
+    game = new_game()
+    data = {"players": [{"id": "0"}, {"id": "1"}], "moves": ["e2e4"], "missing": {"id": "9"}}
+    before = copy.deepcopy(data)
+    result = deserialize(data, game)
+    assert result["players"] == [game.get_game_object("0"), game.get_game_object("1")]
+    assert result["missing"] is None
+    assert result["moves"] is data["moves"]
+    assert data == before
+
+
+# What has nothing to replace is given back as it is, not copied
+def test_nothing_is_copied_without_replacements():
+    data = {"a": [1, "x", {"b": [None, 2.5]}], "c": True}
+    assert serialize(data) is data
+    assert deserialize(data, new_game()) is data
+    assert serialize("e4") == "e4"
+
+
+# Nesting far deeper than the recursion limit is walked all the same
+def test_deep_nesting_does_not_recurse():
+    game = new_game()
+    depth = sys.getrecursionlimit() * 2
+    data = {"id": "0"}
+    for i in range(depth):
+        data = [data]
+    result = deserialize(data, game)
+    for i in range(depth):
+        result = result[0]
+    assert result is game.get_game_object("0")
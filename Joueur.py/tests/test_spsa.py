@@ -0,0 +1,51 @@
+# Tests of the SPSA tuning harness, run from the client's root with: python3 -m pytest
+import argparse
+import json
+import os
+import time
+import pytest
+from games.chess import spsa
+
+# Result of each iteration's pair (by iteration), made up so each iteration
+# counted once adds up to a known total
+RESULTS = {1: 1, 2: -1, 3: 0.5, 4: 0}
+
+# File that exists once the first iteration has failed, so it fails once
+FAIL_MARKER = None
+
+
+# Stands in for playing a pair: iteration 1 is slow, and fails the first time
+# (after iteration 2 has finished), as if the run had been stopped
+def fake_pair(task):
+    iteration = task[2] # The game seed, which is the iteration with a seed of 0
+    if iteration == 1:
+        time.sleep(0.5)
+        if not os.path.exists(FAIL_MARKER):
+            open(FAIL_MARKER, "w").close()
+            raise RuntimeError("stopped")
+    return RESULTS[iteration]
+
+
+def spsa_args(checkpoint, resume):
+    return argparse.Namespace(iterations=len(RESULTS), workers=2, checkpoint=checkpoint, resume=resume, seconds=1, increment=0, opening_plies=0, max_plies=1, learning_rate=1.0, seed=0)
+
+
+# A pair that finishes before an earlier one isn't applied until that one is,
+# so a run stopped in between resumes from the earlier one and applies
+# every iteration exactly once
+def test_resumed_run_applies_each_iteration_once(tmp_path, monkeypatch):
+    global FAIL_MARKER
+    FAIL_MARKER = str(tmp_path / "failed")
+    checkpoint = str(tmp_path / "spsa.json")
+    monkeypatch.setattr(spsa, "play_pair", fake_pair)
+
+    with pytest.raises(RuntimeError):
+        spsa.spsa(spsa_args(checkpoint, False))
+    assert not os.path.exists(checkpoint)
+
+    spsa.spsa(spsa_args(checkpoint, True))
+    with open(checkpoint) as checkpoint_file:
+        saved = json.load(checkpoint_file)
+    assert saved["iteration"] == len(RESULTS)
+    assert saved["games"] == 2 * len(RESULTS)
+    assert saved["points"] == sum(RESULTS.values())
@@ -0,0 +1,51 @@
+# Tests of Texel tuning, run from the client's root with: python3 -m pytest
+# (needs numpy, from requirements-tools.txt)
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from games.chess.texel import read_corpus, extract_features, load_features, loss, WEIGHT_NAMES
+from games.chess.algorithm import evaluation_weights
+
+EPD_CORPUS = """\
+rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - c9 "1/2-1/2";
+4k3/8/8/8/8/8/4P3/4K3 w - - hmvc 7; c9 "1-0";
+4k3/8/8/8/8/8/8/r3K3 w - - c9 "0-1"; id "in check";
+"""
+
+FEN_CORPUS = """\
+# fen, then the result for white
+rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1 1/2-1/2
+4k3/8/8/8/8/8/4P3/4K3 w - - 7 40 [1.0]
+4k3/8/8/8/8/8/8/r3K3 w - - 0-1
+"""
+
+
+def read(tmp_path, text):
+    path = tmp_path / "corpus"
+    path.write_text(text)
+    return str(path), list(read_corpus(str(path)))
+
+
+# EPD lines give the result as c9 (and the clock as hmvc), and fen lines
+# give it last, with or without the fen's clocks
+@pytest.mark.parametrize("text", [EPD_CORPUS, FEN_CORPUS], ids=["epd", "fen"])
+def test_corpus_lines_are_read(tmp_path, text):
+    path, positions = read(tmp_path, text)
+    assert [(color, result) for state, color, result in positions] == [("white", 0.5), ("white", 1.0), ("white", 0.0)]
+    assert positions[1][0].halfmove == 7
+    assert positions[2][0].board[0] == ord("r")
+
+
+# The quiet positions' terms are written a chunk at a time, and the loss of
+# the current weights over them is a fair number
+def test_features_are_extracted_from_a_corpus(tmp_path):
+    path, positions = read(tmp_path, EPD_CORPUS)
+    features_path = str(tmp_path / "corpus.features")
+    written, skipped = extract_features(path, features_path, chunk_size=2)
+    assert (written, skipped) == (2, 1)
+
+    data = load_features(features_path)
+    assert data.shape == (2, len(WEIGHT_NAMES) + 1)
+    assert list(data[:, -1]) == [0.5, 1.0]
+    assert 0 <= loss(data, np.array(evaluation_weights()), 1.0) < 1
@@ -0,0 +1,74 @@
+# Tests of the time manager, run from the client's root with: python3 -m pytest
+import pytest
+from games.chess.time_manager import TimeManager, BEST_MOVE_CHANGE_EXTENSION, SCORE_DROP_EXTENSION, STABLE_ITERATIONS, STABLE_REDUCTION
+
+
+# The budget splits the clock over the moves expected to be left (never fewer
+# than MIN_MOVES_TO_GO), and is never more than MAX_TIME_FRACTION of it
+def test_budget_comes_from_the_clock():
+    clock = TimeManager()
+    clock.start_turn(100, 0, 20)
+    assert clock.moves_to_go == 50
+    assert clock.base == pytest.approx(2)
+    assert clock.maximum == pytest.approx(20)
+
+    clock.start_turn(100, 40, 20)
+    assert clock.moves_to_go == 25
+    assert clock.base == pytest.approx(4)
+
+
+# What the clock gains between moves beyond what was left is counted as an
+# increment, and added to each budget
+def test_increment_is_estimated_from_the_clock():
+    clock = TimeManager()
+    clock.start_turn(100, 0, 20)
+    clock.end_turn(1, 0, "e2e4")
+    clock.last_used = 2
+    clock.start_turn(100, 2, 20)
+    assert clock.increment == pytest.approx(1)
+    assert clock.base == pytest.approx(100 / 48 + 1)
+
+
+# The budget grows when the best move changes or the score drops, and
+# shrinks once the best move has held for a few iterations
+def test_budget_follows_search_stability():
+    clock = TimeManager()
+    clock.start_turn(100, 0, 20)
+    base = clock.base
+    assert not clock.iteration_done(1, 0, "e2e4")
+    assert not clock.iteration_done(2, 0, "d2d4")
+    assert clock.budget == pytest.approx(base * BEST_MOVE_CHANGE_EXTENSION)
+    assert not clock.iteration_done(3, -1, "d2d4")
+    assert clock.budget == pytest.approx(base * BEST_MOVE_CHANGE_EXTENSION)
+    assert not clock.iteration_done(4, -5, "c2c4")
+    assert clock.budget == pytest.approx(base * BEST_MOVE_CHANGE_EXTENSION * SCORE_DROP_EXTENSION)
+
+    for depth in range(STABLE_ITERATIONS):
+        clock.iteration_done(5 + depth, -5, "c2c4")
+    assert clock.budget == pytest.approx(base * STABLE_REDUCTION)
+
+
+# A single legal move is played after the first iteration, and the search
+# stops once the next iteration wouldn't fit the budget
+def test_search_stops_when_forced_or_out_of_budget():
+    clock = TimeManager()
+    clock.start_turn(100, 0, 1)
+    assert clock.iteration_done(1, 0, "e1e2")
+    assert clock.reason == "forced"
+
+    clock.start_turn(100, 0, 20)
+    clock.start_time = clock.start_time - clock.budget
+    assert clock.iteration_done(1, 0, "e2e4")
+    assert clock.reason == "budget"
+
+
+def test_telemetry_is_written_per_move(tmp_path):
+    path = tmp_path / "time.csv"
+    clock = TimeManager(str(path))
+    clock.start_turn(100, 0, 20)
+    clock.iteration_done(1, 0.5, "e2e4")
+    clock.end_turn(1, 0.5, "e2e4")
+    clock.close()
+    header, row = path.read_text().splitlines()
+    assert header.split(",")[0] == "move"
+    assert row.split(",")[-2:] == ["e2e4", "budget"]
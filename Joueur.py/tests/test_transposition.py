@@ -0,0 +1,78 @@
+# Tests of the transposition tables and the helper processes sharing one, run from the client's root with: python3 -m pytest
+import time
+from games.chess.algorithm import algorithm, HelperPool, HELPER_STOP_TIMEOUT
+from games.chess.engine import Engine
+from games.chess.movement import parse_fen
+from games.chess.transposition import SharedTranspositionTable, EXACT, LOWER
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+# What one process stores, another attached by name reads back
+def test_shared_table_is_shared_by_name():
+    table = SharedTranspositionTable(1)
+    other = SharedTranspositionTable(name=table.name)
+    try:
+        table.store(12345, 4, 1.5, EXACT, 300)
+        assert other.probe(12345) == (4, 1.5, EXACT, 300, table.generation)
+        assert other.probe(54321) is None
+    finally:
+        other.close()
+        table.close()
+
+
+# An entry whose two words were written by different stores (one process's
+# write torn by another's) fails the key check and reads as a miss
+def test_torn_entry_is_a_miss():
+    table = SharedTranspositionTable(1)
+    try:
+        key = 12345
+        other = key + table.size # Same slot
+        table.store(key, 4, 1.5, EXACT, 300)
+        index = 2 + 2 * (key % table.size)
+        key_word = table.words[index]
+        table.store(other, 5, -2.0, LOWER, 400)
+        table.words[index] = key_word
+        assert table.probe(key) is None
+        assert table.probe(other) is None
+    finally:
+        table.close()
+
+
+# Helpers are started once and kept from one search to the next, stop
+# between searches, and are shut down with the engine
+def test_helpers_are_kept_across_searches():
+    engine = Engine(tt=SharedTranspositionTable(4), workers=3)
+    try:
+        state, color = parse_fen(START)
+        algorithm(state, color, 5, [], engine)
+        processes = list(engine.helpers.processes)
+        assert len(processes) == 2
+        assert not engine.helpers.searching
+
+        algorithm(state, color, 5, [], engine)
+        assert engine.helpers.processes == processes
+        assert all(process.is_alive() for process in processes)
+    finally:
+        engine.close()
+    assert engine.helpers is None
+    assert not any(process.is_alive() for process in processes)
+    assert all(process.exitcode == 0 for process in processes)
+
+
+# A helper told to stop does so part way through its search (rather than
+# being killed, possibly half way through writing an entry)
+def test_helpers_stop_when_told_to():
+    table = SharedTranspositionTable(4)
+    pool = HelperPool(table.name, 1)
+    try:
+        state, color = parse_fen(START)
+        pool.start(state, color, 10000, [], [0])
+        time.sleep(0.5)
+        start = time.time()
+        pool.finish()
+        assert time.time() - start < HELPER_STOP_TIMEOUT
+        assert pool.processes[0].is_alive()
+    finally:
+        pool.close()
+        table.close()